@@ -0,0 +1,130 @@
+"""
+Smoke-polygon KML parse: DOM + wildcard XPath (the original _parse_smoke_polygons)
+vs the streaming iterparse parser, by wall time and tracemalloc peak.
+
+    python benchmarks/bench_kml_parse.py --kml latest_smoke_final.kml
+    python benchmarks/bench_kml_parse.py --placemarks 3000 --points 400
+
+Grab a real file with:
+    curl -o latest_smoke_final.kml https://www.ospo.noaa.gov/Products/land/hms/data/latest_smoke_final.kml
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.climate_hazards_service import _iter_smoke_placemarks
+
+
+def legacy_parse(kml_text: str) -> List[Tuple[List[Tuple[float, float]], str]]:
+    """The pre-streaming implementation, kept verbatim for comparison."""
+    try:
+        root = ET.fromstring(kml_text)
+    except Exception:
+        return []
+
+    placemarks = root.findall(".//{*}Placemark")
+    out: List[Tuple[List[Tuple[float, float]], str]] = []
+
+    for pm in placemarks:
+        name_el = pm.find(".//{*}name")
+        style_el = pm.find(".//{*}styleUrl")
+        name = (name_el.text or "").lower() if name_el is not None else ""
+        style = (style_el.text or "").lower() if style_el is not None else ""
+
+        severity = "unknown"
+        for key in ("heavy", "medium", "light"):
+            if key in name or key in style:
+                severity = key
+                break
+
+        coord_el = pm.find(".//{*}Polygon//{*}outerBoundaryIs//{*}LinearRing//{*}coordinates")
+        if coord_el is None or not coord_el.text:
+            continue
+
+        coords = []
+        for token in coord_el.text.strip().split():
+            parts = token.split(",")
+            if len(parts) < 2:
+                continue
+            try:
+                coords.append((float(parts[0]), float(parts[1])))
+            except Exception:
+                continue
+
+        if len(coords) >= 3:
+            out.append((coords, severity))
+
+    return out
+
+
+def synthetic_kml(placemarks: int, points: int, seed: int = 7) -> str:
+    """HMS-shaped document: one styled Placemark per smoke polygon, lon,lat,alt triples."""
+    rnd = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<kml xmlns="http://www.opengis.net/kml/2.2"><Document>']
+    for i in range(placemarks):
+        sev = rnd.choice(("Light", "Medium", "Heavy"))
+        lon0, lat0 = rnd.uniform(-130, -60), rnd.uniform(25, 60)
+        ring = " ".join(
+            f"{lon0 + rnd.uniform(-2, 2):.6f},{lat0 + rnd.uniform(-2, 2):.6f},0" for _ in range(points)
+        )
+        parts.append(
+            f"<Placemark><name>Smoke {sev} {i}</name><styleUrl>#{sev.lower()}</styleUrl>"
+            f"<ExtendedData><Data name=\"Density\"><value>{sev}</value></Data></ExtendedData>"
+            f"<Polygon><outerBoundaryIs><LinearRing><coordinates>{ring}</coordinates>"
+            f"</LinearRing></outerBoundaryIs></Polygon></Placemark>"
+        )
+    parts.append("</Document></kml>")
+    return "".join(parts)
+
+
+def _measure(label: str, fn: Callable[[], object], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = len(result) if hasattr(result, "__len__") else "-"
+    print(f"{label:<28} {best * 1000:9.1f} ms   peak {peak / 1e6:8.1f} MB   polygons {count}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--kml", type=Path, help="Path to a real KML file (otherwise synthetic)")
+    ap.add_argument("--placemarks", type=int, default=2000)
+    ap.add_argument("--points", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.kml:
+        raw = args.kml.read_bytes()
+    else:
+        raw = synthetic_kml(args.placemarks, args.points).encode("utf-8")
+    text = raw.decode("utf-8")
+    print(f"document: {len(raw) / 1e6:.1f} MB")
+
+    chunk = 1 << 16
+
+    def stream_from_body() -> list:
+        # What ClimateHazardsService._fetch_smoke does with the HTTP body: bytes arrive in chunks
+        return list(_iter_smoke_placemarks(raw[i:i + chunk] for i in range(0, len(raw), chunk)))
+
+    _measure("legacy DOM + XPath", lambda: legacy_parse(text), args.repeat)
+    _measure("streaming (from body)", stream_from_body, args.repeat)
+    print("(peak for the legacy parse excludes the document string itself)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Push fan-out benchmark: N concurrent subscribers on one event loop (one worker).
+
+    python benchmarks/bench_push_fanout.py --subscribers 10000 --messages 200
+
+Every subscriber is a task that awaits its inbox like an SSE/WebSocket connection
+would, watching one of `--stations` station topics plus a shared "all" topic. For
+each published alert the script records how long publish() took (encode + fan-out)
+and how long until every consumer had it. `--slow` makes that share of consumers
+stop reading, to show that backpressure keeps their memory bounded instead of
+slowing the publisher.
+
+For comparison, `--per-subscriber-encode` times the naive approach of serializing
+the payload separately for every connection.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.push_broker import PushBroker
+
+ALERT = {
+    "change": "upsert",
+    "alert": {
+        "alert_id": "alert_bench",
+        "station_ids": ["stn_0"],
+        "alert_type": "elevator_outage",
+        "severity": "high",
+        "message": "Main elevator out of service for maintenance",
+        "affected_accessibility": ["mobility_impaired", "wheelchair"],
+        "estimated_resolution_time": "2 hours",
+    },
+}
+
+
+def _pct(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args) -> None:
+    broker = PushBroker(queue_size=args.queue)
+    received = 0
+    all_done = asyncio.Event()
+    target = 0
+
+    async def consumer(sub, slow: bool):
+        nonlocal received
+        if slow:
+            await asyncio.Event().wait()  # never reads
+        while True:
+            msg = await sub.get()
+            if msg is None:
+                return
+            received += 1
+            if received >= target:
+                all_done.set()
+
+    tracemalloc.start()
+    mem0 = tracemalloc.take_snapshot()
+    subs, tasks = [], []
+    n_slow = int(args.subscribers * args.slow)
+    for i in range(args.subscribers):
+        sub = broker.subscribe([f"station:stn_{i % args.stations}", "all"])
+        subs.append(sub)
+        tasks.append(asyncio.create_task(consumer(sub, i < n_slow)))
+    await asyncio.sleep(0)
+    setup_bytes = tracemalloc.take_snapshot().compare_to(mem0, "filename")
+    tracemalloc.stop()  # keep the timed section free of allocation tracing
+    fast = args.subscribers - n_slow
+
+    publish_s, settle_s = [], []
+    for m in range(args.messages):
+        target = received + fast
+        all_done.clear()
+        t0 = time.perf_counter()
+        broker.publish(["all"], "alert", {**ALERT, "seq": m})
+        t1 = time.perf_counter()
+        await all_done.wait()
+        t2 = time.perf_counter()
+        publish_s.append(t1 - t0)
+        settle_s.append(t2 - t0)
+
+    grown = sum(s.size_diff for s in setup_bytes)
+
+    print(f"subscribers: {args.subscribers:,} ({n_slow:,} not reading), messages: {args.messages}")
+    print(f"publish()        p50 {_pct(publish_s, .5) * 1e3:8.2f} ms   p99 {_pct(publish_s, .99) * 1e3:8.2f} ms")
+    print(f"all delivered    p50 {_pct(settle_s, .5) * 1e3:8.2f} ms   p99 {_pct(settle_s, .99) * 1e3:8.2f} ms")
+    print(f"throughput       {args.messages * fast / sum(settle_s):,.0f} deliveries/s")
+    print(f"max queued on a slow subscriber: {max((s.pending() for s in subs[:n_slow]), default=0)} (cap {args.queue})")
+    print(f"memory per subscriber (inbox + task): {grown / args.subscribers / 1e3:.1f} KB")
+
+    if args.per_subscriber_encode:
+        t0 = time.perf_counter()
+        for m in range(args.messages):
+            for _ in range(args.subscribers):
+                json.dumps({**ALERT, "seq": m}).encode("utf-8")
+        naive = (time.perf_counter() - t0) / args.messages
+        print(f"per-subscriber encode would add {naive * 1e3:.2f} ms per message")
+
+    for sub in subs:
+        broker.unsubscribe(sub)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--subscribers", type=int, default=10_000)
+    ap.add_argument("--stations", type=int, default=500)
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--queue", type=int, default=64)
+    ap.add_argument("--slow", type=float, default=0.05, help="share of subscribers that never read")
+    ap.add_argument("--per-subscriber-encode", action="store_true")
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
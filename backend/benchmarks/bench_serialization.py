@@ -0,0 +1,130 @@
+"""
+Response serialization cost for the largest endpoints, default FastAPI path vs
+FastJSONResponse.
+
+    python benchmarks/bench_serialization.py --coords 5000 --steps 400 --repeat 200
+
+Payloads mimic real responses: /api/maps/route with a full-overview OSRM geometry
+and per-step maneuvers, /api/route/plan (RouteOption models) and
+/api/climate/hazards. For each, "default" is what FastAPI does with a returned
+object (response_model validation when the route has one, jsonable_encoder, then
+stdlib json in JSONResponse.render); "fast" is FastJSONResponse.render on the same
+data. CPU time per request is measured with time.process_time.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from routes.routing import RouteOption
+from services.fast_json import BACKEND, FastJSONResponse
+
+
+def osrm_route(n_coords: int, n_steps: int, rnd: random.Random) -> dict:
+    lon, lat = -79.38, 43.65
+    coords = []
+    for _ in range(n_coords):
+        lon += rnd.uniform(-2e-4, 2e-4)
+        lat += rnd.uniform(-2e-4, 2e-4)
+        coords.append([round(lon, 6), round(lat, 6)])
+    per = max(2, n_coords // max(1, n_steps))
+    steps = []
+    for i in range(n_steps):
+        seg = coords[i * per:(i + 1) * per + 1] or coords[-2:]
+        steps.append({
+            "geometry": {"type": "LineString", "coordinates": seg},
+            "maneuver": {"bearing_after": rnd.randrange(360), "bearing_before": rnd.randrange(360),
+                         "location": seg[0], "modifier": "left", "type": "turn"},
+            "mode": "walking", "driving_side": "right", "name": f"Street {i}", "ref": "",
+            "intersections": [{"out": 0, "entry": [True, False], "bearings": [90, 270], "location": seg[0]}],
+            "weight": rnd.uniform(1, 60), "duration": rnd.uniform(1, 60), "distance": rnd.uniform(5, 400),
+        })
+    return {
+        "profile": "foot",
+        "distance_m": 12345.6,
+        "duration_s": 8888.8,
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "legs": [{"steps": steps, "summary": "", "weight": 8888.8, "duration": 8888.8, "distance": 12345.6}],
+    }
+
+
+def route_plan(n: int) -> List[dict]:
+    return [
+        {
+            "route_id": f"route_{i:03d}", "origin": "Union Station", "destination": "CN Tower",
+            "mode": "bus", "estimated_time_minutes": 25, "stops_count": 5, "accessibility_score": 95.0,
+            "has_elevator": True, "wheelchair_accessible": True, "audio_assistance_available": True,
+            "estimated_co2_kg": 0.32, "co2_saved_vs_car_kg": 2.18, "carbon_intensity_gco2_per_kwh": 41.0,
+        }
+        for i in range(n)
+    ]
+
+
+def hazards(rnd: random.Random) -> dict:
+    return {
+        "location": {"lat": 43.65, "lon": -79.38},
+        "smoke": {"status": "ok", "in_smoke_polygon": True, "density": "Heavy"},
+        "wildfires": {"status": "ok", "count_within_km": 12, "radius_km": 50,
+                      "nearest": [{"lat": 43 + rnd.random(), "lon": -79 - rnd.random(), "confidence": "h",
+                                   "frp": rnd.uniform(1, 90), "acq_date": "2026-07-01"} for _ in range(50)]},
+        "alerts": ["Air quality: heavy smoke detected", "Active fires within 50 km"],
+        "recommendations": ["Limit time outdoors", "Prefer enclosed stations"],
+        "unavailable": [],
+    }
+
+
+def cpu_per_call(fn, repeat: int) -> float:
+    fn()  # warm
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - t0) / repeat
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--coords", type=int, default=5000)
+    ap.add_argument("--steps", type=int, default=400)
+    ap.add_argument("--routes", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    rnd = random.Random(7)
+    plan_adapter = TypeAdapter(List[RouteOption])
+    route = osrm_route(args.coords, args.steps, rnd)
+    plan = route_plan(args.routes)
+    plan_models = [RouteOption.model_construct(**r) for r in plan]
+    haz = hazards(rnd)
+
+    cases = [
+        # name, default path, fast path
+        ("/api/maps/route",
+         lambda: JSONResponse(jsonable_encoder(route)).body,
+         lambda: FastJSONResponse(route).body),
+        ("/api/route/plan",
+         lambda: JSONResponse(jsonable_encoder(plan_adapter.validate_python(plan_models, from_attributes=True))).body,
+         lambda: FastJSONResponse([m.model_dump() for m in plan_models]).body),
+        ("/api/climate/hazards",
+         lambda: JSONResponse(jsonable_encoder(haz)).body,
+         lambda: FastJSONResponse(haz).body),
+    ]
+
+    print(f"fast backend: {BACKEND}")
+    print(f"{'endpoint':<22} {'size':>10} {'default':>12} {'fast':>12} {'speedup':>8}")
+    for name, default, fast in cases:
+        size = len(fast())
+        d = cpu_per_call(default, args.repeat)
+        f = cpu_per_call(fast, args.repeat)
+        print(f"{name:<22} {size / 1024:>8.1f}KB {d * 1e3:>10.3f}ms {f * 1e3:>10.3f}ms {d / f:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Trip ledger load test: keep appending trips and check that the per-user stats
+lookup stays flat as history grows.
+
+    python benchmarks/bench_trip_store.py --trips 2000000 --users 50000
+
+Writes go through TripStore.record_trip (one transaction per trip, like the API).
+At every checkpoint, `--probes` random users are read with get_stats and p50/p99
+latency is printed next to the total trip count.
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.climate_service import ClimateEngine
+from services.trip_store import TripStore
+
+MODES = ("bus", "subway", "walk", "bike", "train")
+
+
+def _pct(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--trips", type=int, default=200_000)
+    ap.add_argument("--users", type=int, default=10_000)
+    ap.add_argument("--checkpoints", type=int, default=5)
+    ap.add_argument("--probes", type=int, default=2000)
+    ap.add_argument("--db", type=Path, help="SQLite file (default: temp dir)")
+    args = ap.parse_args()
+
+    db = args.db or Path(tempfile.mkdtemp()) / "trips.db"
+    store = TripStore(db_path=db)
+    engine = ClimateEngine()
+    rnd = random.Random(42)
+
+    # Pre-compute a pool of impacts so the loop measures the store, not the engine
+    impacts = [engine.calculate_savings(rnd.uniform(0.5, 25.0), rnd.choice(MODES)) for _ in range(512)]
+    start_day = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    per_checkpoint = max(1, args.trips // args.checkpoints)
+    written = 0
+    print(f"db: {db}")
+    print(f"{'trips':>12} {'write/s':>10} {'stats p50':>12} {'stats p99':>12}")
+
+    while written < args.trips:
+        batch = min(per_checkpoint, args.trips - written)
+        t0 = time.perf_counter()
+        for i in range(batch):
+            n = written + i
+            store.record_trip(
+                f"user_{rnd.randrange(args.users)}",
+                impacts[n & 511],
+                ts_utc=start_day + timedelta(minutes=n % 525_600),
+            )
+        write_s = time.perf_counter() - t0
+        written += batch
+
+        lat = []
+        for _ in range(args.probes):
+            uid = f"user_{rnd.randrange(args.users)}"
+            t1 = time.perf_counter()
+            store.get_stats(uid)
+            lat.append(time.perf_counter() - t1)
+
+        print(
+            f"{written:>12,} {batch / write_s:>10,.0f} "
+            f"{_pct(lat, 0.50) * 1e6:>10.1f}us {_pct(lat, 0.99) * 1e6:>10.1f}us"
+        )
+
+    print(f"mean stats latency over last checkpoint: {statistics.mean(lat) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
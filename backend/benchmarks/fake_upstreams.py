@@ -0,0 +1,322 @@
+"""
+Local stand-ins for every upstream the backend calls: Nominatim, OSRM, Electricity
+Maps, NOAA smoke KML, NASA FIRMS CSV and Gemini (generateContent over REST). All of
+them are served by one threaded HTTP server, each under its own path prefix, with
+latency and error injection per provider.
+
+    python benchmarks/fake_upstreams.py --port 9100
+    python benchmarks/fake_upstreams.py --latency-ms 40 --jitter-ms 10 --error-rate 0.02
+    python benchmarks/fake_upstreams.py --latency osrm=150 --errors gemini=0.3
+
+It prints the environment variables that point the backend at it, e.g. to run
+uvicorn against fakes by hand. run_benchmarks.py starts it in-process.
+Payloads are generated once, from a fixed seed, so every run serves the same bytes.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+PROVIDERS = ("nominatim", "osrm", "electricity_maps", "noaa", "firms", "gemini")
+
+# URL prefix served for each provider
+PREFIXES = {
+    "nominatim": "/nominatim",
+    "osrm": "/osrm",
+    "electricity_maps": "/electricitymaps",
+    "noaa": "/noaa",
+    "firms": "/firms",
+    "gemini": "/gemini",
+}
+
+CENTER = (43.6532, -79.3832)  # Toronto: the smoke polygons and fires are placed around it
+
+
+class Fault:
+    """Injected behaviour for one provider: added latency (± jitter) and a 503 rate."""
+
+    __slots__ = ("latency_ms", "jitter_ms", "error_rate")
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+
+def _osrm_route(rnd: random.Random, points: int, steps: int) -> bytes:
+    lat, lon = CENTER
+    coords = []
+    for _ in range(points):
+        lat += rnd.uniform(-1e-4, 1.5e-4)
+        lon += rnd.uniform(-1e-4, 1.5e-4)
+        coords.append([round(lon, 6), round(lat, 6)])
+    per = max(2, points // steps)
+    step_list = []
+    for i in range(steps):
+        seg = coords[i * per:(i + 1) * per + 1] or coords[-2:]
+        step_list.append({
+            "geometry": {"type": "LineString", "coordinates": seg},
+            "maneuver": {"type": "turn", "modifier": "left", "location": seg[0],
+                         "bearing_before": rnd.randrange(360), "bearing_after": rnd.randrange(360)},
+            "intersections": [{"location": seg[0], "bearings": [90, 270], "entry": [True, False], "out": 0}],
+            "mode": "walking", "name": f"Street {i}", "driving_side": "right",
+            "distance": round(rnd.uniform(10, 300), 1), "duration": round(rnd.uniform(10, 200), 1), "weight": 1.0,
+        })
+    body = {
+        "code": "Ok",
+        "routes": [{
+            "distance": 5234.5, "duration": 3768.1, "weight": 3768.1,
+            "geometry": {"type": "LineString", "coordinates": coords},
+            "legs": [{"steps": step_list, "summary": "", "distance": 5234.5, "duration": 3768.1, "weight": 3768.1}],
+        }],
+        "waypoints": [{"location": coords[0], "name": ""}, {"location": coords[-1], "name": ""}],
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def _smoke_kml(rnd: random.Random, placemarks: int, points: int) -> bytes:
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<kml xmlns="http://www.opengis.net/kml/2.2"><Document>']
+    for i in range(placemarks):
+        # First polygon covers the centre so hazards always finds smoke there
+        clat, clon = CENTER if i == 0 else (CENTER[0] + rnd.uniform(-8, 8), CENTER[1] + rnd.uniform(-12, 12))
+        radius = 0.5 if i == 0 else rnd.uniform(0.05, 0.6)
+        ring = []
+        for k in range(points):
+            a = 2 * math.pi * k / points
+            ring.append(f"{clon + radius * math.cos(a):.5f},{clat + radius * math.sin(a):.5f},0")
+        ring.append(ring[0])
+        density = ("Light", "Medium", "Heavy")[i % 3]
+        parts.append(
+            f"<Placemark><name>Smoke ({density})</name><Polygon><outerBoundaryIs><LinearRing>"
+            f"<coordinates>{' '.join(ring)}</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>"
+        )
+    parts.append("</Document></kml>")
+    return "".join(parts).encode("utf-8")
+
+
+def _firms_csv(rnd: random.Random, rows: int) -> bytes:
+    lines = ["latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,confidence,frp"]
+    for _ in range(rows):
+        lines.append(
+            f"{CENTER[0] + rnd.uniform(-0.4, 0.4):.4f},{CENTER[1] + rnd.uniform(-0.4, 0.4):.4f},"
+            f"{rnd.uniform(300, 360):.1f},0.4,0.4,2026-07-01,1200,N,n,{rnd.uniform(1, 50):.1f}"
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _carbon_latest() -> bytes:
+    return json.dumps({"zone": "CA-ON", "carbonIntensity": 41, "datetime": "2026-07-01T12:00:00.000Z"}).encode("utf-8")
+
+
+def _carbon_forecast(rnd: random.Random, hours: int = 24) -> bytes:
+    forecast = [
+        {"carbonIntensity": round(40 + 25 * math.sin(h / 24 * 2 * math.pi) + rnd.uniform(-3, 3), 1),
+         "datetime": f"2026-07-01T{h % 24:02d}:00:00.000Z"}
+        for h in range(hours)
+    ]
+    return json.dumps({"zone": "CA-ON", "forecast": forecast}).encode("utf-8")
+
+
+def _nominatim() -> bytes:
+    return json.dumps([
+        {"display_name": "Union Station, Front Street West, Toronto", "lat": "43.6453", "lon": "-79.3806", "type": "station"},
+        {"display_name": "Union, Toronto", "lat": "43.6450", "lon": "-79.3810", "type": "neighbourhood"},
+    ]).encode("utf-8")
+
+
+def _gemini(text: str) -> bytes:
+    return json.dumps({
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": 40, "candidatesTokenCount": 4, "totalTokenCount": 44},
+    }).encode("utf-8")
+
+
+class FakeUpstreams:
+    """
+    The fake provider server. Use as a context manager, or start()/stop().
+    `hits` counts requests per provider (including injected failures).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: Optional[Dict[str, Fault]] = None,
+        seed: int = 7,
+        route_points: int = 3000,
+        smoke_placemarks: int = 300,
+    ) -> None:
+        self.faults = {p: Fault() for p in PROVIDERS}
+        self.faults.update(faults or {})
+        self.hits: "Counter[str]" = Counter()
+        self._fault_rnd = random.Random(seed + 1)
+        self._lock = threading.Lock()
+
+        rnd = random.Random(seed)
+        self.payloads: Dict[str, Tuple[str, bytes]] = {
+            "nominatim": ("application/json", _nominatim()),
+            "osrm": ("application/json", _osrm_route(rnd, route_points, max(1, route_points // 20))),
+            "carbon_latest": ("application/json", _carbon_latest()),
+            "carbon_forecast": ("application/json", _carbon_forecast(rnd)),
+            "noaa": ("application/vnd.google-earth.kml+xml", _smoke_kml(rnd, smoke_placemarks, 60)),
+            "firms": ("text/csv", _firms_csv(rnd, 40)),
+            "gemini": ("application/json", _gemini("Union Station")),
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- lifecycle ----------
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, provider: str) -> str:
+        return self.base_url + PREFIXES[provider]
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point the backend's services at this server."""
+        return {
+            "NOMINATIM_BASE_URL": self.url("nominatim"),
+            "OSRM_BASE_URL": self.url("osrm"),
+            "ELECTRICITY_MAPS_BASE_URL": self.url("electricity_maps"),
+            "ELECTRICITY_MAPS_API_KEY": "bench",
+            "NOAA_SMOKE_KML_URL": self.url("noaa") + "/latest_smoke_final.kml",
+            "NASA_FIRMS_BASE_URL": self.url("firms"),
+            "NASA_FIRMS_MAP_KEY": "bench",
+            "GEMINI_BASE_URL": self.url("gemini"),
+            "GEMINI_API_KEY": "bench",
+        }
+
+    def start(self) -> "FakeUpstreams":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeUpstreams":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---------- request handling ----------
+    def _route(self, method: str, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """(provider, payload key) for a request path, or (None, None)."""
+        for provider, prefix in PREFIXES.items():
+            if not path.startswith(prefix + "/"):
+                continue
+            rest = path[len(prefix):]
+            if provider == "electricity_maps":
+                return provider, "carbon_forecast" if "/forecast" in rest else "carbon_latest"
+            if provider == "gemini":
+                return provider, "gemini" if method == "POST" and ":generateContent" in rest else None
+            return provider, provider
+        return None, None
+
+    def _delay_and_fail(self, provider: str) -> bool:
+        """Sleep for the injected latency; True if this request should fail."""
+        fault = self.faults[provider]
+        with self._lock:
+            self.hits[provider] += 1
+            jitter = self._fault_rnd.uniform(-fault.jitter_ms, fault.jitter_ms) if fault.jitter_ms else 0.0
+            fail = fault.error_rate > 0 and self._fault_rnd.random() < fault.error_rate
+        delay = max(0.0, fault.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def _handler_class(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self) -> None:
+                length = int(self.headers.get("content-length") or 0)
+                if length:
+                    self.rfile.read(length)
+                provider, key = owner._route(self.command, self.path.split("?", 1)[0])
+                if provider is None or key is None:
+                    self._send(404, "application/json", b'{"error":"not found"}')
+                    return
+                if owner._delay_and_fail(provider):
+                    self._send(503, "application/json", b'{"error":"injected failure"}')
+                    return
+                ctype, body = owner.payloads[key]
+                self._send(200, ctype, body)
+
+            def _send(self, status: int, ctype: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, format, *args) -> None:  # noqa: A002 - quiet by default
+                pass
+
+        return Handler
+
+
+def parse_overrides(items, cast=float) -> Dict[str, float]:
+    """["osrm=120", "gemini=0.3"] -> {"osrm": 120.0, "gemini": 0.3}"""
+    out: Dict[str, float] = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        if name not in PROVIDERS:
+            raise SystemExit(f"unknown provider {name!r}; expected one of {', '.join(PROVIDERS)}")
+        out[name] = cast(value)
+    return out
+
+
+def build_faults(latency_ms: float, jitter_ms: float, error_rate: float, latency=None, errors=None) -> Dict[str, Fault]:
+    per_latency = parse_overrides(latency)
+    per_errors = parse_overrides(errors)
+    return {
+        p: Fault(per_latency.get(p, latency_ms), jitter_ms, per_errors.get(p, error_rate))
+        for p in PROVIDERS
+    }
+
+
+def add_fault_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="added latency for every provider")
+    ap.add_argument("--jitter-ms", type=float, default=5.0, help="uniform ± jitter on that latency")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    ap.add_argument("--latency", action="append", metavar="PROVIDER=MS", help="per-provider latency override")
+    ap.add_argument("--errors", action="append", metavar="PROVIDER=RATE", help="per-provider error-rate override")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    faults = build_faults(args.latency_ms, args.jitter_ms, args.error_rate, args.latency, args.errors)
+    with FakeUpstreams(args.host, args.port, faults=faults) as fake:
+        for k, v in fake.env().items():
+            print(f"export {k}={v}")
+        print(f"# serving on {fake.base_url}; Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Load scenarios for every router, run in-process against local upstream stand-ins
+(fake_upstreams.py), reporting throughput and p50/p95/p99 latency per scenario.
+
+    python benchmarks/run_benchmarks.py                      # every scenario, report table
+    python benchmarks/run_benchmarks.py --check              # exit 1 on a threshold regression
+    python benchmarks/run_benchmarks.py -s maps_route -s hazards --requests 500 --concurrency 32
+    python benchmarks/run_benchmarks.py --latency-ms 80 --error-rate 0.1   # degraded upstreams
+    python benchmarks/run_benchmarks.py --json report.json
+    python benchmarks/run_benchmarks.py --update-thresholds  # re-baseline thresholds.json
+
+Requests go through the whole ASGI stack (middleware, routing, validation,
+serialization) via httpx.ASGITransport, with no socket between client and app. The
+app's outbound calls reach the fake server over loopback. Each scenario first runs
+--warmup requests (untimed), then --requests timed requests with --concurrency in flight.
+
+--check compares every scenario against thresholds.json. A scenario fails if its p95
+exceeds p95_ms by more than max(tolerance x p95_ms, p95_min_slack_ms), or its throughput
+falls below min_rps by more than rps_tolerance. The slack is relative, so a fast scenario
+is held as tightly as a slow one; the few-ms floor keeps sub-millisecond scenarios from
+being failed by one scheduler hiccup at the tail. Before and after the run a
+fixed CPU workload is timed; when this machine is slower than the one that recorded
+calibration_ms, every limit is scaled by that ratio, so a slower or busier box doesn't
+read as a regression, and a scenario over its limit is run once more before it counts. The run settings stored in that file (requests, concurrency,
+upstream latency) are used for the check, so local runs and CI measure the same thing.
+--update-thresholds writes fresh limits with headroom, so a run on the CI machine can
+re-baseline them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from fake_upstreams import FakeUpstreams, add_fault_arguments, build_faults  # noqa: E402
+
+THRESHOLDS = Path(__file__).resolve().parent / "thresholds.json"
+
+Request = Tuple[str, str, Dict[str, Any]]  # method, url, httpx request kwargs
+
+
+class Scenario:
+    def __init__(self, name: str, router: str, build: Callable[[int], Request]) -> None:
+        self.name = name
+        self.router = router
+        self.build = build
+
+
+def _get(url: str) -> Callable[[int], Request]:
+    return lambda i: ("GET", url, {})
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("health", "health", _get("/health")),
+    Scenario("ready", "health", _get("/ready")),
+    Scenario("calculate_impact", "climate", lambda i: ("POST", "/api/calculate-impact", {"json": {
+        "distance_km": 4.0 + i % 7, "mode": ("bus", "subway", "bike", "walk")[i % 4],
+        "user_id": f"bench_{i % 50}", "lat": 43.65, "lon": -79.38,
+    }})),
+    Scenario("station_accessibility", "accessibility", lambda i: ("GET", f"/api/station/stn_{i % 200}/accessibility", {})),
+    Scenario("stations_batch", "accessibility", lambda i: (
+        "GET", "/api/stations/accessibility?ids=" + ",".join(f"stn_{(i + k) % 200}" for k in range(50)), {})),
+    Scenario("alerts", "accessibility", _get("/api/alerts?severity=high")),
+    Scenario("route_plan", "routing", lambda i: (
+        "POST", "/api/route/plan?origin=Union%20Station&destination=CN%20Tower&optimize=emissions&lat=43.65&lon=-79.38", {})),
+    Scenario("user_stats", "users", lambda i: ("GET", f"/api/user/bench_{i % 50}/stats", {})),
+    Scenario("leaderboard", "users", _get("/api/leaderboard")),
+    Scenario("carbon_latest", "carbon_intensity", _get("/api/climate/carbon-intensity/latest?lat=43.65&lon=-79.38")),
+    Scenario("recommend_times", "carbon_intensity", _get("/api/climate/carbon-intensity/recommend-times?lat=43.65&lon=-79.38")),
+    Scenario("hazards", "hazards", _get("/api/climate/hazards?lat=43.65&lon=-79.38&impairments=asthma,wheelchair")),
+    Scenario("education_tip", "education", _get("/api/climate/education/tip")),
+    Scenario("geocode", "maps", lambda i: ("GET", f"/api/maps/geocode?q=Union%20Station%20{i % 20}", {})),
+    Scenario("maps_route", "maps", _get("/api/maps/route?origin_lat=43.65&origin_lon=-79.38&dest_lat=43.70&dest_lon=-79.30&zoom=15")),
+    Scenario("assistant_query", "assistant", lambda i: ("POST", "/query", {"json": {"text": ("hello", "show my badges", "okay")[i % 3]}})),
+    Scenario("interpret_speech", "ai", lambda i: ("POST", "/api/chat/interpret-speech", {"json": {"text": f"take me to zorblat plaza number {i}"}})),
+    Scenario("stream_stats", "push", _get("/api/stream/stats")),
+    Scenario("metrics", "health", _get("/metrics")),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    async def one(i: int) -> Tuple[float, int]:
+        method, url, kwargs = scenario.build(i)
+        start = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+            status = r.status_code
+        except Exception:
+            status = 599
+        return time.perf_counter() - start, status
+
+    for i in range(warmup):
+        await one(i)
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    next_i = 0
+
+    async def worker() -> None:
+        nonlocal next_i
+        while next_i < requests:
+            i = next_i
+            next_i += 1
+            elapsed, status = await one(warmup + i)
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(n for s, n in statuses.items() if s >= 500)
+    return {
+        "scenario": scenario.name,
+        "router": scenario.router,
+        "requests": requests,
+        "rps": round(requests / wall, 1) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+async def run_all(scenarios: List[Scenario], requests: int, concurrency: int, warmup: int) -> List[Dict[str, Any]]:
+    import httpx
+    from main import app  # imported here: env must point at the fakes before services load
+    from services.readiness import readiness
+
+    # ASGITransport does not run the lifespan; warm up the way a worker does on start-up
+    await readiness.run_warmup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+        results = []
+        for scenario in scenarios:
+            result = await run_scenario(client, scenario, requests, concurrency, warmup)
+            results.append(result)
+            print(_row(result), flush=True)
+        return results
+
+
+def _row(r: Dict[str, Any]) -> str:
+    return (f"{r['scenario']:<24} {r['router']:<17} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['error_rate'] * 100:>6.1f}%")
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Best-of-N time (ms) of a fixed CPU workload, to compare machine speed between runs."""
+    payload = {"stations": [{"id": f"stn_{i}", "ramp": i % 2 == 0, "score": i * 0.5} for i in range(200)]}
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(50):
+            json.loads(json.dumps(payload))
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def slowdown(limits: Dict[str, Any], calibration_ms: float) -> float:
+    """How much slower this machine is than the one that recorded the limits (never below 1)."""
+    recorded = float(limits.get("calibration_ms") or 0.0)
+    # Only ever loosen: on a faster machine the recorded limits apply as they are
+    return max(1.0, calibration_ms / recorded) if recorded > 0 and calibration_ms > 0 else 1.0
+
+
+def check(results: List[Dict[str, Any]], limits: Dict[str, Any], calibration_ms: float = 0.0) -> List[str]:
+    tolerance = float(limits.get("tolerance", 0.25))
+    rps_tolerance = float(limits.get("rps_tolerance", 0.5))
+    min_slack_ms = float(limits.get("p95_min_slack_ms", 3.0))
+    speed = slowdown(limits, calibration_ms)
+    failures = []
+    for r in results:
+        limit = limits.get("scenarios", {}).get(r["scenario"])
+        if not limit:
+            continue
+        if "p95_ms" in limit:
+            base = limit["p95_ms"] * speed
+            ceiling = base + max(base * tolerance, min_slack_ms)
+            if r["p95_ms"] > ceiling:
+                failures.append(f"{r['scenario']}: p95 {r['p95_ms']:.2f} ms > limit {ceiling:.2f} ms "
+                                f"({limit['p95_ms']:.2f} ms x{speed:.2f} + max({tolerance:.0%}, {min_slack_ms:.0f} ms))")
+        if "min_rps" in limit:
+            floor = limit["min_rps"] / speed * (1 - rps_tolerance)
+            if r["rps"] < floor:
+                failures.append(f"{r['scenario']}: {r['rps']:.1f} req/s < floor {floor:.1f} "
+                                f"({limit['min_rps']:.1f} /{speed:.2f} -{rps_tolerance:.0%})")
+        if "max_error_rate" in limit and r["error_rate"] > limit["max_error_rate"]:
+            failures.append(f"{r['scenario']}: error rate {r['error_rate']:.2%} > {limit['max_error_rate']:.2%}")
+    return failures
+
+
+def updated_limits(results: List[Dict[str, Any]], config: Dict[str, Any], previous: Dict[str, Any],
+                   calibration_ms: float) -> Dict[str, Any]:
+    # 2x headroom on top of the tolerances: the gate is for regressions, not machine noise
+    return {
+        "tolerance": float(previous.get("tolerance", 0.25)),
+        "rps_tolerance": float(previous.get("rps_tolerance", 0.5)),
+        "p95_min_slack_ms": float(previous.get("p95_min_slack_ms", 3.0)),
+        "calibration_ms": calibration_ms,
+        "config": config,
+        "scenarios": {
+            r["scenario"]: {
+                "p95_ms": round(max(r["p95_ms"] * 2, 2.0), 1),
+                "min_rps": round(r["rps"] / 2, 1),
+                "max_error_rate": 0.0 if r["error_rate"] == 0 else round(min(1.0, r["error_rate"] * 2), 3),
+            }
+            for r in results
+        },
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-s", "--scenario", action="append", help="run only these scenarios (repeatable)")
+    ap.add_argument("--requests", type=int, default=None, help="timed requests per scenario (default 200)")
+    ap.add_argument("--concurrency", type=int, default=None, help="requests in flight (default 16)")
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--json", type=Path, help="write the full report here")
+    ap.add_argument("--check", action="store_true", help="fail on regressions against thresholds.json")
+    ap.add_argument("--thresholds", type=Path, default=THRESHOLDS)
+    ap.add_argument("--update-thresholds", action="store_true", help="rewrite thresholds.json from this run")
+    ap.add_argument("--list", action="store_true", help="list scenarios and exit")
+    add_fault_arguments(ap)
+    args = ap.parse_args()
+
+    if args.list:
+        for s in SCENARIOS:
+            print(f"{s.name:<24} {s.router}")
+        return
+
+    limits: Dict[str, Any] = {}
+    if args.check:
+        limits = json.loads(args.thresholds.read_text(encoding="utf-8"))
+        # Measure under the settings the thresholds were recorded with, unless overridden
+        for key, value in (limits.get("config") or {}).items():
+            if getattr(args, key, None) in (None, ap.get_default(key)):
+                setattr(args, key, value)
+    requests = args.requests or 200
+    concurrency = args.concurrency or 16
+
+    selected = SCENARIOS
+    if args.scenario:
+        known = {s.name: s for s in SCENARIOS}
+        missing = [n for n in args.scenario if n not in known]
+        if missing:
+            raise SystemExit(f"unknown scenario(s): {', '.join(missing)} (see --list)")
+        selected = [known[n] for n in args.scenario]
+
+    faults = build_faults(args.latency_ms, args.jitter_ms, args.error_rate, args.latency, args.errors)
+    with tempfile.TemporaryDirectory(prefix="transit-bench-") as data_dir, FakeUpstreams(faults=faults) as fake:
+        os.environ.update(fake.env())
+        os.environ["TRANSIT_DATA_DIR"] = data_dir
+        os.environ.pop("ADMIN_TOKEN", None)
+        os.environ["AI_RATE_LIMIT_PER_MIN"] = "0"  # the load generator is one client
+
+        print(f"upstreams: {fake.base_url}  latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms  "
+              f"error rate {args.error_rate:.0%}  requests {requests}  concurrency {concurrency}")
+        print(f"{'scenario':<24} {'router':<17} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        calibration_ms = calibrate()
+        results = asyncio.run(run_all(selected, requests, concurrency, args.warmup))
+        # The slower of the two: a box that got busy during the run counts as slower
+        calibration_ms = max(calibration_ms, calibrate())
+        if args.check:
+            # The limits are tight, so a scenario over one gets a second run before it counts;
+            # a real regression fails both, a burst of noise on a shared box does not
+            retry = [s for s, r in zip(selected, results) if check([r], limits, calibration_ms)]
+            if retry:
+                print(f"re-running over their limits: {', '.join(s.name for s in retry)}")
+                rerun = {r["scenario"]: r for r in asyncio.run(run_all(retry, requests, concurrency, args.warmup))}
+                results = [rerun.get(r["scenario"], r) for r in results]
+        upstream_hits = dict(fake.hits)
+
+    config = {"requests": requests, "concurrency": concurrency, "latency_ms": args.latency_ms,
+              "jitter_ms": args.jitter_ms, "error_rate": args.error_rate}
+    print(f"upstream calls: {json.dumps(upstream_hits, sort_keys=True)}")
+    print(f"calibration: {calibration_ms:.2f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({"config": config, "upstream_calls": upstream_hits, "results": results}, indent=2),
+                             encoding="utf-8")
+
+    if args.update_thresholds:
+        previous = json.loads(args.thresholds.read_text(encoding="utf-8")) if args.thresholds.exists() else {}
+        args.thresholds.write_text(json.dumps(updated_limits(results, config, previous, calibration_ms), indent=2) + "\n",
+                                   encoding="utf-8")
+        print(f"wrote {args.thresholds}")
+
+    if args.check:
+        speed = slowdown(limits, calibration_ms)
+        if speed > 1.0:
+            print(f"machine is {speed:.2f}x slower than the baseline; limits scaled to match")
+        failures = check(results, limits, calibration_ms)
+        if failures:
+            print("\nREGRESSIONS:")
+            for f in failures:
+                print(f"  {f}")
+            sys.exit(1)
+        print("\nall scenarios within thresholds")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,15 @@
 #   - AI-powered vision analysis for accessibility hazards
 #   - Speech-to-text interpretation and chat synthesis
 
+# First import, so the start-up breakdown includes every import below
+from services.container import container, startup_clock
+
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional
@@ -22,30 +29,159 @@ try:
 except ImportError:
     pass  # dotenv is optional
 
+from middleware import CompressionMiddleware, MetricsMiddleware, RequestProfilerMiddleware
+from services.metrics import http_metrics
+
 # Import routers from route modules
-from routes import health, climate, accessibility, routing, users, carbon_intensity, hazards, education, maps, assistant
+from routes import health, climate, accessibility, routing, users, carbon_intensity, hazards, education, maps, assistant, push, admin
 
-# Import services for controller logic
+# Import services for controller logic (ChatService, VisionService, ... are built on first use by `container`)
 from services.chat_service import ChatService
-from services.transit_service import TransitService
 from services.vision_service import VisionService
-from services.climate_service import ClimateEngine
-
+from services.climate_hazards_service import climate_hazards
+from services.http_clients import aclose_clients
+from services.leaderboard import leaderboard
+from services.prefetch import prefetcher
+from services.rate_limit import rate_limit
+from services.readiness import readiness
+from services.resilience import CircuitBreaker, all_guards, get_guard
+from services.shared_state import shared_state, worker_sync
+from services.snapshots import snapshot_store
+from services.station_repository import station_repository
+from services.trip_store import trip_store
+
+logger = logging.getLogger(__name__)
+startup_clock.mark("imports")
 
 
 # FastAPI Application Initialization
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_clock.mark("lifespan")
+    logger.info("startup: %s", startup_clock.report())
+    # Warm caches in the background: /live answers straight away, /ready once this is done;
+    # then keep the time-varying feeds fresh so requests only read snapshots
+    warmup = asyncio.create_task(_warm_then_prefetch())
+    # With several workers, replay the changes the others make (returns at once with one)
+    relay = asyncio.create_task(worker_sync.run())
+    yield
+    warmup.cancel()
+    relay.cancel()
+    await aclose_clients()
+    leaderboard.flush()
+    trip_store.close()
+    shared_state.close()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Inclusive Transit API",
     description="Accessibility-first transit API supporting wheelchair users, visually impaired, and hearing impaired individuals",
     version="1.0.0"
 )
 
-# Initialize service instances (available globally for controller logic)
-chat_service = ChatService()
-transit_service = TransitService()
-vision_service = VisionService()
-climate_engine = ClimateEngine()
+# Lazily built service instances, injected into the endpoints below
+get_chat_service = container.provider("chat")
+get_vision_service = container.provider("vision")
+
+# Gemini-backed endpoints cost money per call: one budget per client across every worker
+ai_rate_limit = rate_limit("ai", "AI_RATE_LIMIT_PER_MIN", 60)
+
+
+# ============================================================
+# Readiness: warm-up steps and dependency probes behind /ready
+# ============================================================
+
+def _warm_gazetteer():
+    # Station names from the GTFS feed become known destinations for speech correction
+    # (the index alone: the chat service, and the Gemini SDK with it, is built on first use)
+    container.get("destinations").add_names(station_repository.names())
+
+
+def _warm_smoke_polygons():
+    if climate_hazards.smoke_polygons() is None:
+        raise RuntimeError("NOAA smoke feed unavailable")
+
+
+readiness.add_warmup("stations", station_repository.ensure_loaded)
+readiness.add_warmup("leaderboard", leaderboard.ensure_loaded)
+readiness.add_warmup("gazetteer", _warm_gazetteer)
+readiness.add_warmup("smoke_polygons", _warm_smoke_polygons)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _register_prefetch_sources():
+    # The warm-up just fetched the smoke polygons; the first refresh is due when they go stale
+    age = climate_hazards.smoke_snapshot_age_s()
+    smoke_delay = 0.0 if age is None else max(0.0, climate_hazards.smoke_ttl_s - age)
+    prefetcher.add("smoke", climate_hazards.refresh_smoke, climate_hazards.smoke_ttl_s, initial_delay_s=smoke_delay)
+    if climate_hazards.firms_key:
+        prefetcher.add("firms", climate_hazards.refresh_firms, climate_hazards.firms_ttl_s, per_region=True)
+    emaps = container.get("electricity_maps")
+    if emaps.api_key:
+        prefetcher.add("carbon_latest", emaps.refresh_latest, emaps.snapshot_ttl_s, per_region=True)
+        prefetcher.add("carbon_forecast", emaps.refresh_forecast,
+                       float(os.getenv("ELECTRICITY_MAPS_FORECAST_REFRESH_S", "3600")), per_region=True)
+
+
+async def _warm_then_prefetch():
+    await readiness.run_warmup()
+    if not PREFETCH_ENABLED:
+        return
+    _register_prefetch_sources()
+    # With several workers only the snapshot leader fetches; the others read what it publishes
+    await prefetcher.run(snapshot_store.leader.try_acquire if snapshot_store is not None else None)
+
+HAZARD_SNAPSHOT_MAX_AGE_S = float(os.getenv("READY_HAZARD_MAX_AGE_S", "21600"))
+CARBON_CACHE_MAX_AGE_S = float(os.getenv("READY_CARBON_MAX_AGE_S", "7200"))
+
+
+def _check_sqlite():
+    return {"ok": True, "ping_ms": round(trip_store.ping() * 1000, 2), **trip_store.pool_status()}
+
+
+def _check_hazards():
+    age = climate_hazards.smoke_snapshot_age_s()
+    return {
+        "ok": age is not None and age <= HAZARD_SNAPSHOT_MAX_AGE_S,
+        "smoke_snapshot_age_s": None if age is None else round(age, 1),
+    }
+
+
+def _check_carbon():
+    newest = get_guard("electricity_maps").newest_cache_time()
+    age = None if newest is None else max(0.0, time.time() - newest)
+    # An empty cache only means nobody has asked yet
+    return {"ok": age is None or age <= CARBON_CACHE_MAX_AGE_S, "cache_age_s": None if age is None else round(age, 1)}
+
+
+def _check_gemini():
+    if not container.is_built("chat"):
+        # Probing must not pull the SDK in; the first chat request builds it
+        return {"ok": True, "model": None, "loaded": False}
+    chat_service = container.get("chat")
+    return {"ok": chat_service.model is not None, "model": chat_service.model_id, "loaded": True}
+
+
+def _check_prefetch():
+    status = prefetcher.status()
+    # A source that keeps failing is backing off and its snapshots are ageing
+    return {"ok": all(s["failures"] < 3 for s in status["sources"].values()), **status}
+
+
+def _check_breakers():
+    states = {name: guard.breaker.snapshot() for name, guard in sorted(all_guards().items())}
+    return {"ok": all(s["state"] != CircuitBreaker.OPEN for s in states.values()), "providers": states}
+
+
+readiness.add_check("sqlite", _check_sqlite, critical=True)
+readiness.add_check("hazards", _check_hazards)
+readiness.add_check("carbon_cache", _check_carbon)
+readiness.add_check("gemini", _check_gemini)
+readiness.add_check("prefetch", _check_prefetch)
+readiness.add_check("circuit_breakers", _check_breakers)
 
 # Configure CORS for frontend communication
 app.add_middleware(
@@ -56,6 +192,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# X-Profile + admin token: answer with a cProfile report of that one request
+app.add_middleware(RequestProfilerMiddleware)
+
+# gzip/brotli for larger bodies, plus body-hash ETags and 304s for GET responses
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
+# Added last so it is outermost: request timing includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 
 # Register Routers
 
@@ -84,6 +229,14 @@ app.include_router(maps.router)
 
 app.include_router(assistant.router)
 
+# Push channels (SSE / WebSocket) for alerts and journey updates
+app.include_router(push.router)
+
+# Operator endpoints (sampling profiler); disabled unless ADMIN_TOKEN is set
+app.include_router(admin.router)
+
+startup_clock.mark("app_setup")
+
 # ============================================================
 # AI-Powered Endpoints (Vision & Chat Services)
 # ============================================================
@@ -102,6 +255,7 @@ class ImageAnalysisResponse(BaseModel):
 class SpeechInterpretRequest(BaseModel):
     """Request model for speech interpretation"""
     text: str = Field(..., min_length=1, description="Messy speech-to-text input")
+    user_id: Optional[str] = Field(None, min_length=1, description="Rider whose confirmed corrections apply")
 
 
 class SpeechInterpretResponse(BaseModel):
@@ -110,6 +264,13 @@ class SpeechInterpretResponse(BaseModel):
     original_text: str
 
 
+class DestinationConfirmRequest(BaseModel):
+    """Request model for confirming a speech interpretation"""
+    user_id: str = Field(..., min_length=1, description="Rider the correction is learned for")
+    text: str = Field(..., min_length=1, description="Messy speech-to-text input")
+    destination: str = Field(..., min_length=1, description="Destination the user confirmed")
+
+
 class ChatSynthesisRequest(BaseModel):
     """Request model for chat synthesis"""
     transit: str = Field(..., description="Transit information (e.g., 'Bus 504, 15 mins')")
@@ -122,8 +283,12 @@ class ChatSynthesisResponse(BaseModel):
     message: str
 
 
-@app.post("/api/vision/analyze", response_model=ImageAnalysisResponse, tags=["AI Services"])
-async def analyze_transit_image(file: UploadFile = File(...)):
+@app.post("/api/vision/analyze", response_model=ImageAnalysisResponse, tags=["AI Services"],
+          dependencies=[Depends(ai_rate_limit)])
+async def analyze_transit_image(
+    file: UploadFile = File(...),
+    vision_service: VisionService = Depends(get_vision_service),
+):
     """
     Analyze an image of a transit station for accessibility hazards
     
@@ -164,8 +329,12 @@ async def analyze_transit_image(file: UploadFile = File(...)):
         )
 
 
-@app.post("/api/chat/interpret-speech", response_model=SpeechInterpretResponse, tags=["AI Services"])
-async def interpret_speech_to_destination(request: SpeechInterpretRequest):
+@app.post("/api/chat/interpret-speech", response_model=SpeechInterpretResponse, tags=["AI Services"],
+          dependencies=[Depends(ai_rate_limit)])
+async def interpret_speech_to_destination(
+    request: SpeechInterpretRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+):
     """
     Interpret messy speech-to-text input into a clean destination name
     
@@ -191,7 +360,7 @@ async def interpret_speech_to_destination(request: SpeechInterpretRequest):
     **Note:** Requires GEMINI_API_KEY in environment
     """
     try:
-        corrected = chat_service.interpret_destination(request.text)
+        corrected = chat_service.interpret_destination(request.text, request.user_id)
         
         return SpeechInterpretResponse(
             corrected_destination=corrected,
@@ -205,8 +374,38 @@ async def interpret_speech_to_destination(request: SpeechInterpretRequest):
         )
 
 
-@app.post("/api/chat/synthesize", response_model=ChatSynthesisResponse, tags=["AI Services"])
-async def synthesize_trip_message(request: ChatSynthesisRequest):
+@app.post("/api/chat/confirm-destination", tags=["AI Services"])
+async def confirm_interpreted_destination(
+    request: DestinationConfirmRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    """
+    Record a confirmed speech correction so the same input resolves locally next time
+    
+    **Functionality:**
+    - Maps the normalized input straight to the confirmed destination, for this rider only
+    - Similar-sounding inputs from the same rider resolve to it too
+    - Never remaps a known stop name, and never changes what other riders get
+    
+    **Parameters:**
+    - user_id: The rider the correction belongs to
+    - text: The original messy speech-to-text input
+    - destination: The destination name the user confirmed or corrected to
+    """
+    chat_service.confirm_destination(request.user_id, request.text, request.destination)
+    worker_sync.emit("destinations", {"user_id": request.user_id, "text": request.text, "destination": request.destination})
+    return {"status": "learned", "destination": request.destination.strip()}
+
+
+worker_sync.on("destinations", lambda e: container.get("destinations").learn(e["user_id"], e["text"], e["destination"]))
+
+
+@app.post("/api/chat/synthesize", response_model=ChatSynthesisResponse, tags=["AI Services"],
+          dependencies=[Depends(ai_rate_limit)])
+async def synthesize_trip_message(
+    request: ChatSynthesisRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+):
     """
     Synthesize a user-friendly message from transit, climate, and vision data
     
@@ -251,6 +450,11 @@ async def synthesize_trip_message(request: ChatSynthesisRequest):
         )
 
 
+# Create the per-route metric children now rather than on each route's first request
+http_metrics.prime(app.routes)
+startup_clock.mark("routes")
+
+
 # ============================================================
 # Main Entry Point
 # ============================================================
@@ -258,6 +462,8 @@ async def synthesize_trip_message(request: ChatSynthesisRequest):
 if __name__ == "__main__":
     import uvicorn
     
+    # Development server (one process, auto-reload). For production, with one worker
+    # per CPU and shared state between them, run serve.py instead.
     # Run the application with: uvicorn main:app --reload
     uvicorn.run(
         app,
@@ -0,0 +1,7 @@
+# backend/middleware/__init__.py
+# ASGI middleware registered in main.py
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import RequestProfilerMiddleware
+
+__all__ = ["CompressionMiddleware", "MetricsMiddleware", "RequestProfilerMiddleware"]
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+# Already-compressed or streaming bodies are passed through untouched
+_SKIP_TYPES = ("text/event-stream", "image/", "audio/", "video/", "application/zip", "application/gzip")
+_NOT_MODIFIED_HEADERS = (b"etag", b"cache-control", b"vary", b"content-location", b"expires")
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_base(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ("-gzip", "-br"):
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)]
+    return tag
+
+
+class CompressionMiddleware:
+    """
+    Compression plus validators for buffered (non-streaming) responses.
+
+    - GET 200 responses without an ETag get a strong one hashed from the body bytes,
+      and a matching If-None-Match is answered with 304 and no body.
+    - Bodies of at least `minimum_size` bytes are compressed with brotli (if
+      installed and accepted) or gzip. The ETag then gets an encoding suffix, since
+      the bytes differ per encoding; If-None-Match matches any encoding of the same body.
+    - Streaming responses (SSE, anything sent in several chunks) pass through as-is.
+
+    Pure ASGI rather than BaseHTTPMiddleware, so streaming and WebSockets are untouched.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_headers = scope.get("headers") or []
+        accept = (_header(req_headers, b"accept-encoding") or b"").decode("latin-1")
+        if_none_match = (_header(req_headers, b"if-none-match") or b"").decode("latin-1")
+        is_get = scope.get("method") in ("GET", "HEAD")
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start = message
+                ctype = (_header(message.get("headers") or [], b"content-type") or b"").decode("latin-1")
+                if ctype.startswith(_SKIP_TYPES):
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                # Chunked/streaming body: we can't hash or compress it in one go
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            await self._finish(start, message.get("body", b""), send, accept, if_none_match, is_get)
+
+        await self.app(scope, receive, wrapped_send)
+
+    async def _finish(
+        self,
+        start: Message,
+        body: bytes,
+        send: Send,
+        accept: str,
+        if_none_match: str,
+        is_get: bool,
+    ) -> None:
+        status = start["status"]
+        headers: List[Tuple[bytes, bytes]] = list(start.get("headers") or [])
+
+        etag = _header(headers, b"etag")
+        if etag is None and is_get and status == 200 and body:
+            etag = b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode("ascii") + b'"'
+            headers.append((b"etag", etag))
+
+        # Pick the encoding before revalidating, so a 304 carries the same validator
+        # (and Vary) as the 200 it stands in for
+        coding = None
+        if len(body) >= self.minimum_size and _header(headers, b"content-encoding") is None and status not in (204, 304):
+            if brotli is not None and _accepts(accept, "br"):
+                coding = "br"
+            elif _accepts(accept, "gzip"):
+                coding = "gzip"
+
+        if coding is not None and etag is not None:
+            base = _etag_base(etag.decode("latin-1"))
+            etag = f'"{base}-{coding}"'.encode("latin-1")
+            headers = [(k, v) for k, v in headers if k.lower() != b"etag"]
+            headers.append((b"etag", etag))
+
+        if len(body) >= self.minimum_size or coding is not None:
+            vary = _header(headers, b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+                headers.append((b"vary", vary + b", Accept-Encoding"))
+
+        if etag is not None and if_none_match and status == 200:
+            base = _etag_base(etag.decode("latin-1"))
+            tags = [t for t in if_none_match.split(",") if t.strip()]
+            if any(t.strip() == "*" or _etag_base(t) == base for t in tags):
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(k, v) for k, v in headers if k.lower() in _NOT_MODIFIED_HEADERS],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if coding is not None:
+            if coding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", coding.encode("ascii")))
+            headers.append((b"content-length", str(len(body)).encode("ascii")))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
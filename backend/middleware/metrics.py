@@ -0,0 +1,49 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.metrics import HttpMetrics, http_metrics
+
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency histogram, in-flight gauge and status-class counters.
+
+    The route label is the matched route's path template, read back from the ASGI
+    scope after the app has run (FastAPI's router stores the matched route there);
+    requests that match no route are counted under one "<unmatched>" label. Latency
+    runs until the last body chunk is handed to the server, so streaming responses
+    (SSE) are counted for as long as they stay open.
+
+    Register it last so it is the outermost middleware and times everything else.
+    """
+
+    def __init__(self, app: Any, metrics: Optional[HttpMetrics] = None) -> None:
+        self.app = app
+        self.metrics = metrics or http_metrics
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500  # if the app raises before responding, the server answers 500
+        metrics.in_flight.inc()
+        start = time.perf_counter()
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight.dec()
+            metrics.for_route(scope.get("route"), scope["method"]).record(status, elapsed)
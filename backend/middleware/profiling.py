@@ -0,0 +1,100 @@
+import cProfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.admin_auth import bearer_token, is_admin
+from services.profiler import profile_summary
+
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+_SORT_KEYS = {"cumulative", "tottime", "calls", "ncalls", "time"}
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for k, v in scope.get("headers") or ():
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+class RequestProfilerMiddleware:
+    """
+    Per-request cProfile, opted into with an `X-Profile` header plus the admin token
+    (`Authorization: Bearer ...` or `X-Admin-Token`).
+
+    The profiled request runs normally, but its response is replaced with the pstats
+    report (text/plain); the handler's own status is in `X-Profiled-Status`. The header
+    value picks the sort order ("cumulative" by default, or "tottime", "calls").
+
+    cProfile hooks the event loop thread, so the report covers async handlers and
+    whatever else the loop ran meanwhile, but not work handed to worker threads
+    (run_in_threadpool, asyncio.to_thread). One profiled request at a time; a second
+    one gets 409. Requests without the header only pay for the header scan.
+    """
+
+    def __init__(self, app: Any, limit: int = 40) -> None:
+        self.app = app
+        self.limit = limit
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sort = _header(scope, b"x-profile")
+        if sort is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = bearer_token(_header(scope, b"authorization")) or _header(scope, b"x-admin-token")
+        if not is_admin(token):
+            await self.app(scope, receive, send)  # not an admin: the header is ignored
+            return
+        if not self._busy.acquire(blocking=False):
+            await self._send_text(send, 409, "Another request is being profiled\n", {})
+            return
+
+        status = 500
+        body_bytes = 0
+
+        async def swallow(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                await self.app(scope, receive, swallow)
+            finally:
+                profile.disable()
+        finally:
+            self._busy.release()
+        elapsed = time.perf_counter() - start
+
+        sort_key = sort.strip().lower()
+        report = profile_summary(profile, sort_key if sort_key in _SORT_KEYS else "cumulative", self.limit)
+        head = f"{scope['method']} {scope['path']} -> {status}, {body_bytes} bytes in {elapsed * 1000:.1f} ms\n\n"
+        await self._send_text(send, 200, head + report, {
+            b"x-profiled-status": str(status).encode("ascii"),
+            b"x-profiled-ms": f"{elapsed * 1000:.1f}".encode("ascii"),
+        })
+
+    @staticmethod
+    async def _send_text(send: Send, status: int, text: str, extra: Dict[bytes, bytes]) -> None:
+        body = text.encode("utf-8")
+        headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"cache-control", b"no-store"),
+        ]
+        headers.extend(extra.items())
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
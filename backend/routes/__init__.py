@@ -9,4 +9,6 @@ from . import carbon_intensity
 from . import hazards
 from . import education
 from . import maps
-from . import assistant
\ No newline at end of file
+from . import assistant
+from . import push
+from . import admin
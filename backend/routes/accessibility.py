@@ -1,10 +1,15 @@
 # backend/routes/accessibility.py
 # Accessibility information and alerts endpoints
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
+from services.admin_auth import require_admin
+from services.alert_store import ALERT_TYPES, SEVERITIES, alert_store
+from services.shared_state import worker_sync
+from services.station_repository import MAX_BATCH, station_repository
+
 router = APIRouter(prefix="/api", tags=["Accessibility"])
 
 
@@ -28,6 +33,26 @@ class StationAccessibilityInfo(BaseModel):
     visual_displays: bool
     elevators_working: bool
     accessible_restrooms: bool
+    active_alerts: List[dict] = []
+
+class StationBatchRequest(BaseModel):
+    """Station IDs for a batch accessibility lookup (e.g. every stop on a route)"""
+    station_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH)
+
+
+class AlertIn(BaseModel):
+    """An accessibility alert event (e.g. from station staff or an operator system)"""
+    alert_id: Optional[str] = None
+    station_id: Optional[str] = None
+    station_ids: Optional[List[str]] = None
+    station_name: Optional[str] = None
+    alert_type: Optional[str] = Field(None, description=f"One of: {', '.join(ALERT_TYPES)}")
+    severity: str = Field("medium", description=f"One of: {', '.join(SEVERITIES)}")
+    message: str = ""
+    affected_accessibility: Optional[List[str]] = None
+    estimated_resolution_time: Optional[str] = None
+    ttl_s: Optional[float] = Field(None, gt=0, description="Seconds until the alert expires")
+
 
 class AccessibilityNeedsRequest(BaseModel):
     """User input for accessibility needs."""
@@ -46,7 +71,8 @@ class AccessibilityNeeds(BaseModel):
 
 @router.get(
     "/station/{station_id}/accessibility",
-    response_model=StationAccessibilityInfo
+    response_class=Response,
+    responses={200: {"model": StationAccessibilityInfo}},
 )
 async def get_station_accessibility(station_id: str):
     """
@@ -65,38 +91,71 @@ async def get_station_accessibility(station_id: str):
     - List of available accessibility features
     - Status of elevators, restrooms, audio/visual systems
     
-    **Note:** Currently returns mock data. To be integrated with database.
+    **Note:** Served from `services/station_repository.py` (GTFS stops/pathways plus
+    the accessibility CSV) with active alerts applied. Without station data loaded,
+    every ID gets a placeholder record.
     """
-    # TODO: Replace with actual database query
-    mock_data = {
-        "station_id": station_id,
-        "station_name": f"Station {station_id}",
-        "features": [
-            AccessibilityFeature(
-                feature_id="elevator_1",
-                feature_name="Main Entrance Elevator",
-                is_available=True,
-                description="Accessible elevator with audio and Braille buttons"
-            ),
-            AccessibilityFeature(
-                feature_id="ramp_1",
-                feature_name="Wheelchair Ramp",
-                is_available=True,
-                description="Gentle slope ramp meeting ADA standards"
-            )
-        ],
-        "wheelchair_accessible": True,
-        "audio_announcements": True,
-        "visual_displays": True,
-        "elevators_working": True,
-        "accessible_restrooms": True
-    }
-    return mock_data
+    body = station_repository.get_bytes(station_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Station not found")
+    # Short max-age: alerts change the record; after that the ETag makes revalidation a 304
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "public, max-age=30"})
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _station_batch(station_ids: List[str], if_none_match: Optional[str]) -> Response:
+    ids = list(dict.fromkeys(s.strip() for s in station_ids if s and s.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No station IDs given")
+    if len(ids) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} station IDs per request")
+
+    etag = station_repository.batch_etag(ids)
+    # no-cache: clients may store the body but must revalidate, which costs a 304 until a station changes
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=station_repository.batch_bytes(ids), media_type="application/json", headers=headers)
+
+
+@router.get("/stations/accessibility")
+async def get_stations_accessibility(
+    ids: str = Query(..., description="Comma-separated station IDs"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Accessibility records for many stations in one request
+
+    **Returns:**
+    - `stations`: station_id -> the same record as `/api/station/{station_id}/accessibility`,
+      including active alerts
+    - `missing`: requested IDs that are not known stations
+
+    **Note:** The response carries an ETag for this exact station list; send it back in
+    `If-None-Match` to get `304 Not Modified` while none of the stations has changed.
+    Use the POST form for lists too long for a URL.
+    """
+    return _station_batch(ids.split(","), if_none_match)
+
+
+@router.post("/stations/accessibility")
+async def post_stations_accessibility(req: StationBatchRequest, if_none_match: Optional[str] = Header(None)):
+    """Same as the GET form, with the station IDs in the request body."""
+    return _station_batch(req.station_ids, if_none_match)
 
 
 @router.get("/alerts")
 async def get_accessibility_alerts(
-    station_id: Optional[str] = Query(None, description="Filter alerts by station ID")
+    station_id: Optional[str] = Query(None, description="Filter alerts by station ID"),
+    station_ids: Optional[str] = Query(None, description="Comma-separated station IDs; returns alerts grouped per station"),
+    severity: Optional[str] = Query(None, description="Filter by severity: high, medium or low"),
+    affected: Optional[str] = Query(None, description="Filter by affected group, e.g. wheelchair"),
 ):
     """
     Retrieve real-time accessibility alerts
@@ -108,30 +167,76 @@ async def get_accessibility_alerts(
     
     **Parameters:**
     - station_id (optional): Filter to specific station
+    - station_ids (optional): Bulk lookup for several stations (e.g. along a route)
+    - severity / affected (optional): Further filters
     
     **Returns:**
-    - List of active accessibility alerts with severity level
+    - List of active accessibility alerts with severity level, most severe first
     
-    **Note:** Currently returns mock data. To be integrated with real-time system.
+    **Note:** Alerts come from `services/alert_store.py`: POSTed events plus the
+    GTFS-Realtime style feed file named by ACCESSIBILITY_ALERTS_FEED, if set.
     """
-    # TODO: Integrate with real-time alert system
-    mock_alerts = [
-        {
-            "alert_id": "alert_001",
-            "station_id": "stn_downtown",
-            "station_name": "Downtown Station",
-            "severity": "high",
-            "message": "Main elevator out of service for maintenance",
-            "affected_accessibility": ["wheelchair", "mobility_impaired"],
-            "estimated_resolution_time": "2 hours"
-        }
-    ]
-    
-    # Filter by station if provided
-    if station_id:
-        mock_alerts = [a for a in mock_alerts if a["station_id"] == station_id]
-    
-    return {"alerts": mock_alerts, "total_alerts": len(mock_alerts)}
+    alert_store.refresh_from_feed()
+
+    if station_ids:
+        ids = [s.strip() for s in station_ids.split(",") if s.strip()]
+
+        def wanted(a: dict) -> bool:
+            return (not severity or a["severity"] == severity.lower()) and (
+                not affected or affected.lower() in a["affected_accessibility"]
+            )
+
+        # Both views get the same filters; stations left with no matching alert are dropped
+        by_station = {}
+        for sid, station_alerts in alert_store.alerts_for_stations(ids).items():
+            kept = [a for a in station_alerts if wanted(a)]
+            if kept:
+                by_station[sid] = kept
+        seen = {}
+        for station_alerts in by_station.values():
+            for a in station_alerts:
+                seen[a["alert_id"]] = a
+        alerts = list(seen.values())
+        return {"alerts": alerts, "total_alerts": len(alerts), "by_station": by_station}
+
+    alerts = alert_store.query(station_id=station_id, severity=severity, affected=affected)
+    return {"alerts": alerts, "total_alerts": len(alerts)}
+
+
+@router.post("/alerts", status_code=201, dependencies=[Depends(require_admin)])
+async def create_accessibility_alert(alert: AlertIn):
+    """
+    Ingest an accessibility alert event. Posting an existing alert_id replaces it.
+    Alerts expire after `ttl_s` seconds (default ACCESSIBILITY_ALERT_TTL_S, 6 hours).
+    Operator-only (ADMIN_TOKEN), like DELETE: every worker and push client sees the change.
+    """
+    try:
+        stored = alert_store.upsert(alert.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The stored form carries the generated alert_id and absolute expiry, so replicas match
+    worker_sync.emit("alerts", {"op": "upsert", "alert": {**stored, "no_expiry": stored["expires_at"] is None}})
+    return stored
+
+
+@router.delete("/alerts/{alert_id}", dependencies=[Depends(require_admin)])
+async def resolve_accessibility_alert(alert_id: str):
+    """Remove an alert once the issue is resolved."""
+    if not alert_store.remove(alert_id):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    worker_sync.emit("alerts", {"op": "remove", "alert_id": alert_id})
+    return {"alert_id": alert_id, "resolved": True}
+
+
+def _replay_alert(event: dict) -> None:
+    # Posted/resolved in another worker; the store's listeners push it to this worker's clients
+    if event["op"] == "upsert":
+        alert_store.upsert(event["alert"])
+    else:
+        alert_store.remove(event["alert_id"])
+
+
+worker_sync.on("alerts", _replay_alert)
 
 @router.post("/accessibility/needs", response_model=AccessibilityNeeds)
 async def interpret_accessibility_needs(req: AccessibilityNeedsRequest):
@@ -0,0 +1,58 @@
+# backend/routes/admin.py
+# Operator-only endpoints (ADMIN_TOKEN): on-demand profiling and start-up timings of a running worker
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from services.admin_auth import require_admin
+from services.container import container, startup_clock
+from services.profiler import sampler
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"], include_in_schema=False)
+
+MAX_PROFILE_SECONDS = 120.0
+
+
+@router.post("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def sample_profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(10.0, ge=1.0, le=1000.0),
+    mode: str = Query("cpu", pattern="^(cpu|wall)$", description="cpu: SIGPROF on CPU time; wall: sampling thread"),
+):
+    """
+    Sample this worker's stacks for `seconds` and return collapsed stacks
+    (`frame;frame;frame count` per line) for flamegraph.pl or speedscope.
+
+    "cpu" mode (default) samples on CPU time and suits a busy event loop; "wall" also
+    catches time spent in worker threads and waiting. An async handler on purpose: it
+    runs on the event loop (main) thread, the only thread that may install the SIGPROF
+    handler. With several workers, only the one that receives this request is profiled.
+    """
+    try:
+        used = sampler.start(interval_ms / 1000.0, mode)
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "X-Profile-Mode": used,
+            "X-Profile-Samples": str(sampler.samples),
+            "X-Profile-Seconds": f"{sampler.duration_s:.3f}",
+        },
+    )
+
+
+@router.get("/startup", dependencies=[Depends(require_admin)])
+def startup_report():
+    """
+    Cold-start breakdown for this worker: wall time per start-up phase (imports, app
+    set-up, route registration, lifespan) and, per lazily built service, whether it has
+    been constructed yet and how long that took.
+    """
+    return {"startup": startup_clock.report(), "services": container.report()}
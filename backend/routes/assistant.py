@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
 from services.assistant_service import process_assistant_query
 import logging
 
@@ -8,13 +10,16 @@ router = APIRouter()
 
 class AssistantQueryRequest(BaseModel):
     text: str
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128,
+                                      description="Conversation to continue (e.g. the rider's id); defaults to one per client address")
 
 @router.post("/query")
-async def assistant_query(req: AssistantQueryRequest):
+async def assistant_query(req: AssistantQueryRequest, request: Request):
     """Voice assistant endpoint - no API key needed"""
+    session_id = req.session_id or (f"client:{request.client.host}" if request.client else "default")
     try:
-        result = await process_assistant_query(req.text, openai_client=None)
+        result = await process_assistant_query(req.text, session_id=session_id, openai_client=None)
         return result
     except Exception as e:
         logger.error(f"Assistant query error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
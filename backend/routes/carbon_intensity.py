@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 
@@ -23,11 +23,14 @@ class RecommendTimeItem(BaseModel):
 
 @router.get("/lowest-intensity", response_model=List[LowestIntensityItem])
 def get_lowest_intensity(
+    response: Response,
     location: str = Query(..., description="Location name, e.g. 'Vancouver'"),
     limit: int = Query(5, ge=1, le=24, description="How many best hours to return")
 ):
     init_db()
     rows = lowest_intensity_times(location, limit=limit)
+    # Historical readings: they only change when the DB is reseeded
+    response.headers["Cache-Control"] = "public, max-age=3600"
     return [{"ts_utc": ts, "carbon_gco2_per_kwh": val} for ts, val in rows]
 
 
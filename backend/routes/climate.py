@@ -1,14 +1,25 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import math
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Tuple
 
+from services.carbon_forecast import carbon_forecaster
 from services.climate_service import ClimateEngine
+from services.container import container
+from services.departure_optimizer import DepartureOptimizer
 from services.electricity_maps_service import ElectricityMapsService
+from services.emissions_service import EmissionsService
+from services.gamification import record_trip_event
 
 router = APIRouter(prefix="/api", tags=["Impact Tracking"])
 
-climate_engine = ClimateEngine()
-_emaps = ElectricityMapsService()
+get_climate_engine = container.provider("climate_engine")
+get_electricity_maps = container.provider("electricity_maps")
+get_departure_optimizer = container.provider("departure_optimizer")
+get_emissions = container.provider("emissions")
 
 
 class TripRequest(BaseModel):
@@ -20,6 +31,9 @@ class TripRequest(BaseModel):
     lon: Optional[float] = Field(None, description="Longitude (for live carbon intensity)")
     include_recommended_times: bool = Field(False, description="If true, include low-emission departure times")
 
+    # Optional: record the trip against this user's stats
+    user_id: Optional[str] = Field(None, min_length=1, description="User to credit the trip to")
+
 
 class ImpactResponse(BaseModel):
     mode: str
@@ -30,31 +44,54 @@ class ImpactResponse(BaseModel):
     points_earned: int
 
     carbon_intensity_gco2_per_kwh: Optional[float] = None
+    carbon_intensity_source: Optional[str] = None  # "live", "stale" (live, past its refresh), "history" or None (default grid value)
     recommended_departure_times: Optional[List[Dict[str, Any]]] = None
+    new_badges: Optional[List[Dict[str, Any]]] = None
 
 
-@router.post("/calculate-impact", response_model=ImpactResponse)
-async def calculate_impact(trip: TripRequest):
-    if trip.distance_km < 0:
-        raise HTTPException(status_code=400, detail="Distance cannot be negative")
-
-    valid_modes = ["bus", "walk", "bike", "subway", "car", "train", "skytrain", "electric"]
-    if trip.mode.lower() not in valid_modes:
-        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {', '.join(valid_modes)}")
-
+def _grid_carbon(
+    trip: TripRequest, emaps: ElectricityMapsService
+) -> Tuple[Optional[Any], Optional[str], Optional[List[Dict[str, Any]]]]:
+    """(carbon intensity, its source, recommended departure times) for a trip."""
     carbon_intensity = None
     recommended = None
 
     # Step 5: If lat/lon + API key exist, use live grid intensity
     if trip.lat is not None and trip.lon is not None:
-        latest = _emaps.latest_carbon_intensity(lat=trip.lat, lon=trip.lon)
+        latest = emaps.latest_carbon_intensity(lat=trip.lat, lon=trip.lon)
         if isinstance(latest, dict):
             # try common keys
             carbon_intensity = latest.get("carbonIntensity") or latest.get("carbon_intensity") or latest.get("value")
 
         # Step 5: recommend low-emission travel times
         if trip.include_recommended_times:
-            recommended = _emaps.recommend_low_emission_times(lat=trip.lat, lon=trip.lon, top_n=3, horizon_hours=24) or None
+            recommended = emaps.recommend_low_emission_times(lat=trip.lat, lon=trip.lon, top_n=3, horizon_hours=24) or None
+
+    carbon_source = None
+    if carbon_intensity is not None:
+        carbon_source = "stale" if latest.get("stale") else "live"
+    if carbon_intensity is None:
+        # Provider has nothing for us: estimate from recorded history, not the flat default
+        carbon_intensity = carbon_forecaster.estimate(trip.lat, trip.lon)
+        carbon_source = "history" if carbon_intensity is not None else None
+    return carbon_intensity, carbon_source, recommended
+
+
+@router.post("/calculate-impact", response_model=ImpactResponse)
+async def calculate_impact(
+    trip: TripRequest,
+    climate_engine: ClimateEngine = Depends(get_climate_engine),
+    emaps: ElectricityMapsService = Depends(get_electricity_maps),
+):
+    if trip.distance_km < 0:
+        raise HTTPException(status_code=400, detail="Distance cannot be negative")
+
+    valid_modes = ["bus", "walk", "bike", "subway", "car", "train", "skytrain", "electric"]
+    if trip.mode.lower() not in valid_modes:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Must be one of: {', '.join(valid_modes)}")
+
+    # Provider calls and the history lookup block, so they run off the event loop
+    carbon_intensity, carbon_source, recommended = await asyncio.to_thread(_grid_carbon, trip, emaps)
 
     result = climate_engine.calculate_savings(
         distance_km=trip.distance_km,
@@ -62,7 +99,73 @@ async def calculate_impact(trip: TripRequest):
         carbon_gco2_per_kwh=float(carbon_intensity) if carbon_intensity is not None else None
     )
 
+    result["carbon_intensity_source"] = carbon_source
+
+    if trip.user_id:
+        event = await asyncio.to_thread(record_trip_event, trip.user_id, result)
+        result["new_badges"] = event["new_badges"]
+
     if recommended is not None:
         result["recommended_departure_times"] = recommended
 
     return result
+
+
+class TripSegment(BaseModel):
+    mode: str = Field(..., description="Transit mode of this leg, e.g. 'walk', 'bus', 'skytrain'")
+    minutes: float = Field(..., gt=0, description="Time spent on this leg")
+    distance_km: Optional[float] = Field(None, gt=0, description="Leg distance; estimated from minutes if omitted")
+
+
+class DepartureRequest(BaseModel):
+    lat: float = Field(..., description="Latitude (grid carbon-intensity forecast)")
+    lon: float = Field(..., description="Longitude (grid carbon-intensity forecast)")
+    segments: List[TripSegment] = Field(..., min_length=1, description="The trip's legs, in order")
+    earliest: Optional[datetime] = Field(None, description="Earliest departure (default now, UTC if no offset)")
+    window_hours: float = Field(12.0, gt=0, le=48, description="How far after `earliest` to look")
+    headway_minutes: float = Field(10.0, gt=0, le=240, description="Candidate spacing when no timetable is given")
+    departures: Optional[List[datetime]] = Field(None, max_length=2000, description="Scheduled departure times to choose from")
+    top_n: int = Field(3, ge=1, le=20)
+    delay_weight_kg_per_min: float = Field(0.001, ge=0, description="CO2 (kg) one minute of waiting or riding is worth")
+
+
+@router.post("/optimize-departure")
+def optimize_departure(
+    req: DepartureRequest,
+    emaps: ElectricityMapsService = Depends(get_electricity_maps),
+    emit: EmissionsService = Depends(get_emissions),
+    optimizer: DepartureOptimizer = Depends(get_departure_optimizer),
+):
+    """
+    Best departure times for a trip: the grid intensity under its electric legs
+    (forecast), against the wait and ride time. Unlike recommend_low_emission_times
+    this only considers departures that can actually be taken and accounts for how
+    long the trip runs.
+    """
+    segments = [
+        {"mode": s.mode, "minutes": s.minutes,
+         "distance_km": s.distance_km or emit.estimate_distance_km(s.mode, int(round(s.minutes)))}
+        for s in req.segments
+    ]
+    earliest = req.earliest or datetime.now(timezone.utc)
+    ride_hours = sum(s.minutes for s in req.segments) / 60.0
+    horizon = min(72, math.ceil(req.window_hours + ride_hours) + 1)
+
+    live = emaps.forecast_carbon_intensity(lat=req.lat, lon=req.lon, horizon_hours=horizon)
+    # Hours the live forecast lacks (or all of them, if it is down) come from recorded history
+    forecast = carbon_forecaster.fill(req.lat, req.lon, earliest, horizon, live)
+    if not forecast:
+        return {"forecast_available": False, "history_hours": 0, "best": [], "earliest": None, "candidates": 0}
+
+    result = optimizer.optimize_departures(
+        forecast,
+        segments,
+        earliest,
+        window_hours=req.window_hours,
+        headway_minutes=req.headway_minutes,
+        departures=req.departures,
+        top_n=req.top_n,
+        delay_weight_kg_per_min=req.delay_weight_kg_per_min,
+    )
+    history_hours = sum(1 for p in forecast if p.get("source") == "history")
+    return {"forecast_available": True, "history_hours": history_hours, **result}
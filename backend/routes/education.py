@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query, Response
 from services.climate_education_service import ClimateEducationService
+from services.container import container
 
 router = APIRouter(prefix="/api/climate", tags=["Climate (Education)"])
-_edu = ClimateEducationService()
+get_education = container.provider("education")
 
 
 @router.get("/education/tip")
-def get_tip(has_smoke: bool = Query(False)):
-    return _edu.tip_for_context(has_smoke=has_smoke)
+def get_tip(
+    response: Response,
+    has_smoke: bool = Query(False),
+    edu: ClimateEducationService = Depends(get_education),
+):
+    # Any tip will do for a few minutes; lets browsers/CDNs answer repeats
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return edu.tip_for_context(has_smoke=has_smoke)
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Query
 from typing import List, Optional
 
-from services.climate_hazards_service import ClimateHazardsService
+from services.climate_hazards_service import climate_hazards
+from services.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/api/climate", tags=["Climate (Hazards)"])
-_haz = ClimateHazardsService()
+_haz = climate_hazards
 
 
-@router.get("/hazards")
-def get_climate_hazards(
+@router.get("/hazards", response_class=FastJSONResponse)
+async def get_climate_hazards(
     lat: float = Query(...),
     lon: float = Query(...),
     impairments: Optional[str] = Query(None, description="Comma-separated impairments (e.g., 'asthma,vision,wheelchair')")
@@ -17,4 +18,4 @@ def get_climate_hazards(
     if impairments:
         impairment_list = [x.strip() for x in impairments.split(",") if x.strip()]
 
-    return _haz.get_hazards(lat=lat, lon=lon, impairments=impairment_list)
+    return FastJSONResponse(await _haz.get_hazards_async(lat=lat, lon=lon, impairments=impairment_list))
@@ -2,6 +2,10 @@
 # Health check and status endpoints
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+
+from services.metrics import CONTENT_TYPE, registry
+from services.readiness import readiness
 
 router = APIRouter(tags=["Health"])
 
@@ -26,3 +30,33 @@ def health_check():
     Returns: Service health status
     """
     return {"status": "healthy", "service": "transit-api"}
+
+
+@router.get("/live")
+def liveness():
+    """
+    Liveness probe: the process is up and serving its event loop.
+    Deliberately checks nothing else, so a failing upstream never gets the worker restarted.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def readiness_check():
+    """
+    Readiness probe: 503 until the start-up warm-up has run (smoke polygons, gazetteer,
+    station data) or while a critical dependency (the SQLite pool) is failing.
+    The body reports every probe: pool state, hazard snapshot age, carbon cache
+    freshness, Gemini availability and circuit-breaker states.
+    """
+    ready, body = readiness.report()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint: per-route request latency, in-flight requests and
+    status counts, plus per-provider call latency, outcomes and cache hits/misses
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,8 +1,30 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
 from fastapi import APIRouter, HTTPException, Query
+from services.fast_json import FastJSONResponse
+from services.geometry import compact_steps, shape_geometry
 from services.maps_service import geocode, route_osrm
 
 router = APIRouter(prefix="/api/maps", tags=["Maps"])
 
+
+def _shape_route(
+    r0: Dict[str, Any], geometry_format: str, zoom: Optional[float], tolerance_m: Optional[float],
+    simplify: str, steps: str,
+) -> Tuple[Any, Dict[str, Any], List[Dict[str, Any]]]:
+    """(geometry, simplification info, legs) for one OSRM route, as the request asked for them."""
+    geometry, simplification = shape_geometry(
+        r0.get("geometry"), fmt=geometry_format, zoom=zoom, tolerance_m=tolerance_m, method=simplify,
+    )
+    legs = r0.get("legs", [])
+    if steps == "compact":
+        legs = compact_steps(legs)
+    elif steps == "none":
+        legs = [{"distance_m": leg.get("distance"), "duration_s": leg.get("duration"), "summary": leg.get("summary")} for leg in legs]
+    return geometry, simplification, legs
+
+
 @router.get("/geocode")
 async def maps_geocode(
     q: str = Query(..., min_length=2),
@@ -22,13 +44,19 @@ async def maps_geocode(
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Geocoding failed: {e}")
 
-@router.get("/route")
+@router.get("/route", response_class=FastJSONResponse)
 async def maps_route(
     origin_lat: float,
     origin_lon: float,
     dest_lat: float,
     dest_lon: float,
     profile: str = Query("foot", pattern="^(foot|driving|cycling)$"),
+    geometry_format: str = Query("geojson", alias="format", pattern="^(geojson|polyline|polyline6)$",
+                                 description="geojson LineString, or a Google encoded polyline (precision 5 or 6)"),
+    zoom: Optional[float] = Query(None, ge=0, le=22, description="Map zoom the route is drawn at; sets the simplification tolerance"),
+    tolerance_m: Optional[float] = Query(None, ge=0, le=1000, description="Explicit simplification tolerance in metres (overrides zoom)"),
+    simplify: str = Query("dp", pattern="^(dp|vw)$", description="dp = Douglas-Peucker, vw = Visvalingam-Whyatt"),
+    steps: str = Query("compact", pattern="^(compact|full|none)$", description="Leg steps: trimmed, raw OSRM, or omitted"),
 ):
     try:
         data = await route_osrm(origin_lat, origin_lon, dest_lat, dest_lon, profile=profile)
@@ -36,13 +64,21 @@ async def maps_route(
             raise HTTPException(status_code=400, detail="No route found")
 
         r0 = data["routes"][0]
-        return {
+        # Simplifying a long route is pure-Python work in the hundreds of ms: keep it off the loop
+        geometry, simplification, legs = await asyncio.to_thread(
+            _shape_route, r0, geometry_format, zoom, tolerance_m, simplify, steps,
+        )
+
+        # Built entirely from OSRM output: serialize directly, no re-encoding pass
+        return FastJSONResponse({
             "profile": profile,
             "distance_m": r0.get("distance"),
             "duration_s": r0.get("duration"),
-            "geometry": r0.get("geometry"),  
-            "legs": r0.get("legs", []),
-        }
+            "geometry_format": geometry_format,
+            "geometry": geometry,
+            "simplification": simplification,
+            "legs": legs,
+        })
     except HTTPException:
         raise
     except Exception as e:
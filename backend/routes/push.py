@@ -0,0 +1,141 @@
+# backend/routes/push.py
+# Push channels (Server-Sent Events and WebSocket) for alerts and journey updates
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from services.alert_store import alert_store
+from services.push_broker import Message, Subscription, broker, journey_topic, station_topic
+
+router = APIRouter(prefix="/api", tags=["Push"])
+
+HEARTBEAT_S = 15.0
+
+
+def _split(stations: Optional[str]) -> List[str]:
+    return [s.strip() for s in (stations or "").split(",") if s.strip()]
+
+
+def _topics(station_ids: List[str], journey: Optional[str]) -> List[str]:
+    topics = [station_topic(s) for s in station_ids]
+    if journey:
+        topics.append(journey_topic(journey))
+    return topics
+
+
+def _snapshot(station_ids: List[str]) -> Dict[str, Any]:
+    return {"alerts": alert_store.alerts_for_stations(station_ids)}
+
+
+def _publish_alert(event: str, alert: Dict[str, Any]) -> None:
+    # One message per alert change, fanned out to everyone watching any of its stations
+    broker.publish(
+        [station_topic(s) for s in alert["station_ids"]],
+        "alert",
+        {"change": event, "alert": alert},
+    )
+
+
+alert_store.add_listener(_publish_alert)
+
+
+async def _sse_frames(request: Request, sub: Subscription, station_ids: List[str]):
+    try:
+        yield Message(0, "snapshot", _snapshot(station_ids)).sse
+        while True:
+            msg = await sub.get(timeout=HEARTBEAT_S)
+            if sub.closed or await request.is_disconnected():
+                break
+            dropped = sub.take_dropped()
+            if dropped:
+                # The client fell behind and lost messages; tell it to refetch state
+                yield Message(0, "resync", {"dropped": dropped}).sse
+            yield b": ping\n\n" if msg is None else msg.sse
+    finally:
+        broker.unsubscribe(sub)
+
+
+@router.get("/stream")
+async def stream_updates(
+    request: Request,
+    stations: Optional[str] = Query(None, description="Comma-separated station IDs to watch for alerts"),
+    journey: Optional[str] = Query(None, description="Journey session to follow (the session_id sent to /query)"),
+):
+    """
+    Server-Sent Events stream of accessibility alerts and journey updates
+
+    **Events:**
+    - `snapshot` - current alerts for the watched stations (sent first)
+    - `alert` - an alert was created, replaced, resolved or expired
+    - `journey` - the active journey advanced
+    - `resync` - the connection fell behind and dropped messages; refetch state
+
+    Replaces polling `/api/alerts`: messages are only sent when something changes.
+    """
+    station_ids = _split(stations)
+    sub = broker.subscribe(_topics(station_ids, journey))
+    return StreamingResponse(
+        _sse_frames(request, sub, station_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _pump(ws: WebSocket, sub: Subscription) -> None:
+    # The only writer on the socket: Starlette websockets don't support concurrent sends,
+    # so replies from the receive loop go through the subscription's queue too.
+    while True:
+        msg = await sub.get(timeout=HEARTBEAT_S)
+        if sub.closed:
+            return
+        dropped = sub.take_dropped()
+        if dropped:
+            await ws.send_text(Message(0, "resync", {"dropped": dropped}).text)
+        await ws.send_text('{"event":"ping"}' if msg is None else msg.text)
+
+
+@router.websocket("/ws")
+async def push_socket(
+    ws: WebSocket,
+    stations: Optional[str] = None,
+    journey: Optional[str] = None,
+):
+    """
+    WebSocket variant of /api/stream. Same events, as JSON text frames
+    ({"id", "event", "data"}). Send {"subscribe": {"stations": [...], "journey": "..."}}
+    to watch more topics on an open connection.
+    """
+    await ws.accept()
+    station_ids = _split(stations)
+    sub = broker.subscribe(_topics(station_ids, journey))
+    sender: Optional[asyncio.Task] = None
+    try:
+        sub.put(Message(0, "snapshot", _snapshot(station_ids)))
+        sender = asyncio.create_task(_pump(ws, sub))
+        while True:
+            try:
+                request = json.loads(await ws.receive_text())
+            except ValueError:
+                continue
+            more = request.get("subscribe") if isinstance(request, dict) else None
+            if isinstance(more, dict):
+                new_stations = [str(s) for s in more.get("stations") or []]
+                broker.add_topics(sub, _topics(new_stations, more.get("journey")))
+                if new_stations:
+                    sub.put(Message(0, "snapshot", _snapshot(new_stations)))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if sender is not None:
+            sender.cancel()
+        broker.unsubscribe(sub)
+
+
+@router.get("/stream/stats")
+async def stream_stats():
+    """Subscriber and message counters for this worker's push broker."""
+    return broker.stats()
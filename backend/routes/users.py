@@ -1,7 +1,10 @@
 # backend/routes/users.py
 # User engagement and gamification endpoints
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+
+from services.gamification import user_summary
+from services.leaderboard import leaderboard
 
 router = APIRouter(prefix="/api", tags=["Gamification"])
 
@@ -9,7 +12,7 @@ router = APIRouter(prefix="/api", tags=["Gamification"])
 # Routes
 
 @router.get("/user/{user_id}/stats")
-async def get_user_stats(user_id: str):
+def get_user_stats(user_id: str):
     """
     Retrieve user's eco-friendly transit engagement statistics
     
@@ -28,19 +31,47 @@ async def get_user_stats(user_id: str):
     - Badges/achievements unlocked
     - Sustainability streak
     
-    **Note:** Currently returns mock data. To be integrated with user database.
+    **Note:** Totals, badges and challenge counters are maintained incrementally as
+    trips are recorded via `POST /api/calculate-impact` with a `user_id`, so this is a
+    handful of primary-key lookups. They are SQLite reads that can wait on the
+    connection pool, so this is a plain `def` route and runs in the threadpool.
+    """
+    return user_summary(user_id)
+
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    window: str = Query("all_time", pattern="^(daily|weekly|all_time)$"),
+    metric: str = Query("points", pattern="^(points|co2_saved_kg)$"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Top users by points or CO2 saved for a daily, weekly or all-time window.
+    Backed by an in-memory sorted set, so this is O(log n + limit).
+    """
+    return {
+        "window": window,
+        "metric": metric,
+        "entries": leaderboard.top(limit, window=window, metric=metric),
+    }
+
+
+@router.get("/user/{user_id}/rank")
+async def get_user_rank(
+    user_id: str,
+    window: str = Query("all_time", pattern="^(daily|weekly|all_time)$"),
+    metric: str = Query("points", pattern="^(points|co2_saved_kg)$"),
+    neighbours: int = Query(2, ge=0, le=25, description="Users to include above and below"),
+):
+    """
+    A user's rank, percentile and the users directly around them.
     """
-    # TODO: Query user profile and trip history from database
-    mock_stats = {
-        "user_id": user_id,
-        "total_co2_saved_kg": 127.5,
-        "total_trips": 42,
-        "total_points": 12750,
-        "badges": [
-            {"badge_id": "eco_warrior", "name": "Eco Warrior", "description": "Completed 10 sustainable trips"},
-            {"badge_id": "carbon_hero", "name": "Carbon Hero", "description": "Saved 100kg of CO2"}
-        ],
-        "sustainability_streak_days": 14,
-        "ranking": "Gold Tier"
+    info = leaderboard.rank_of(user_id, window=window, metric=metric)
+    if info is None:
+        raise HTTPException(status_code=404, detail="User has no ranked trips in this window")
+    return {
+        **info,
+        "window": window,
+        "metric": metric,
+        "around": leaderboard.around(user_id, n=neighbours, window=window, metric=metric),
     }
-    return mock_stats
@@ -0,0 +1,84 @@
+"""
+Production launcher: several worker processes behind one port.
+
+    python serve.py                          # WEB_CONCURRENCY workers, or one per available CPU
+    python serve.py --workers 4 --port 8080
+    python serve.py --server uvicorn         # force uvicorn's own process manager
+
+Uses gunicorn with uvicorn workers when gunicorn is installed (graceful reloads,
+worker recycling), otherwise `uvicorn --workers`. With more than one worker the
+shared state moves to SQLite (SHARED_STATE_BACKEND=sqlite, unless set already) so
+assistant sessions, provider fallbacks, leaderboards, posted alerts and journey
+pushes stay consistent whichever worker a request lands on.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def available_cpus() -> int:
+    # sched_getaffinity honours taskset/cpuset limits; cpu_count() does not
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    env = os.getenv("WEB_CONCURRENCY", "").strip()
+    if env:
+        return max(1, int(env))
+    return available_cpus()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="default: WEB_CONCURRENCY, else one per available CPU")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "uvicorn"), default="auto")
+    parser.add_argument("--timeout", type=int, default=60, help="gunicorn worker timeout / graceful shutdown, seconds")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers or default_workers())
+    if workers > 1:
+        os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+
+    server = args.server
+    if server == "auto":
+        server = "gunicorn" if shutil.which("gunicorn") and os.name == "posix" else "uvicorn"
+    print(f"serve: {workers} worker(s) via {server} on {args.host}:{args.port}, "
+          f"shared state: {os.getenv('SHARED_STATE_BACKEND', 'local')}", flush=True)
+
+    if server == "gunicorn":
+        os.chdir(HERE)
+        os.execvp("gunicorn", [
+            "gunicorn", "main:app",
+            "--worker-class", "uvicorn.workers.UvicornWorker",
+            "--workers", str(workers),
+            "--bind", f"{args.host}:{args.port}",
+            "--timeout", str(args.timeout),
+            "--graceful-timeout", str(args.timeout),
+            "--keep-alive", "5",
+        ])
+
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        app_dir=str(HERE),
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_graceful_shutdown=args.timeout,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+
+def admin_token() -> str:
+    """The configured ADMIN_TOKEN; admin features are disabled while it is unset."""
+    return os.getenv("ADMIN_TOKEN", "").strip()
+
+
+def is_admin(presented: Optional[str]) -> bool:
+    """Constant-time comparison against ADMIN_TOKEN; always False when none is configured."""
+    expected = admin_token()
+    if not expected or not presented:
+        return False
+    return hmac.compare_digest(presented.encode("utf-8"), expected.encode("utf-8"))
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token from an "Authorization: Bearer <token>" header value."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+
+def require_admin(
+    authorization: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+) -> None:
+    """Route dependency for operator-only endpoints."""
+    if not admin_token():
+        # Not configured: behave as if the endpoints did not exist
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(bearer_token(authorization) or x_admin_token):
+        raise HTTPException(status_code=401, detail="Admin token required")
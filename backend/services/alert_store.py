@@ -0,0 +1,391 @@
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+SEVERITIES = ("high", "medium", "low")
+_SEVERITY_RANK = {s: i for i, s in enumerate(SEVERITIES)}
+
+# Who an alert affects when the event does not say
+_DEFAULT_AFFECTED = {
+    "elevator_outage": ["wheelchair", "mobility_impaired"],
+    "escalator_outage": ["mobility_impaired"],
+    "ramp_blocked": ["wheelchair", "mobility_impaired"],
+    "entrance_closed": ["wheelchair", "mobility_impaired"],
+    "audio_outage": ["visually_impaired"],
+    "display_outage": ["hearing_impaired"],
+}
+ALERT_TYPES = tuple(_DEFAULT_AFFECTED) + ("other",)
+
+# GTFS-Realtime Alert.SeverityLevel -> ours
+_GTFS_SEVERITY = {"SEVERE": "high", "WARNING": "medium", "INFO": "low", "UNKNOWN_SEVERITY": "medium"}
+
+DEFAULT_TTL_S = 6 * 3600
+
+# Listener signature: (event, alert) with event in {"upsert", "remove", "expire"}
+AlertListener = Callable[[str, Dict[str, Any]], None]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return None if ts is None else datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _infer_type(text: str) -> str:
+    t = text.lower()
+    for needle, kind in (
+        ("escalator", "escalator_outage"),
+        ("elevator", "elevator_outage"),
+        ("lift", "elevator_outage"),
+        ("ramp", "ramp_blocked"),
+        ("entrance", "entrance_closed"),
+        ("announcement", "audio_outage"),
+        ("audio", "audio_outage"),
+        ("display", "display_outage"),
+    ):
+        if needle in t:
+            return kind
+    return "other"
+
+
+def _translated(field: Any) -> str:
+    """GTFS-RT TranslatedString (JSON form) -> first translation's text."""
+    if isinstance(field, str):
+        return field
+    if isinstance(field, dict):
+        for tr in field.get("translation") or []:
+            if tr.get("text"):
+                return str(tr["text"])
+    return ""
+
+
+class AlertStore:
+    """
+    In-memory accessibility alerts, indexed for lookups by station, severity and
+    affected group.
+
+    Each index maps a key to the set of alert ids carrying it, so a filtered query
+    starts from the smallest matching set and only touches alerts it returns. Expiry
+    is a min-heap of (expires_at, alert_id, version); expired entries are popped
+    before every read, and superseded heap entries are skipped by version.
+    """
+
+    def __init__(self, default_ttl_s: float = DEFAULT_TTL_S, clock: Callable[[], float] = time.time) -> None:
+        self.default_ttl_s = default_ttl_s
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._alerts: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._seq = 0
+        self._by_station: Dict[str, Set[str]] = {}
+        self._by_severity: Dict[str, Set[str]] = {}
+        self._by_affected: Dict[str, Set[str]] = {}
+        self._expiry: List[Tuple[float, str, int]] = []
+        self._listeners: List[AlertListener] = []
+
+        self.feed_path: Optional[Path] = None
+        # refresh_from_feed() stats the file at most this often (it runs on every alerts GET)
+        self.feed_check_s = 1.0
+        self._feed_checked = float("-inf")
+        self._feed_mtime: Optional[float] = None
+        self._feed_ids: Set[str] = set()
+
+    # ---------- listeners ----------
+    def add_listener(self, fn: AlertListener) -> None:
+        self._listeners.append(fn)
+
+    def _notify(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        # Called outside the lock so listeners may query the store.
+        for event, alert in events:
+            for fn in self._listeners:
+                try:
+                    fn(event, alert)
+                except Exception:
+                    pass
+
+    # ---------- index maintenance ----------
+    @staticmethod
+    def _index_add(index: Dict[str, Set[str]], keys: Iterable[str], alert_id: str) -> None:
+        for k in keys:
+            index.setdefault(k, set()).add(alert_id)
+
+    @staticmethod
+    def _index_remove(index: Dict[str, Set[str]], keys: Iterable[str], alert_id: str) -> None:
+        for k in keys:
+            ids = index.get(k)
+            if ids is not None:
+                ids.discard(alert_id)
+                if not ids:
+                    del index[k]
+
+    def _unlink_locked(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        self._versions.pop(alert_id, None)
+        self._index_remove(self._by_station, alert["station_ids"], alert_id)
+        self._index_remove(self._by_severity, (alert["severity"],), alert_id)
+        self._index_remove(self._by_affected, alert["affected_accessibility"], alert_id)
+        return alert
+
+    def _expire_locked(self, now: float) -> List[Tuple[str, Dict[str, Any]]]:
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, alert_id, version = heapq.heappop(self._expiry)
+            if self._versions.get(alert_id) != version:
+                continue  # alert was replaced or removed since this entry was pushed
+            alert = self._unlink_locked(alert_id)
+            if alert is not None:
+                self._feed_ids.discard(alert_id)
+                expired.append(("expire", alert))
+        return expired
+
+    def _normalize(self, raw: Dict[str, Any], now: float) -> Dict[str, Any]:
+        station_ids = raw.get("station_ids") or ([raw["station_id"]] if raw.get("station_id") else [])
+        station_ids = [str(s) for s in station_ids if s]
+        if not station_ids:
+            raise ValueError("alert needs a station_id or station_ids")
+
+        severity = str(raw.get("severity") or "medium").lower()
+        if severity not in _SEVERITY_RANK:
+            raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+
+        message = str(raw.get("message") or "")
+        alert_type = str(raw.get("alert_type") or _infer_type(message)).lower()
+        if alert_type not in ALERT_TYPES:
+            alert_type = "other"
+
+        affected = raw.get("affected_accessibility") or _DEFAULT_AFFECTED.get(alert_type, [])
+        affected = sorted({str(a).lower() for a in affected})
+
+        if raw.get("expires_at") is not None:
+            expires_at = float(raw["expires_at"])
+        elif raw.get("ttl_s") is not None:
+            expires_at = now + float(raw["ttl_s"])
+        elif raw.get("no_expiry"):
+            expires_at = None
+        else:
+            expires_at = now + self.default_ttl_s
+
+        return {
+            "alert_id": str(raw.get("alert_id") or f"alert_{uuid.uuid4().hex[:12]}"),
+            "station_id": station_ids[0],
+            "station_ids": station_ids,
+            "station_name": raw.get("station_name"),
+            "alert_type": alert_type,
+            "severity": severity,
+            "message": message,
+            "affected_accessibility": affected,
+            "estimated_resolution_time": raw.get("estimated_resolution_time"),
+            "source": raw.get("source") or "api",
+            "created_utc": _iso(now),
+            "expires_at": expires_at,
+            "expires_utc": _iso(expires_at),
+        }
+
+    def _upsert_locked(self, raw: Dict[str, Any], now: float) -> Dict[str, Any]:
+        alert = self._normalize(raw, now)
+        alert_id = alert["alert_id"]
+        self._unlink_locked(alert_id)
+
+        self._seq += 1
+        version = self._seq
+        self._alerts[alert_id] = alert
+        self._versions[alert_id] = version
+        self._index_add(self._by_station, alert["station_ids"], alert_id)
+        self._index_add(self._by_severity, (alert["severity"],), alert_id)
+        self._index_add(self._by_affected, alert["affected_accessibility"], alert_id)
+        if alert["expires_at"] is not None:
+            heapq.heappush(self._expiry, (alert["expires_at"], alert_id, version))
+        return alert
+
+    # ---------- writes ----------
+    def upsert(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Add or replace an alert (same alert_id replaces). Raises ValueError on bad input."""
+        now = self._clock()
+        with self._lock:
+            events = self._expire_locked(now)
+            alert = self._upsert_locked(raw, now)
+        self._notify(events + [("upsert", alert)])
+        return alert
+
+    def remove(self, alert_id: str) -> bool:
+        with self._lock:
+            events = self._expire_locked(self._clock())
+            alert = self._unlink_locked(alert_id)
+            self._feed_ids.discard(alert_id)
+        if alert is not None:
+            events.append(("remove", alert))
+        self._notify(events)
+        return alert is not None
+
+    # ---------- reads ----------
+    def get(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        self.expire()
+        with self._lock:
+            return self._alerts.get(alert_id)
+
+    def expire(self) -> int:
+        with self._lock:
+            events = self._expire_locked(self._clock())
+        self._notify(events)
+        return len(events)
+
+    @staticmethod
+    def _sort_key(alert: Dict[str, Any]) -> Tuple[int, str]:
+        return _SEVERITY_RANK[alert["severity"]], alert["alert_id"]
+
+    def query(
+        self,
+        station_id: Optional[str] = None,
+        severity: Optional[str] = None,
+        affected: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Active alerts matching every given filter, most severe first."""
+        self.expire()
+        with self._lock:
+            filters = []
+            if station_id:
+                filters.append(self._by_station.get(station_id, set()))
+            if severity:
+                filters.append(self._by_severity.get(severity.lower(), set()))
+            if affected:
+                filters.append(self._by_affected.get(affected.lower(), set()))
+
+            if not filters:
+                matched = list(self._alerts.values())
+            else:
+                filters.sort(key=len)
+                smallest, rest = filters[0], filters[1:]
+                matched = [self._alerts[i] for i in smallest if all(i in f for f in rest)]
+        matched.sort(key=self._sort_key)
+        return matched
+
+    def alerts_for_stations(self, station_ids: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Bulk lookup for route planning: {station_id: [alerts]} for stations that have any."""
+        self.expire()
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for sid in station_ids:
+                ids = self._by_station.get(sid)
+                if ids:
+                    out[sid] = sorted((self._alerts[i] for i in ids), key=self._sort_key)
+        return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._alerts)
+
+    # ---------- GTFS-Realtime style feed ----------
+    @staticmethod
+    def parse_feed(feed: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Alerts from a GTFS-Realtime FeedMessage in its JSON form. Only entities with an
+        `alert` and at least one informed stop are kept. Our `alert_type` and
+        `affected_accessibility` may be given as extension fields on the alert.
+        """
+        out = []
+        for entity in feed.get("entity") or []:
+            alert = entity.get("alert")
+            if not alert or entity.get("is_deleted"):
+                continue
+            stops = [e.get("stop_id") for e in alert.get("informed_entity") or [] if e.get("stop_id")]
+            if not stops:
+                continue
+            header = _translated(alert.get("header_text"))
+            description = _translated(alert.get("description_text"))
+            ends = [p.get("end") for p in alert.get("active_period") or [] if p.get("end")]
+            out.append({
+                "alert_id": f"feed_{entity.get('id')}",
+                "station_ids": stops,
+                "severity": _GTFS_SEVERITY.get(str(alert.get("severity_level") or "").upper(), "medium"),
+                "message": header or description,
+                "alert_type": alert.get("alert_type") or _infer_type(f"{header} {description}"),
+                "affected_accessibility": alert.get("affected_accessibility"),
+                "expires_at": float(max(ends)) if ends else None,
+                "no_expiry": not ends,  # open-ended: lives until the feed drops it
+                "source": "feed",
+            })
+        return out
+
+    def load_feed(self, feed: Dict[str, Any]) -> int:
+        """Replace every feed-sourced alert with the alerts in `feed`; API alerts are kept."""
+        parsed = self.parse_feed(feed)
+        now = self._clock()
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        with self._lock:
+            events.extend(self._expire_locked(now))
+            fresh: Set[str] = set()
+            for raw in parsed:
+                if raw["expires_at"] is not None and raw["expires_at"] <= now:
+                    continue
+                try:
+                    alert = self._upsert_locked(raw, now)
+                except ValueError:
+                    continue
+                fresh.add(alert["alert_id"])
+                events.append(("upsert", alert))
+            for stale_id in self._feed_ids - fresh:
+                stale = self._unlink_locked(stale_id)
+                if stale is not None:
+                    events.append(("remove", stale))
+            self._feed_ids = fresh
+        self._notify(events)
+        return len(fresh)
+
+    def refresh_from_feed(self) -> bool:
+        """
+        Reload `feed_path` if it changed since the last load. Otherwise one stat(), and
+        not even that within `feed_check_s` of the previous check.
+        """
+        path = self.feed_path
+        if path is None:
+            return False
+        now = time.monotonic()
+        if now - self._feed_checked < self.feed_check_s:
+            return False
+        self._feed_checked = now
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._feed_mtime:
+            return False
+        try:
+            feed = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        self.load_feed(feed)
+        self._feed_mtime = mtime
+        return True
+
+
+def _build_store() -> AlertStore:
+    store = AlertStore(default_ttl_s=float(os.getenv("ACCESSIBILITY_ALERT_TTL_S", DEFAULT_TTL_S)))
+    feed = os.getenv("ACCESSIBILITY_ALERTS_FEED")
+    if feed:
+        store.feed_path = Path(feed)
+        store.feed_check_s = float(os.getenv("ACCESSIBILITY_ALERTS_FEED_CHECK_S", "1"))
+        store.refresh_from_feed()
+    else:
+        # No live source configured: keep the sample alert the API has always shown.
+        store.upsert({
+            "alert_id": "alert_001",
+            "station_id": "stn_downtown",
+            "station_name": "Downtown Station",
+            "severity": "high",
+            "alert_type": "elevator_outage",
+            "message": "Main elevator out of service for maintenance",
+            "affected_accessibility": ["wheelchair", "mobility_impaired"],
+            "estimated_resolution_time": "2 hours",
+            "no_expiry": True,
+            "source": "sample",
+        })
+    return store
+
+
+alert_store = _build_store()
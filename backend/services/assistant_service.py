@@ -1,8 +1,14 @@
+import asyncio
+import copy
 import re
 import random
+import threading
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+from services.push_broker import broker, journey_topic
+from services.shared_state import shared_state, worker_sync
+
 # Mock environmental and location data
 MOCK_ENVIRONMENT = {
     "location": "Toronto",
@@ -29,8 +35,18 @@ MOCK_LOCATIONS = {
     "shloka market": {"lat": 43.6500, "lon": -79.3850, "display_name": "Shloka Market Bus Stop"}
 }
 
-# Conversation state tracker
+# Conversation state tracker. The handlers below read and write these module-level
+# dicts; _run_in_session loads one session into them before each query (under
+# _dispatch_lock) and saves them after, so every worker continues the same conversation.
 conversation_states = {}
+_dispatch_lock = threading.Lock()
+
+# One conversation per session (a rider or client); journey updates go out on the session's topic
+DEFAULT_SESSION = "default"
+SESSION_TTL_S = 7 * 24 * 3600.0
+# A step that raced another worker on the same session is re-run on the fresh state this often
+SESSION_RETRIES = 3
+JOURNEY_STATES = {"journey_active", "at_bus_stop", "on_bus", "walking_to_destination", "completed"}
 
 # System language setting
 current_language = "english"
@@ -66,6 +82,8 @@ user_profile = {
     'has_profile_picture': True
 }
 
+_DEFAULT_PROFILE = copy.deepcopy(user_profile)
+
 # Mock notification data
 notifications_data = {
     'today': [
@@ -188,9 +206,77 @@ games_data = {
     ]
 }
 
-async def process_assistant_query(text: str, openai_client=None) -> Dict[str, Any]:
+async def process_assistant_query(text: str, session_id: str = DEFAULT_SESSION, openai_client=None) -> Dict[str, Any]:
     """Process natural language transit query with Sara conversation flow."""
-    
+    # Loading and saving the session is SQLite work with several workers: off the loop
+    result = await asyncio.to_thread(_run_in_session, session_id, text)
+    if publish_journey_update({"session_id": session_id, "result": result}) is not None:
+        worker_sync.emit("journey", {"session_id": session_id, "result": result})
+    return result
+
+
+def session_key(session_id: str) -> str:
+    return f"assistant:session:{session_id}"
+
+
+def _step(session: Dict[str, Any], text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(reply, new session) for one query against a session's saved state."""
+    global current_language
+    # The handlers work on module globals, so one step at a time per process
+    with _dispatch_lock:
+        conversation_states.clear()
+        conversation_states.update(session.get("conversation") or {})
+        current_language = session.get("language", "english")
+        user_profile.clear()
+        user_profile.update(copy.deepcopy(_DEFAULT_PROFILE))
+        user_profile.update(session.get("profile") or {})
+
+        result = copy.deepcopy(_dispatch_query(text))
+        state = {
+            "conversation": dict(conversation_states),
+            "language": current_language,
+            "profile": dict(user_profile),
+        }
+    return result, state
+
+
+def _run_in_session(session_id: str, text: str) -> Dict[str, Any]:
+    key = session_key(session_id)
+    attempt = 0
+    while True:
+        session = shared_state.get(key) or {}
+        version = session.get("version", 0)
+        result, state = _step(session, text)
+        # The write lock covers only the version check and the save, not the step
+        with shared_state.transaction(key, ttl_s=SESSION_TTL_S) as current:
+            saved = current.get("version", 0) == version or attempt == SESSION_RETRIES - 1
+            if saved:
+                state["version"] = current.get("version", 0) + 1
+                current.clear()
+                current.update(state)
+        if saved:
+            return result
+        attempt += 1
+
+
+def publish_journey_update(event: Dict[str, Any]) -> Optional[int]:
+    """
+    Push a journey step ({"session_id", "result"}) to clients following that session
+    (SSE / WebSocket) in this worker; returns how many got it, or None when the result
+    is not a journey step.
+    """
+    result = event["result"]
+    data = result.get("data") or {}
+    if data.get("state") not in JOURNEY_STATES:
+        return None
+    return broker.publish(
+        [journey_topic(event["session_id"])],
+        "journey",
+        {"session_id": event["session_id"], "response": result.get("response"), **data},
+    )
+
+
+def _dispatch_query(text: str) -> Dict[str, Any]:
     # Initialize conversation if first interaction or if explicitly requested
     if (not conversation_states.get("current_state") or 
         text.lower().strip() in ['initialize', 'init', 'start']):
@@ -1156,4 +1242,7 @@ def handle_generic_games_response(text: str) -> Dict[str, Any]:
         return {
             "response": response,
             "data": {"state": "games_menu"}
-        }
\ No newline at end of file
+        }
+
+# Journey steps taken through another worker reach this worker's subscribers too
+worker_sync.on("journey", publish_journey_update)
@@ -0,0 +1,151 @@
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Badge rules: a badge is earned the moment `metric` reaches `threshold`.
+# Metrics:
+#   trips, points, co2_saved_kg, best_streak_days  - from the user's trip aggregates
+#   sustainable_trips                              - trips that saved any CO2
+#   mode:<mode>                                    - trips taken with that mode
+DEFAULT_BADGES: List[Dict[str, Any]] = [
+    {"badge_id": "first_journey", "name": "First Journey", "icon": "🚌",
+     "description": "Completed your first eco trip", "metric": "trips", "threshold": 1},
+    {"badge_id": "eco_warrior", "name": "Eco Warrior", "icon": "🌱",
+     "description": "Completed 10 sustainable trips", "metric": "sustainable_trips", "threshold": 10},
+    {"badge_id": "week_warrior", "name": "Week Warrior", "icon": "🔥",
+     "description": "Maintained a 7-day streak", "metric": "best_streak_days", "threshold": 7},
+    {"badge_id": "bike_champion", "name": "Bike Champion", "icon": "🚲",
+     "description": "Used cycling transport", "metric": "mode:bike", "threshold": 1},
+    {"badge_id": "tree_saver", "name": "Tree Saver", "icon": "🌳",
+     "description": "Saved as much CO2 as a tree absorbs in a year (22kg)", "metric": "co2_saved_kg", "threshold": 22},
+    {"badge_id": "metro_master", "name": "Metro Master", "icon": "🚇",
+     "description": "Took 20 subway trips", "metric": "mode:subway", "threshold": 20},
+    {"badge_id": "carbon_hero", "name": "Carbon Hero", "icon": "🦸",
+     "description": "Saved 100kg of CO2", "metric": "co2_saved_kg", "threshold": 100},
+    {"badge_id": "eco_hero", "name": "Eco Hero", "icon": "⭐",
+     "description": "Earned 10,000 points", "metric": "points", "threshold": 10000},
+]
+
+# Challenges: progress toward `target` on a metric; the reward is informational.
+DEFAULT_CHALLENGES: List[Dict[str, Any]] = [
+    {"challenge_id": "cycle_to_work", "name": "Cycle to work", "description": "Complete 5 bike rides",
+     "metric": "mode:bike", "target": 5, "reward": 500},
+    {"challenge_id": "bus_regular", "name": "Bus regular", "description": "Take 10 bus trips",
+     "metric": "mode:bus", "target": 10, "reward": 300},
+    {"challenge_id": "fifty_kilos", "name": "Fifty kilos", "description": "Save 50kg of CO2",
+     "metric": "co2_saved_kg", "target": 50, "reward": 1000},
+]
+
+# Aggregates the trip store already keeps, by metric name
+_STAT_FIELDS = {
+    "trips": "total_trips",
+    "points": "total_points",
+    "co2_saved_kg": "total_co2_saved_kg",
+    "best_streak_days": "best_streak_days",
+}
+
+
+class _MetricRules:
+    """All badge thresholds on one metric, sorted, so crossings are found by bisection."""
+
+    __slots__ = ("thresholds", "badge_ids")
+
+    def __init__(self, rules: Iterable[Tuple[float, str]]) -> None:
+        ordered = sorted(rules)
+        self.thresholds = [t for t, _ in ordered]
+        self.badge_ids = [b for _, b in ordered]
+
+    def crossed(self, before: float, after: float) -> List[str]:
+        """Badges whose threshold lies in (before, after]."""
+        if after <= before:
+            return []
+        lo = bisect_right(self.thresholds, before)
+        hi = bisect_right(self.thresholds, after)
+        return self.badge_ids[lo:hi]
+
+
+class BadgeEngine:
+    """
+    Compiles badge and challenge definitions into per-metric evaluators.
+
+    A trip event only touches the handful of metrics it changes; for each, the newly
+    earned badges are the thresholds crossed between the before/after values (a
+    bisection), so the cost per event does not grow with the number of rules. Awards
+    are written once, at event time, and the read path just lists them.
+    """
+
+    def __init__(
+        self,
+        badges: Optional[List[Dict[str, Any]]] = None,
+        challenges: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self.badges = {b["badge_id"]: b for b in (DEFAULT_BADGES if badges is None else badges)}
+        self.challenges = list(DEFAULT_CHALLENGES if challenges is None else challenges)
+
+        by_metric: Dict[str, List[Tuple[float, str]]] = {}
+        for b in self.badges.values():
+            by_metric.setdefault(b["metric"], []).append((float(b["threshold"]), b["badge_id"]))
+        self._rules: Dict[str, _MetricRules] = {m: _MetricRules(r) for m, r in by_metric.items()}
+
+    @staticmethod
+    def counter_deltas(impact: Dict[str, Any]) -> Dict[str, float]:
+        """Per-user counters (beyond the trip aggregates) that one trip bumps."""
+        mode = str(impact.get("mode") or "").lower().strip() or "unknown"
+        saved = float(impact.get("co2_saved_kg") or 0.0)
+        return {
+            f"mode:{mode}": 1.0,
+            "sustainable_trips": 1.0 if saved > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _metric_values(stats: Dict[str, Any]) -> Dict[str, float]:
+        values = {m: float(stats.get(field) or 0) for m, field in _STAT_FIELDS.items()}
+        values.update(stats.get("counters") or {})
+        return values
+
+    def evaluate(self, stats: Dict[str, Any]) -> List[str]:
+        """
+        Badge ids newly earned by the trip that produced `stats` (the result of
+        TripStore.record_trip, which carries the "previous" aggregates).
+        """
+        after = self._metric_values(stats)
+        before = self._metric_values(stats.get("previous") or {})
+        earned: List[str] = []
+        for metric, value in after.items():
+            rules = self._rules.get(metric)
+            if rules is not None:
+                earned.extend(rules.crossed(before.get(metric, 0.0), value))
+        return earned
+
+    def describe(self, awarded: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        out = []
+        for badge_id, awarded_utc in awarded:
+            b = self.badges.get(badge_id)
+            if b is None:
+                continue  # rule retired since it was awarded
+            out.append({
+                "badge_id": badge_id,
+                "name": b["name"],
+                "icon": b.get("icon"),
+                "description": b["description"],
+                "awarded_utc": awarded_utc,
+            })
+        return out
+
+    def challenge_progress(self, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        values = self._metric_values(stats)
+        out = []
+        for c in self.challenges:
+            current = min(values.get(c["metric"], 0.0), float(c["target"]))
+            out.append({
+                "challenge_id": c["challenge_id"],
+                "name": c["name"],
+                "description": c["description"],
+                "progress": f"{current:g}/{c['target']:g}",
+                "completed": current >= c["target"],
+                "reward": c.get("reward"),
+            })
+        return out
+
+
+badge_engine = BadgeEngine()
@@ -0,0 +1,306 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from services import carbon_intensity_service as cis
+from services.prefetch import region_of
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+# Monday 1970-01-05 00:00 UTC: hour-of-week 0
+_WEEK_ORIGIN = 4 * 86400.0
+
+When = Union[datetime, float]
+
+# A region with no known zone is looked up again after this long
+REGION_RECHECK_S = 300.0
+
+
+def _ts(at: When) -> float:
+    if isinstance(at, datetime):
+        return (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).timestamp()
+    return float(at)
+
+
+def _parse_ts(value: Any) -> Optional[float]:
+    try:
+        return _ts(datetime.fromisoformat(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def hour_of_week(ts: float) -> float:
+    return ((ts - _WEEK_ORIGIN) / 3600.0) % HOURS_PER_WEEK
+
+
+class ZoneModel:
+    """
+    One zone's intensity: an hour-of-week seasonal profile plus an exponentially
+    smoothed deviation from it ("today is dirtier than a usual Tuesday"), which decays
+    back to the profile as the forecast reaches further from the last reading.
+
+    Everything lives in flat 168-slot arrays. The profile and the slope to the next
+    hour are precomputed on every update, so intensity_at() is a couple of lookups and
+    one linear interpolation between hour centres: O(1) whatever the history length.
+    """
+
+    def __init__(self, alpha: float = 0.3, damping_per_hour: float = 0.9) -> None:
+        self.alpha = alpha
+        self.log_damping = math.log(damping_per_hour)
+        self.sums = array("d", bytes(8 * HOURS_PER_WEEK))
+        self.counts = array("d", bytes(8 * HOURS_PER_WEEK))
+        self.profile = array("d", bytes(8 * HOURS_PER_WEEK))
+        self.slope = array("d", bytes(8 * HOURS_PER_WEEK))
+        self.level = 0.0
+        self.level_at: Optional[float] = None
+        self.readings = 0
+
+    def _rebuild_profile(self) -> None:
+        """Bin means; empty bins borrow the same hour of day from other days, then the overall mean."""
+        sums, counts = self.sums, self.counts
+        total = sum(counts)
+        overall = sum(sums) / total if total else 0.0
+        by_hour = [0.0] * 24
+        for hour in range(24):
+            n = sum(counts[hour::24])
+            by_hour[hour] = sum(sums[hour::24]) / n if n else overall
+        profile = self.profile
+        for h in range(HOURS_PER_WEEK):
+            profile[h] = sums[h] / counts[h] if counts[h] else by_hour[h % 24]
+        self.slope = array("d", (profile[(h + 1) % HOURS_PER_WEEK] - profile[h] for h in range(HOURS_PER_WEEK)))
+
+    def seasonal(self, ts: float) -> float:
+        # Bin h is the mean of hour [h, h+1); interpolate between bin centres
+        x = hour_of_week(ts) - 0.5
+        i = math.floor(x)
+        return self.profile[i % HOURS_PER_WEEK] + self.slope[i % HOURS_PER_WEEK] * (x - i)
+
+    def _level_at(self, ts: float) -> float:
+        if self.level_at is None or ts <= self.level_at:
+            return self.level
+        return self.level * math.exp(self.log_damping * (ts - self.level_at) / 3600.0)
+
+    def copy(self) -> "ZoneModel":
+        """An independent copy, to update while readers keep using this one."""
+        other = ZoneModel.__new__(ZoneModel)
+        other.alpha = self.alpha
+        other.log_damping = self.log_damping
+        other.sums = array("d", self.sums)
+        other.counts = array("d", self.counts)
+        other.profile = array("d", self.profile)
+        other.slope = self.slope
+        other.level = self.level
+        other.level_at = self.level_at
+        other.readings = self.readings
+        return other
+
+    def add_many(self, readings: Sequence[Tuple[float, float]]) -> None:
+        """Readings in time order. The profile is rebuilt once, after the smoothing pass."""
+        for ts, value in readings:
+            h = int(hour_of_week(ts))
+            if self.counts[h] and (self.level_at is None or ts >= self.level_at):
+                residual = value - self.sums[h] / self.counts[h]
+                self.level = self.alpha * residual + (1.0 - self.alpha) * self._level_at(ts)
+                self.level_at = ts
+            self.sums[h] += value
+            self.counts[h] += 1
+            self.readings += 1
+        self._rebuild_profile()
+
+    def intensity_at(self, at: When) -> Optional[float]:
+        if not self.readings:
+            return None
+        ts = _ts(at)
+        return max(0.0, self.seasonal(ts) + self._level_at(ts))
+
+
+class CarbonForecaster:
+    """
+    Local carbon-intensity estimates from the readings in carbon_intensity.db, for when
+    Electricity Maps has no answer (no key, provider down, region not prefetched yet).
+
+    Models are per zone: the Electricity Maps zone the prefetch scheduler saw for a
+    region (it records each new reading through record()), or a seeded location name.
+    A zone's model is built from the last `history_weeks` of readings on first use and
+    rebuilt after `refresh_s`, which also picks up readings other workers inserted.
+    """
+
+    def __init__(
+        self,
+        history_weeks: int = 8,
+        alpha: float = 0.3,
+        damping_per_hour: float = 0.9,
+        refresh_s: float = 3600.0,
+        default_zone: Optional[str] = None,
+    ) -> None:
+        self.history_weeks = history_weeks
+        self.alpha = alpha
+        self.damping_per_hour = damping_per_hour
+        self.refresh_s = refresh_s
+        self.default_zone = default_zone
+        self._lock = threading.Lock()
+        self._models: Dict[str, Tuple[float, ZoneModel]] = {}
+        self._regions: Dict[str, str] = {}
+        self._region_misses: Dict[str, float] = {}
+        self._last_ts: Dict[str, float] = {}
+        self._db_ready: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        path = str(cis.DB_PATH)
+        if self._db_ready != path:
+            cis.init_db()
+            self._db_ready = path
+        return sqlite3.connect(path)
+
+    # ---------- models ----------
+    def _load(self, zone: str) -> ZoneModel:
+        since = datetime.now(timezone.utc) - timedelta(weeks=self.history_weeks)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ts_utc, carbon_gco2_per_kwh FROM carbon_intensity WHERE location = ? AND ts_utc >= ? ORDER BY ts_utc",
+                (zone, since.isoformat()),
+            ).fetchall()
+        readings = [(ts, float(v)) for ts, v in ((_parse_ts(r[0]), r[1]) for r in rows) if ts is not None]
+        model = ZoneModel(self.alpha, self.damping_per_hour)
+        model.add_many(readings)
+        return model
+
+    def model(self, zone: str) -> Optional[ZoneModel]:
+        hit = self._models.get(zone)
+        if hit is None or time.time() - hit[0] > self.refresh_s:
+            try:
+                model = self._load(zone)
+            except sqlite3.Error:
+                return None if hit is None else hit[1]
+            with self._lock:
+                self._models[zone] = hit = (time.time(), model)
+        return hit[1] if hit[1].readings else None
+
+    def zone_for(self, lat: Optional[float], lon: Optional[float]) -> Optional[str]:
+        if lat is None or lon is None:
+            return self.default_zone
+        region = region_of(lat, lon)
+        zone = self._regions.get(region)
+        if zone is None and time.time() - self._region_misses.get(region, 0.0) > REGION_RECHECK_S:
+            # Possibly mapped since by whichever worker prefetches; otherwise ask again later
+            try:
+                with self._connect() as conn:
+                    row = conn.execute("SELECT zone FROM carbon_zone_regions WHERE region = ?", (region,)).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                zone = self._regions[region] = row[0]
+            else:
+                self._region_misses[region] = time.time()
+        return zone or self.default_zone
+
+    # ---------- answers ----------
+    def intensity_at(self, zone: str, at: When) -> Optional[float]:
+        model = self.model(zone)
+        return None if model is None else model.intensity_at(at)
+
+    def estimate(self, lat: Optional[float], lon: Optional[float], at: Optional[When] = None) -> Optional[float]:
+        """gCO2/kWh at (lat, lon) and `at` (default now) from history, or None if the zone has none."""
+        zone = self.zone_for(lat, lon)
+        if zone is None:
+            return None
+        value = self.intensity_at(zone, time.time() if at is None else at)
+        return None if value is None else round(value, 1)
+
+    def fill(
+        self,
+        lat: float,
+        lon: float,
+        start: datetime,
+        hours: int,
+        live: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Hourly forecast points from `start`'s hour for `hours` hours: the live forecast
+        where it has the hour, the history model for the gaps. Points carry their
+        "source". Without a model for the zone, the live points come back as they are.
+        """
+        zone = self.zone_for(lat, lon)
+        model = self.model(zone) if zone is not None else None
+        if model is None:
+            return list(live or [])
+        first = math.floor(_ts(start) / 3600.0)
+        by_hour: Dict[int, Dict[str, Any]] = {}
+        for p in live or []:
+            ts = _parse_ts(p.get("datetime")) if isinstance(p, dict) else None
+            if ts is not None:
+                by_hour.setdefault(math.floor(ts / 3600.0), p)
+        out: List[Dict[str, Any]] = []
+        for hour in range(first, first + int(hours)):
+            p = by_hour.get(hour)
+            if p is not None:
+                out.append({**p, "source": "forecast"})
+                continue
+            at = datetime.fromtimestamp(hour * 3600.0, timezone.utc)
+            # The hour's value is its mean, so ask the model for the middle of it
+            out.append({
+                "datetime": at.isoformat().replace("+00:00", "Z"),
+                "carbonIntensity": round(model.intensity_at(hour * 3600.0 + 1800.0), 1),
+                "source": "history",
+            })
+        return out
+
+    # ---------- new readings (prefetch scheduler) ----------
+    def record(self, region: str, zone: Optional[str], value: float, at: Optional[Union[When, str]] = None) -> None:
+        """Store a live reading for `zone` (once per timestamp) and map `region` to it."""
+        zone = zone or region
+        ts = _parse_ts(at) if isinstance(at, str) else (None if at is None else _ts(at))
+        if ts is None:
+            ts = time.time()
+        try:
+            self._record(region, zone, float(value), ts)
+        except sqlite3.Error as e:
+            # Only the history misses a point; the live answer was already served and stored
+            logger.warning("carbon history: could not record %s reading: %s", zone, e)
+
+    def _record(self, region: str, zone: str, value: float, ts: float) -> None:
+        with self._lock:
+            if self._last_ts.get(zone) == ts and self._regions.get(region) == zone:
+                return
+            self._last_ts[zone] = ts
+        ts_utc = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        with self._connect() as conn:
+            if self._regions.get(region) != zone:
+                conn.execute(
+                    "INSERT INTO carbon_zone_regions (region, zone) VALUES (?, ?) "
+                    "ON CONFLICT(region) DO UPDATE SET zone = excluded.zone",
+                    (region, zone),
+                )
+                self._regions[region] = zone
+            seen = conn.execute(
+                "SELECT 1 FROM carbon_intensity WHERE location = ? AND ts_utc = ? LIMIT 1", (zone, ts_utc)
+            ).fetchone()
+            if seen is not None:
+                return
+            conn.execute(
+                "INSERT INTO carbon_intensity (location, ts_utc, carbon_gco2_per_kwh) VALUES (?, ?, ?)",
+                (zone, ts_utc, value),
+            )
+        # Requests read the cached model without the lock, so update a copy and swap it in
+        hit = self._models.get(zone)
+        if hit is not None:
+            model = hit[1].copy()
+            model.add_many([(ts, value)])
+            with self._lock:
+                if self._models.get(zone) is hit:
+                    self._models[zone] = (hit[0], model)
+
+
+carbon_forecaster = CarbonForecaster(
+    history_weeks=int(os.getenv("CARBON_HISTORY_WEEKS", "8")),
+    alpha=float(os.getenv("CARBON_SMOOTHING_ALPHA", "0.3")),
+    refresh_s=float(os.getenv("CARBON_MODEL_REFRESH_S", "3600")),
+    default_zone=os.getenv("CARBON_DEFAULT_ZONE", "").strip() or None,
+)
@@ -1,14 +1,18 @@
+import os
 import sqlite3
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 from datetime import datetime, timezone
 
-from services.electricity_maps_service import ElectricityMapsService
+from services.container import container
 
-DB_DIR = Path(__file__).resolve().parents[1] / "data"
+DB_DIR = Path(os.getenv("TRANSIT_DATA_DIR") or Path(__file__).resolve().parents[1] / "data")
 DB_PATH = DB_DIR / "carbon_intensity.db"
 
-_emaps = ElectricityMapsService()
+
+def _emaps():
+    # The container's instance, so live lookups read the same prefetched region snapshots as the routes
+    return container.get("electricity_maps")
 
 
 def init_db() -> None:
@@ -27,6 +31,15 @@ def init_db() -> None:
             """
         )
         cur.execute("CREATE INDEX IF NOT EXISTS idx_ci_location_ts ON carbon_intensity(location, ts_utc)")
+        # Which Electricity Maps zone each prefetch region (services/prefetch.py) is in
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS carbon_zone_regions (
+                region TEXT PRIMARY KEY,
+                zone TEXT NOT NULL
+            )
+            """
+        )
         conn.commit()
 
 
@@ -69,8 +82,8 @@ def lowest_intensity_times(location: str, limit: int = 3) -> List[Tuple[str, flo
 # -------- Step 5: Electricity Maps live data (geolocation) --------
 
 def live_latest_intensity(lat: float, lon: float) -> Optional[Dict[str, Any]]:
-    return _emaps.latest_carbon_intensity(lat=lat, lon=lon)
+    return _emaps().latest_carbon_intensity(lat=lat, lon=lon)
 
 
 def live_recommend_times(lat: float, lon: float, top_n: int = 3, horizon_hours: int = 24) -> List[Dict[str, Any]]:
-    return _emaps.recommend_low_emission_times(lat=lat, lon=lon, top_n=top_n, horizon_hours=horizon_hours)
+    return _emaps().recommend_low_emission_times(lat=lat, lon=lon, top_n=top_n, horizon_hours=horizon_hours)
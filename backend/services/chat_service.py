@@ -1,26 +1,53 @@
 import os
 import json
 import re
-import google.generativeai as genai
+from typing import Optional
+
 from dotenv import load_dotenv
 
+from services.destination_index import DestinationIndex
+from services.metrics import provider_metrics
+from services.trip_templates import render_trip_message
+
+_gemini_metrics = provider_metrics("gemini")
+
+
+def genai_options() -> dict:
+    """
+    Extra genai.configure() arguments. GEMINI_BASE_URL points the SDK at another
+    endpoint over REST (e.g. the benchmark's local stand-in); unset means Google's API.
+    """
+    base = os.getenv("GEMINI_BASE_URL", "").strip()
+    if not base:
+        return {}
+    return {"transport": "rest", "client_options": {"api_endpoint": base}}
+
 
 class ChatService:
     """
     Standardized on Gemini 2.5 Flash (Old SDK) for consistency with Vision Service.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, destinations: Optional[DestinationIndex] = None) -> None:
         load_dotenv()
         self.api_key = os.getenv("GEMINI_API_KEY")
 
         # Enforce the model we agreed on
         self.model_id = "gemini-2.5-flash"
 
+        # Template summaries for well-formed inputs; Gemini only for the odd ones
+        self.use_templates = os.getenv("CHAT_TEMPLATES", "1").strip() != "0"
+
+        # Local exact/phonetic lookup so repeat mishearings never reach Gemini
+        # (the container passes in its shared index, which start-up fills with station names)
+        self.destinations = destinations if destinations is not None else DestinationIndex()
+
         self.model = None
         if self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
+                # Imported here: the SDK costs most of a cold start and is only needed with a key
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key, **genai_options())
                 self.model = genai.GenerativeModel(self.model_id)
             except Exception as e:
                 print(f"⚠️ ChatService Config Error: {e}")
@@ -31,12 +58,18 @@ class ChatService:
         """
         Produce a user-friendly sentence.
         """
-        # 1. Fallback if no AI
+        # 1. Known input shapes render locally (no network)
+        if self.use_templates:
+            templated = render_trip_message(transit, climate, vision)
+            if templated:
+                return templated
+
+        # 2. Fallback if no AI
         if not self.model:
             ramp_status = "has a ramp" if "true" in str(vision).lower() else "ramp status unknown"
             return f"Trip info: {transit}. Climate: {climate}. Accessibility: {ramp_status}."
 
-        # 2. Prompt
+        # 3. Prompt
         prompt = (
             f"You are a helpful transit assistant. Write ONE friendly sentence for a rider based on this data:\n"
             f"- Transit: {transit}\n"
@@ -45,27 +78,33 @@ class ChatService:
             f"Mention the CO2 savings enthusiastically. If the vision data mentions a hazard, warn them gently."
         )
 
-        # 3. Call AI
+        # 4. Call AI
         try:
-            response = self.model.generate_content(prompt)
+            response = _gemini_metrics.timed(self.model.generate_content, prompt)
             return response.text.strip()
         except Exception as e:
             print(f"❌ Chat Gen Error: {e}")
             return "Your trip information is ready."
 
-    def interpret_destination(self, messy_speech_text: str) -> str:
+    def interpret_destination(self, messy_speech_text: str, user_id: Optional[str] = None) -> str:
         """
-        Decodes "Onion Station" -> "Union Station"
+        Decodes "Onion Station" -> "Union Station" (with `user_id`, that rider's confirmed corrections apply)
         """
         raw = (messy_speech_text or "").strip()
         if not raw:
             return ""
 
-        # 1. Fallback if no AI
+        # 1. Known stop or previously seen input (no network)
+        known = self.destinations.lookup(raw, user_id)
+        _gemini_metrics.cache(bool(known))
+        if known:
+            return known
+
+        # 2. Fallback if no AI
         if not self.model:
             return raw.title()
 
-        # 2. Prompt
+        # 3. Prompt
         prompt = (
             f"Correct the following messy speech-to-text into a valid transit destination name.\n"
             f"Input: '{raw}'\n"
@@ -73,16 +112,24 @@ class ChatService:
             f"Return ONLY the corrected name. No JSON. No quotes."
         )
 
-        # 3. Call AI
+        # 4. Call AI
         try:
-            response = self.model.generate_content(prompt)
+            response = _gemini_metrics.timed(self.model.generate_content, prompt)
             text = response.text.strip()
             # Clean up if it adds quotes
-            return text.replace('"', '').replace("'", "")
+            text = text.replace('"', '').replace("'", "")
+            self.destinations.remember(raw, text)
+            return text
         except Exception as e:
             print(f"❌ Chat Interpret Error: {e}")
             return raw.title()
 
+    def confirm_destination(self, user_id: str, messy_speech_text: str, destination: str) -> None:
+        """
+        The rider confirmed (or corrected) what they meant; teach the local index, for that rider only.
+        """
+        self.destinations.learn(user_id, messy_speech_text, destination)
+
     # Backwards compatibility aliases
     def get_chat_response(self, transit, climate, vision):
         return self.synthesize(transit, climate, vision)
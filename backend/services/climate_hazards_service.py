@@ -1,14 +1,36 @@
 import os
 import csv
+import asyncio
 import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-import httpx
 import xml.etree.ElementTree as ET
 
+from services.http_clients import sync_client
+from services.prefetch import REGION_DEG, prefetcher, region_center
+from services.resilience import get_guard, raise_for_provider_status
+from services.snapshots import LocalKeyed, snapshot_store
+
 
 NOAA_LATEST_SMOKE_KML = "https://www.ospo.noaa.gov/Products/land/hms/data/latest_smoke_final.kml"
+NASA_FIRMS_BASE = "https://firms.modaps.eosdis.nasa.gov"
+FIRMS_SOURCE = "VIIRS_SNPP_NRT"
+FIRE_RADIUS_KM = 50.0
+
+# get_hazards_async fetches here, not in the default executor: a fetch that outlives its
+# deadline keeps a thread busy until the provider answers, and at most this many can
+_fetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HAZARDS_FETCH_WORKERS", "4")), thread_name_prefix="hazards"
+)
+
+# What a source reports when it could not be fetched (get_hazards lists it in "unavailable")
+_SMOKE_UNAVAILABLE = {"present": False, "severity": "unknown", "matched_polygons": 0, "available": False, "status": "unavailable"}
+_FIRES_UNAVAILABLE = {"available": False, "count": 0, "closest_km": None, "status": "unavailable"}
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -20,21 +42,130 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 2 * r * math.asin(math.sqrt(a))
 
 
-def _point_in_poly(lon: float, lat: float, poly: List[Tuple[float, float]]) -> bool:
-    # ray casting in lon/lat space
+def _point_in_poly(lon: float, lat: float, poly: Sequence[float]) -> bool:
+    # ray casting in lon/lat space; poly is flat [lon0, lat0, lon1, lat1, ...]
     inside = False
-    n = len(poly)
+    n = len(poly) // 2
     if n < 3:
         return False
     x, y = lon, lat
-    for i in range(n):
-        x1, y1 = poly[i]
-        x2, y2 = poly[(i + 1) % n]
+    x2, y2 = poly[-2], poly[-1]
+    for i in range(0, 2 * n, 2):
+        x1, y1 = x2, y2
+        x2, y2 = poly[i], poly[i + 1]
         if ((y1 > y) != (y2 > y)) and (x < (x2 - x1) * (y - y1) / (y2 - y1 + 1e-12) + x1):
             inside = not inside
     return inside
 
 
+def _parse_coordinates(text: str) -> array:
+    """KML "lon,lat[,alt] lon,lat[,alt] ..." -> flat array('d') of lon/lat pairs."""
+    tokens = text.split()
+    if not tokens:
+        return array("d")
+    stride = tokens[0].count(",") + 1
+    flat_text = text.replace(",", " ").split()
+    if stride >= 2 and len(flat_text) == stride * len(tokens):
+        try:
+            values = array("d", map(float, flat_text))
+        except ValueError:
+            values = None
+        if values is not None:
+            if stride == 2:
+                return values
+            out = array("d", bytes(16 * len(tokens)))
+            out[0::2] = values[0::stride]
+            out[1::2] = values[1::stride]
+            return out
+
+    # Ragged or partly malformed list: go token by token, skipping bad ones
+    out = array("d")
+    for token in tokens:
+        parts = token.split(",")
+        if len(parts) < 2:
+            continue
+        try:
+            lo = float(parts[0])
+            la = float(parts[1])
+        except ValueError:
+            continue
+        out.append(lo)
+        out.append(la)
+    return out
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_smoke_placemarks(chunks: Iterable[bytes]) -> Iterator[Tuple[array, str]]:
+    """
+    Incremental KML parse: yields (flat_lonlat_array, severity) per smoke Placemark as
+    soon as its closing tag has been fed, then drops the element so memory stays flat
+    no matter how large the document is.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack: List[ET.Element] = []
+    in_pm = 0
+    in_poly = in_outer = in_ring = 0
+    name = style = ""
+    coords: Optional[array] = None
+
+    def drain() -> Iterator[Tuple[array, str]]:
+        nonlocal in_pm, in_poly, in_outer, in_ring, name, style, coords
+        for event, el in parser.read_events():
+            tag = _local(el.tag)
+            if event == "start":
+                stack.append(el)
+                if tag == "Placemark":
+                    in_pm += 1
+                    name = style = ""
+                    coords = None
+                elif in_pm:
+                    if tag == "Polygon":
+                        in_poly += 1
+                    elif tag == "outerBoundaryIs":
+                        in_outer += 1
+                    elif tag == "LinearRing":
+                        in_ring += 1
+                continue
+
+            stack.pop()
+            if not in_pm:
+                continue
+            if tag == "name":
+                name = name or (el.text or "").lower()
+            elif tag == "styleUrl":
+                style = style or (el.text or "").lower()
+            elif tag == "coordinates":
+                if coords is None and in_poly and in_outer and in_ring and el.text:
+                    coords = _parse_coordinates(el.text)
+            elif tag == "Polygon":
+                in_poly -= 1
+            elif tag == "outerBoundaryIs":
+                in_outer -= 1
+            elif tag == "LinearRing":
+                in_ring -= 1
+            elif tag == "Placemark":
+                in_pm -= 1
+                if coords is not None and len(coords) >= 6:
+                    severity = "unknown"
+                    for key in ("heavy", "medium", "light"):
+                        if key in name or key in style:
+                            severity = key
+                            break
+                    yield coords, severity
+                el.clear()
+                if stack:
+                    stack[-1].remove(el)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
 class ClimateHazardsService:
     """
     Part 2:
@@ -47,12 +178,75 @@ class ClimateHazardsService:
     def __init__(self) -> None:
         self.noaa_smoke_kml_url = os.getenv("NOAA_SMOKE_KML_URL", NOAA_LATEST_SMOKE_KML).strip()
         self.firms_key = os.getenv("NASA_FIRMS_MAP_KEY", "").strip()
+        self.firms_base_url = os.getenv("NASA_FIRMS_BASE_URL", NASA_FIRMS_BASE).strip().rstrip("/")
 
-    def get_hazards(self, lat: float, lon: float, impairments: Optional[List[str]] = None) -> Dict[str, Any]:
-        impairments = [i.strip().lower() for i in (impairments or []) if i.strip()]
+        # Per-source deadlines for get_hazards_async (seconds)
+        self.smoke_deadline_s = float(os.getenv("HAZARDS_SMOKE_DEADLINE_S", "8"))
+        self.fire_deadline_s = float(os.getenv("HAZARDS_FIRE_DEADLINE_S", "6"))
 
+        # Parsed smoke polygons are reused until they are this old (NOAA updates a few times a day)
+        self.smoke_ttl_s = float(os.getenv("HAZARDS_SMOKE_TTL_S", "900"))
+        self._smoke_polys: Optional[List[Tuple[array, str]]] = None
+        self._smoke_fetched_at: Optional[float] = None
+        self._smoke_lock = threading.Lock()
+
+        # FIRMS answers are reused across workers for this long (only with a snapshot store)
+        self.firms_ttl_s = float(os.getenv("HAZARDS_FIRMS_TTL_S", "600"))
+        # Several workers on one host share snapshots (services/snapshots.py); None = this worker only
+        self.snapshots = snapshot_store
+        # Per-region FIRMS CSVs the prefetch scheduler keeps fresh
+        self.firms_regions = snapshot_store.firms if snapshot_store is not None else LocalKeyed()
+
+    def get_hazards(self, lat: float, lon: float, impairments: Optional[List[str]] = None) -> Dict[str, Any]:
         smoke = self._smoke_risk(lat, lon)
-        fires = self._firms_fires_near(lat, lon, radius_km=50.0) if self.firms_key else {"available": False, "count": 0, "closest_km": None}
+        fires = self._firms_fires_near(lat, lon, radius_km=FIRE_RADIUS_KM) if self.firms_key else {"available": False, "count": 0, "closest_km": None}
+        return self._build_result(lat, lon, smoke, fires, impairments)
+
+    async def get_hazards_async(self, lat: float, lon: float, impairments: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Same result as get_hazards(), but NOAA and FIRMS are fetched concurrently, each
+        under its own deadline. A source that misses its deadline, errors, or has nothing
+        to answer with is reported in "unavailable" and the other source is still returned.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def _bounded(fn, deadline_s: float, *args: Any) -> Optional[Dict[str, Any]]:
+            try:
+                # A fetch still queued at the deadline is dropped; one already running keeps
+                # its pool thread and its answer still lands in the provider cache.
+                return await asyncio.wait_for(loop.run_in_executor(_fetch_pool, fn, *args), timeout=deadline_s)
+            except Exception:
+                return None
+
+        smoke_job = _bounded(self._smoke_risk, self.smoke_deadline_s, lat, lon)
+        if self.firms_key:
+            fire_job = _bounded(self._firms_fires_near, self.fire_deadline_s, lat, lon, FIRE_RADIUS_KM)
+            smoke, fires = await asyncio.gather(smoke_job, fire_job)
+        else:
+            smoke = await smoke_job
+            fires = {"available": False, "count": 0, "closest_km": None}
+
+        if smoke is None:
+            smoke = dict(_SMOKE_UNAVAILABLE)
+        if fires is None:
+            fires = dict(_FIRES_UNAVAILABLE)
+
+        return self._build_result(lat, lon, smoke, fires, impairments)
+
+    def _build_result(
+        self,
+        lat: float,
+        lon: float,
+        smoke: Dict[str, Any],
+        fires: Dict[str, Any],
+        impairments: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        impairments = [i.strip().lower() for i in (impairments or []) if i.strip()]
+        # "pending" (no snapshot yet, refresh requested) has nothing to answer with either
+        unavailable = [
+            name for name, detail in (("fires", fires), ("smoke", smoke))
+            if detail.get("status") in ("unavailable", "pending")
+        ]
 
         hazards: List[Dict[str, Any]] = []
         if smoke["present"]:
@@ -68,16 +262,92 @@ class ClimateHazardsService:
             "smoke_detail": smoke,
             "fire_detail": fires,
             "alerts": alerts,
+            "unavailable": unavailable,
         }
 
     # ---------- NOAA smoke ----------
+    def smoke_polygons(self) -> Optional[List[Tuple[array, str]]]:
+        """
+        Parsed smoke polygons, fetched and parsed at most once per smoke_ttl_s.
+        Concurrent callers on a stale snapshot wait for one refresh instead of each
+        downloading the KML. If the refresh fails the previous snapshot is kept.
+
+        With a snapshot store, workers first adopt the host's mapped snapshot; only the
+        leader downloads and publishes a new one. While the prefetch scheduler runs it
+        does the downloading (refresh_smoke) and this only reads.
+        """
+        if prefetcher.running:
+            return self._current_smoke()
+        if self._smoke_polys is not None and self.smoke_snapshot_age_s() < self.smoke_ttl_s:
+            return self._smoke_polys
+        with self._smoke_lock:
+            age = self.smoke_snapshot_age_s()
+            if self._smoke_polys is not None and age is not None and age < self.smoke_ttl_s:
+                return self._smoke_polys
+            if self.snapshots is not None and self._adopt_shared_smoke():
+                return self._smoke_polys
+            polys = self._fetch_smoke()
+            if polys is not None:
+                self._store_smoke(polys)
+            return self._smoke_polys
+
+    def refresh_smoke(self) -> None:
+        """Prefetch job: download and parse the smoke KML now. Raises if the feed had nothing."""
+        polys = self._fetch_smoke()
+        if polys is None:
+            raise RuntimeError("NOAA smoke feed unavailable")
+        with self._smoke_lock:
+            self._store_smoke(polys)
+
+    def _store_smoke(self, polys: List[Tuple[array, str]]) -> None:
+        self._smoke_polys = polys
+        # The guard may have answered from its last-good cache; date the snapshot by that
+        fetched_at = get_guard("noaa").cached_at(self.noaa_smoke_kml_url)
+        self._smoke_fetched_at = fetched_at or time.time()
+        if self.snapshots is not None:
+            self.snapshots.smoke.publish(self._smoke_polys, self._smoke_fetched_at)
+
+    def _current_smoke(self) -> Optional[List[Tuple[array, str]]]:
+        """Read-only: our polygons, or the host's newer snapshot published by the leader."""
+        if self.snapshots is not None:
+            shared = self.snapshots.smoke.load()
+            if shared is not None and (self._smoke_fetched_at is None or shared[0] > self._smoke_fetched_at):
+                self._smoke_polys, self._smoke_fetched_at = shared[1], shared[0]
+        return self._smoke_polys
+
+    def _adopt_shared_smoke(self) -> bool:
+        """
+        Take the host's smoke snapshot if it is newer than ours. True when this worker
+        should not download: the snapshot is fresh, or it is stale but another worker
+        is the leader and has not fallen more than one TTL behind.
+        """
+        shared = self.snapshots.smoke.load()
+        if shared is None:
+            return False  # nothing published yet (cold host): fetch, and publish for the others
+        fetched_at, polys = shared
+        if self._smoke_fetched_at is None or fetched_at > self._smoke_fetched_at:
+            self._smoke_polys, self._smoke_fetched_at = polys, fetched_at
+        age = time.time() - fetched_at
+        if age < self.smoke_ttl_s:
+            return True
+        return age < 2 * self.smoke_ttl_s and not self.snapshots.leader.try_acquire()
+
+    def smoke_snapshot_age_s(self) -> Optional[float]:
+        """Seconds since the current smoke polygons were downloaded, or None if there are none."""
+        if self._smoke_fetched_at is None:
+            return None
+        return max(0.0, time.time() - self._smoke_fetched_at)
+
     def _smoke_risk(self, lat: float, lon: float) -> Dict[str, Any]:
-        kml_text = self._fetch_text(self.noaa_smoke_kml_url)
-        if not kml_text:
+        polys = self.smoke_polygons()
+        if polys is None:
+            if prefetcher.running:
+                return {"present": False, "severity": "unknown", "matched_polygons": 0, "available": False, "status": "pending"}
+            # The feed failed and there is no earlier snapshot to fall back on
+            return dict(_SMOKE_UNAVAILABLE)
+        if not polys:
             return {"present": False, "severity": "unknown", "matched_polygons": 0}
 
-        polys = self._parse_smoke_polygons(kml_text)
-
         matched = []
         severity_rank = {"light": 1, "medium": 2, "heavy": 3}
         best = ("unknown", 0)
@@ -95,78 +365,90 @@ class ClimateHazardsService:
         return {"present": True, "severity": best[0], "matched_polygons": len(matched)}
 
     def _fetch_text(self, url: str) -> Optional[str]:
-        try:
-            with httpx.Client(timeout=12.0) as client:
-                r = client.get(url)
+        """A FIRMS CSV through the FIRMS guard; None if nothing is available."""
+        def _request() -> Optional[str]:
+            r = sync_client().get(url, timeout=12.0)
+            raise_for_provider_status(r.status_code)
             if r.status_code != 200:
                 return None
             return r.text
-        except Exception:
-            return None
 
-    def _parse_smoke_polygons(self, kml_text: str) -> List[Tuple[List[Tuple[float, float]], str]]:
-        """
-        Returns list of (poly_lonlat, severity_str).
-        Tries to infer severity from <name> or <styleUrl>.
+        return get_guard("firms").call(url, _request)
+
+    def _fetch_smoke(self) -> Optional[List[Tuple[array, str]]]:
         """
-        try:
-            root = ET.fromstring(kml_text)
-        except Exception:
-            return []
-
-        # KML often has namespaces; strip by searching with wildcard
-        placemarks = root.findall(".//{*}Placemark")
-        out: List[Tuple[List[Tuple[float, float]], str]] = []
-
-        for pm in placemarks:
-            name_el = pm.find(".//{*}name")
-            style_el = pm.find(".//{*}styleUrl")
-            name = (name_el.text or "").lower() if name_el is not None else ""
-            style = (style_el.text or "").lower() if style_el is not None else ""
-
-            severity = "unknown"
-            for key in ("heavy", "medium", "light"):
-                if key in name or key in style:
-                    severity = key
-                    break
-
-            coord_el = pm.find(".//{*}Polygon//{*}outerBoundaryIs//{*}LinearRing//{*}coordinates")
-            if coord_el is None or not coord_el.text:
-                continue
+        Download and parse the smoke KML in one pass: list of (flat lon/lat array, severity)
+        with severity inferred from <name> or <styleUrl>. Placemarks are parsed as the
+        response body arrives, so the document itself is never held in memory.
 
-            coords = []
-            for token in coord_el.text.strip().split():
-                parts = token.split(",")
-                if len(parts) < 2:
-                    continue
-                try:
-                    lo = float(parts[0])
-                    la = float(parts[1])
-                    coords.append((lo, la))
-                except Exception:
-                    continue
+        Goes through the NOAA guard, which keeps the parsed polygons as its last good
+        answer. A malformed document counts as a failed call; None if nothing is available.
+        """
+        url = self.noaa_smoke_kml_url
 
-            if len(coords) >= 3:
-                out.append((coords, severity))
+        def _request() -> Optional[List[Tuple[array, str]]]:
+            with sync_client().stream("GET", url, timeout=12.0) as r:
+                raise_for_provider_status(r.status_code)
+                if r.status_code != 200:
+                    return None
+                return list(_iter_smoke_placemarks(r.iter_bytes()))
 
-        return out
+        return get_guard("noaa").call(url, _request)
 
     # ---------- NASA FIRMS (optional) ----------
-    def _firms_fires_near(self, lat: float, lon: float, radius_km: float = 50.0, day_range: int = 1) -> Dict[str, Any]:
+    def _firms_fires_near(self, lat: float, lon: float, radius_km: float = FIRE_RADIUS_KM, day_range: int = 1) -> Dict[str, Any]:
         """
         Uses FIRMS Area API CSV:
           /api/area/csv/[MAP_KEY]/[SOURCE]/[WEST,SOUTH,EAST,NORTH]/[DAY_RANGE]
-        """
-        west, south, east, north = self._bbox(lat, lon, radius_km)
-        area = f"{west},{south},{east},{north}"
-        source = "VIIRS_SNPP_NRT"
 
-        url = f"https://firms.modaps.eosdis.nasa.gov/api/area/csv/{self.firms_key}/{source}/{area}/{int(day_range)}"
+        While the prefetch scheduler runs, reads the region's prefetched CSV (a larger
+        box) and counts the detections inside this point's own box. A CSV that missed
+        its refresh is still used, marked "stale", and the region is refreshed.
+        """
+        bbox = self._bbox(lat, lon, radius_km)
+        if prefetcher.running:
+            region = prefetcher.touch(lat, lon)
+            hit = self.firms_regions.get(f"firms:{region}")
+            if hit is None:
+                prefetcher.request(region)
+                return {"available": False, "count": 0, "closest_km": None, "status": "pending"}
+            fires = self._summarize_fires(lat, lon, hit[1], within=bbox)
+            if prefetcher.is_stale("firms", hit[0]):
+                prefetcher.request(region)
+                fires["status"] = "stale"
+                fires["age_s"] = round(time.time() - hit[0])
+            return fires
+
+        area = ",".join(str(v) for v in bbox)
+        url = f"{self.firms_base_url}/api/area/csv/{self.firms_key}/{FIRMS_SOURCE}/{area}/{int(day_range)}"
+        csv_text = self._fetch_firms_csv(url)
+        if csv_text is None:
+            return dict(_FIRES_UNAVAILABLE)
+        return self._summarize_fires(lat, lon, csv_text)
+
+    def refresh_firms(self, region: str) -> None:
+        """Prefetch job: one day of detections around a region, wide enough for any point in it."""
+        lat, lon = region_center(region)
+        half_cell_km = REGION_DEG / 2 * 111.0 * math.sqrt(2)
+        area = ",".join(str(v) for v in self._bbox(lat, lon, FIRE_RADIUS_KM + half_cell_km))
+        url = f"{self.firms_base_url}/api/area/csv/{self.firms_key}/{FIRMS_SOURCE}/{area}/1"
         csv_text = self._fetch_text(url)
+        if csv_text is None:
+            raise RuntimeError(f"no FIRMS detections for {region}")
+        self.firms_regions.put(f"firms:{region}", csv_text, get_guard("firms").cached_at(url))
+
+    def _summarize_fires(
+        self,
+        lat: float,
+        lon: float,
+        csv_text: Optional[str],
+        within: Optional[Tuple[float, float, float, float]] = None,
+    ) -> Dict[str, Any]:
         if not csv_text:
             return {"available": True, "count": 0, "closest_km": None}
 
         rows = list(csv.DictReader(StringIO(csv_text)))
+        count = 0 if within is not None else len(rows)
         closest = None
         for r in rows:
             try:
@@ -174,11 +456,27 @@ class ClimateHazardsService:
                 rlon = float(r.get("longitude") or r.get("LONGITUDE"))
             except Exception:
                 continue
+            if within is not None:
+                west, south, east, north = within
+                if not (west <= rlon <= east and south <= rlat <= north):
+                    continue
+                count += 1
             d = _haversine_km(lat, lon, rlat, rlon)
             if closest is None or d < closest:
                 closest = d
 
-        return {"available": True, "count": len(rows), "closest_km": None if closest is None else round(float(closest), 1)}
+        return {"available": True, "count": count, "closest_km": None if closest is None else round(float(closest), 1)}
+
+    def _fetch_firms_csv(self, url: str) -> Optional[str]:
+        if self.snapshots is None:
+            return self._fetch_text(url)
+        hit = self.snapshots.firms.get(url)
+        if hit is not None and time.time() - hit[0] < self.firms_ttl_s:
+            return hit[1]
+        csv_text = self._fetch_text(url)
+        if csv_text is not None:
+            self.snapshots.firms.put(url, csv_text, get_guard("firms").cached_at(url))
+        return csv_text
 
     def _bbox(self, lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
         # rough bbox conversion
@@ -211,3 +509,7 @@ class ClimateHazardsService:
             alerts.append("If possible, choose shorter trips and avoid long outdoor transfers during poorer air conditions.")
 
         return alerts
+
+
+# Shared by the hazards route and the readiness warm-up, so both see one smoke snapshot
+climate_hazards = ClimateHazardsService()
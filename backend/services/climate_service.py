@@ -2,6 +2,9 @@ from typing import Optional, Dict, Any
 
 
 class ClimateEngine:
+    # Modes that run on grid electricity, so their emissions follow carbon intensity
+    ELECTRIC_MODES = ("subway", "train", "skytrain", "electric")
+
     def __init__(self):
         # Emission factors (kg CO2 per km) - direct tailpipe style estimates
         self.EMISSION_CAR = 0.171
@@ -39,7 +42,7 @@ class ClimateEngine:
             actual_emissions = distance_km * self.EMISSION_BUS
         elif mode_l in ["walk", "bike"]:
             actual_emissions = 0.0
-        elif mode_l in ["subway", "train", "skytrain", "electric"]:
+        elif mode_l in self.ELECTRIC_MODES:
             actual_emissions = self._electric_emissions_kg(distance_km, carbon_gco2_per_kwh)
         elif mode_l == "car":
             actual_emissions = baseline_emissions
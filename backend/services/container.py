@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Factory = Callable[[], Any]
+
+
+class Container:
+    """
+    Lazily built, per-worker service singletons.
+
+    Factories are registered by name and run on the first get(), so a worker only
+    pays for (and imports) what its requests actually use; a cold start that never
+    touches Gemini never imports the SDK. Construction is serialized by a lock, so
+    two threads asking at once still share one instance, and timed for report().
+
+    Routes take services through FastAPI dependencies (`Depends(container.provider(name))`);
+    override() swaps an instance in tests or benchmarks without monkeypatching modules.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Factory] = {}
+        self._instances: Dict[str, Any] = {}
+        self._built_ms: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Factory) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._built_ms.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._instances[name]  # fast path: no lock once built
+        except KeyError:
+            pass
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            try:
+                factory = self._factories[name]
+            except KeyError:
+                raise KeyError(f"no service registered as {name!r}") from None
+            start = time.perf_counter()
+            instance = factory()
+            self._built_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            self._instances[name] = instance
+            return instance
+
+    def provider(self, name: str) -> Callable[[], Any]:
+        """
+        Zero-argument dependency for `Depends(...)`. Async on purpose: FastAPI would run
+        a plain function in the threadpool on every request, while this returns a built
+        instance inline and only hands the first construction to a thread.
+        """
+        async def _provide() -> Any:
+            try:
+                return self._instances[name]
+            except KeyError:
+                return await asyncio.to_thread(self.get, name)
+        _provide.__name__ = f"provide_{name}"
+        return _provide
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def override(self, name: str, instance: Any) -> None:
+        with self._lock:
+            self._instances[name] = instance
+            self._built_ms.pop(name, None)
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Drop built instances (one, or all) so the next get() constructs afresh."""
+        with self._lock:
+            names = [name] if name is not None else list(self._instances)
+            for n in names:
+                self._instances.pop(n, None)
+                self._built_ms.pop(n, None)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {"built": name in self._instances, "ms": self._built_ms.get(name)}
+                for name in sorted(self._factories)
+            }
+
+
+class StartupClock:
+    """
+    Wall time between named points of worker start-up (imports, app set-up, first
+    service builds), measured from the clock's creation, for the cold-start breakdown.
+    """
+
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self._last = self._origin
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        now = time.perf_counter()
+        ms = round((now - self._last) * 1000, 2)
+        self.phases.append((phase, ms))
+        self._last = now
+        return ms
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases_ms": dict(self.phases),
+            "total_ms": round((self._last - self._origin) * 1000, 2),
+        }
+
+
+# Service factories import inside, so the SDKs they need load on first use only
+
+def _destinations():
+    from services.destination_index import DestinationIndex
+    return DestinationIndex()
+
+
+def _chat():
+    from services.chat_service import ChatService
+    return ChatService(destinations=container.get("destinations"))
+
+
+def _vision():
+    from services.vision_service import VisionService
+    return VisionService()
+
+
+def _transit():
+    from services.transit_service import TransitService
+    return TransitService()
+
+
+def _climate_engine():
+    from services.climate_service import ClimateEngine
+    return ClimateEngine()
+
+
+def _emissions():
+    from services.emissions_service import EmissionsService
+    return EmissionsService()
+
+
+def _electricity_maps():
+    from services.electricity_maps_service import ElectricityMapsService
+    return ElectricityMapsService()
+
+
+def _departure_optimizer():
+    from services.departure_optimizer import DepartureOptimizer
+    return DepartureOptimizer(container.get("climate_engine"))
+
+
+def _education():
+    from services.climate_education_service import ClimateEducationService
+    return ClimateEducationService()
+
+
+container = Container()
+container.register("destinations", _destinations)
+container.register("chat", _chat)
+container.register("vision", _vision)
+container.register("transit", _transit)
+container.register("climate_engine", _climate_engine)
+container.register("emissions", _emissions)
+container.register("electricity_maps", _electricity_maps)
+container.register("departure_optimizer", _departure_optimizer)
+container.register("education", _education)
+
+# Started by main.py as its first statement
+startup_clock = StartupClock()
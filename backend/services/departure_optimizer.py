@@ -0,0 +1,158 @@
+import math
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from operator import sub
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.climate_service import ClimateEngine
+from services.electricity_maps_service import ElectricityMapsService
+
+Segment = Dict[str, Any]  # {"mode": "subway", "minutes": 12, "distance_km": 6.0}
+
+
+def _utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        at = value
+    else:
+        try:
+            at = datetime.fromisoformat(str(value))
+        except (TypeError, ValueError):
+            return None
+    return at.replace(tzinfo=timezone.utc) if at.tzinfo is None else at.astimezone(timezone.utc)
+
+
+def _minutes(td: timedelta) -> float:
+    return td.total_seconds() / 60.0
+
+
+def _iso(at: datetime) -> str:
+    return at.isoformat().replace("+00:00", "Z")
+
+
+class DepartureOptimizer:
+    """
+    Ranks departure times for a trip by the grid intensity its electric segments would
+    run on, traded off against how long the traveller waits and rides.
+
+    The forecast is laid out as one value per minute and turned into a prefix sum, so
+    the intensity integrated under any stretch of the trip is a single subtraction.
+    Each electric segment then gets its emissions for every possible start minute in
+    one pass over that array; candidate departures (a timetable, or one every headway)
+    only index into the result, so their number does not change the cost.
+    """
+
+    def __init__(self, engine: Optional[ClimateEngine] = None) -> None:
+        self.engine = engine or ClimateEngine()
+
+    @staticmethod
+    def forecast_minutes(points: Iterable[Tuple[datetime, float]], start: datetime, horizon_min: int) -> array:
+        """
+        Per-minute intensity from `start`, each forecast value held until the next one.
+        The first value also covers any minutes before it; the array stops where the
+        forecast does (last point plus one forecast interval), at most `horizon_min` long.
+        """
+        pts = sorted(points)
+        grid = array("d")
+        if not pts:
+            return grid
+        last_gap = pts[-1][0] - pts[-2][0] if len(pts) > 1 else timedelta(hours=1)
+        for i, (at, ci) in enumerate(pts):
+            span_end = pts[i + 1][0] if i + 1 < len(pts) else at + last_gap
+            end = min(horizon_min, math.ceil(_minutes(span_end - start)))
+            if end > len(grid):
+                grid.extend(array("d", [ci]) * (end - len(grid)))
+        return grid
+
+    def _segment_costs(self, segments: Sequence[Segment]) -> Tuple[List[Tuple[int, int, float]], float, int]:
+        """([(offset_min, length_min, kg per gCO2/kWh) per electric segment], fixed kg, duration_min)."""
+        electric: List[Tuple[int, int, float]] = []
+        fixed_kg = 0.0
+        offset = 0
+        for seg in segments:
+            length = max(1, int(round(float(seg["minutes"]))))
+            mode = (seg.get("mode") or "").lower().strip()
+            distance_km = float(seg["distance_km"])
+            if mode in self.engine.ELECTRIC_MODES:
+                # Emissions are linear in intensity: the engine's figure at 1 gCO2/kWh is the slope
+                electric.append((offset, length, self.engine._electric_emissions_kg(distance_km, 1.0)))
+            else:
+                fixed_kg += self.engine.calculate_savings(distance_km, mode)["actual_kg"]
+            offset += length
+        return electric, fixed_kg, offset
+
+    def optimize_departures(
+        self,
+        forecast: Sequence[Dict[str, Any]],
+        segments: Sequence[Segment],
+        earliest: datetime,
+        window_hours: float = 12.0,
+        headway_minutes: float = 10.0,
+        departures: Optional[Sequence[datetime]] = None,
+        top_n: int = 3,
+        delay_weight_kg_per_min: float = 0.001,
+    ) -> Dict[str, Any]:
+        """
+        Score departures between `earliest` and `window_hours` later: the scheduled
+        `departures` if given, else one every `headway_minutes`. A departure must let the
+        whole trip finish inside the forecast.
+
+        score = trip CO2 (kg) + delay_weight_kg_per_min * (wait + ride minutes)
+
+        Returns the `top_n` lowest scores ("best"), the earliest candidate for
+        comparison, and how many candidates were scored.
+        """
+        start = _utc(earliest).replace(second=0, microsecond=0)
+        electric, fixed_kg, duration = self._segment_costs(segments)
+        window = int(window_hours * 60)
+
+        points = []
+        for p in forecast:
+            if not isinstance(p, dict):
+                continue
+            at = _utc(p.get("datetime") or p.get("time"))
+            ci = ElectricityMapsService._extract_ci_value(p)
+            if at is not None and ci is not None:
+                points.append((at, ci))
+        grid = self.forecast_minutes(points, start, window + duration)
+        last_start = min(window, len(grid) - duration)
+        if last_start < 0:
+            return {"best": [], "earliest": None, "candidates": 0}
+
+        # Sliding windows for all start minutes at once: prefix[i + L] - prefix[i]
+        prefix = array("d", accumulate(grid, initial=0.0))
+        starts = last_start + 1
+        kg = array("d", [fixed_kg]) * starts
+        ci_sum = array("d", bytes(8 * starts))
+        electric_min = 0
+        for offset, length, kg_per_ci in electric:
+            window_sums = array("d", map(sub, prefix[offset + length:offset + length + starts], prefix[offset:offset + starts]))
+            kg = array("d", (k + kg_per_ci * s / length for k, s in zip(kg, window_sums)))
+            ci_sum = array("d", map(float.__add__, ci_sum, window_sums))
+            electric_min += length
+
+        if departures is not None:
+            offsets = sorted({
+                int(round(_minutes(_utc(d) - start))) for d in departures if _utc(d) is not None
+            })
+            offsets = [o for o in offsets if 0 <= o < starts]
+        else:
+            offsets = list(range(0, starts, max(1, int(round(headway_minutes)))))
+
+        def _row(o: int) -> Dict[str, Any]:
+            return {
+                "departure": _iso(start + timedelta(minutes=o)),
+                "arrival": _iso(start + timedelta(minutes=o + duration)),
+                "wait_minutes": o,
+                "duration_minutes": duration,
+                "co2_kg": round(kg[o], 4),
+                "mean_intensity_gco2_per_kwh": round(ci_sum[o] / electric_min, 1) if electric_min else None,
+                "score": round(kg[o] + delay_weight_kg_per_min * (o + duration), 4),
+            }
+
+        ranked = sorted(offsets, key=lambda o: (kg[o] + delay_weight_kg_per_min * (o + duration), o))
+        return {
+            "best": [_row(o) for o in ranked[: max(1, int(top_n))]],
+            "earliest": _row(offsets[0]) if offsets else None,
+            "candidates": len(offsets),
+        }
@@ -0,0 +1,238 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Stop names the index knows about out of the box. More can be added at runtime
+# with DestinationIndex.add_names() (e.g. from a GTFS stops file).
+DEFAULT_STOP_NAMES = [
+    "Union Station",
+    "CN Tower",
+    "Downtown Toronto",
+    "Toronto Pearson Airport",
+    "Eaton Centre",
+    "Toronto General Hospital",
+    "University of Toronto",
+    "Toronto Public Library",
+    "Shloka Market Bus Stop",
+    "St Andrew Station",
+    "King Station",
+    "Queen Station",
+    "Dundas Station",
+    "Bloor-Yonge Station",
+    "Spadina Station",
+    "Kipling Station",
+    "Kennedy Station",
+    "Finch Station",
+    "Waterfront Station",
+    "Commercial-Broadway Station",
+    "Metrotown Station",
+    "Granville Station",
+    "Burrard Station",
+    "Main Street-Science World Station",
+    "Vancouver City Centre Station",
+    "Stadium-Chinatown Station",
+]
+
+# Words that carry no destination information in spoken requests.
+_FILLER_WORDS = {
+    "i", "id", "im", "want", "wanna", "would", "like", "to", "go", "get", "going", "take", "me",
+    "please", "the", "a", "an", "um", "uh", "er", "ah", "hmm", "can", "you", "could", "need",
+    "head", "bring", "towards", "toward", "for", "directions", "navigate", "now", "so", "okay",
+}
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _ch in _letters:
+        _SOUNDEX_CODES[_ch] = _digit
+
+
+# Initial consonants that sound alike ("cing" / "king", "zero" / "sero").
+_INITIAL_FOLD = {"c": "K", "q": "K", "z": "S", "v": "F"}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    t = (text or "").lower().replace("-", " ")
+    t = _NON_WORD_RE.sub(" ", t)
+    return _SPACE_RE.sub(" ", t).strip()
+
+
+def _content_tokens(text: str) -> List[str]:
+    return [tok for tok in normalize_text(text).split() if tok not in _FILLER_WORDS]
+
+
+def phonetic_key(word: str) -> str:
+    """
+    Soundex code with the leading letter folded the way Double Metaphone folds it
+    (every initial vowel becomes 'A'), so "onion" and "union" share a key.
+    """
+    w = "".join(ch for ch in word.lower() if ch.isalpha())
+    if not w:
+        return word
+    first = "A" if w[0] in "aeiouy" else _INITIAL_FOLD.get(w[0], w[0].upper())
+
+    digits = []
+    prev = _SOUNDEX_CODES.get(w[0], "")
+    for ch in w[1:]:
+        code = _SOUNDEX_CODES.get(ch, "")
+        if code and code != prev:
+            digits.append(code)
+        if ch not in "hw":
+            prev = code
+    return (first + "".join(digits) + "000")[:4]
+
+
+def _phrase_key(tokens: Iterable[str]) -> str:
+    return " ".join(phonetic_key(t) for t in tokens)
+
+
+class DestinationIndex:
+    """
+    Resolves messy speech-to-text destinations locally before anything is sent to the LLM.
+
+    Layers, in lookup order:
+      - the known stop names themselves ("union station"), which nothing can remap
+      - corrections a rider confirmed, kept for that rider only (bounded LRU)
+      - exact-match cache keyed by normalized input (LLM answers, earlier phonetic hits)
+      - phonetic index over known stop names, matched against every word window of the input
+    """
+
+    def __init__(
+        self,
+        names: Optional[Iterable[str]] = None,
+        max_cache_entries: int = 5000,
+        max_learned_entries: int = 20000,
+    ) -> None:
+        self.max_cache_entries = max_cache_entries
+        self.max_learned_entries = max_learned_entries
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        self._name_keys: Dict[str, str] = {}
+        # (user, normalized input) and (user, "~" + phonetic key of the destination)
+        self._learned: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._by_key: Dict[str, Set[str]] = {}
+        self._names: Set[str] = set()
+        self._window_sizes: Set[int] = set()
+        self.hits = 0
+        self.misses = 0
+        self.add_names(DEFAULT_STOP_NAMES if names is None else names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add_names(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                self._add_name_locked(name)
+
+    def _add_name_locked(self, name: str) -> None:
+        name = (name or "").strip()
+        tokens = _content_tokens(name)
+        if not tokens or name in self._names:
+            return
+        self._names.add(name)
+        self._by_key.setdefault(_phrase_key(tokens), set()).add(name)
+        self._window_sizes.add(len(tokens))
+        # A bare name ("union station") is also an exact hit.
+        self._name_keys.setdefault(" ".join(tokens), name)
+
+    def _exact_put_locked(self, key: str, value: str) -> None:
+        self._exact[key] = value
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.max_cache_entries:
+            self._exact.popitem(last=False)
+
+    def _learned_put_locked(self, key: Tuple[str, str], value: str) -> None:
+        self._learned[key] = value
+        self._learned.move_to_end(key)
+        while len(self._learned) > self.max_learned_entries:
+            self._learned.popitem(last=False)
+
+    def _learned_match_locked(self, user_id: str, key: str, tokens: List[str]) -> Optional[str]:
+        hit = self._learned.get((user_id, key))
+        if hit is None:
+            keys = [phonetic_key(t) for t in tokens]
+            for size in range(len(keys), 0, -1):
+                for start in range(len(keys) - size, -1, -1):
+                    hit = self._learned.get((user_id, "~" + " ".join(keys[start:start + size])))
+                    if hit is not None:
+                        break
+                if hit is not None:
+                    break
+        return hit
+
+    def lookup(self, text: str, user_id: Optional[str] = None) -> Optional[str]:
+        """
+        Return a known destination for `text`, or None if it needs the LLM. With a
+        `user_id`, that rider's confirmed corrections are consulted too.
+        """
+        tokens = _content_tokens(text)
+        if not tokens:
+            return None
+        key = " ".join(tokens)
+
+        with self._lock:
+            hit = self._name_keys.get(key)
+            if hit is None and user_id and self._learned:
+                hit = self._learned_match_locked(user_id, key, tokens)
+            if hit is None:
+                hit = self._exact.get(key)
+                if hit is not None:
+                    self._exact.move_to_end(key)
+            if hit is not None:
+                self.hits += 1
+                return hit
+
+            match = self._phonetic_match_locked(tokens)
+            if match is not None:
+                self._exact_put_locked(key, match)
+                self.hits += 1
+                return match
+
+            self.misses += 1
+            return None
+
+    def _phonetic_match_locked(self, tokens: List[str]) -> Optional[str]:
+        keys = [phonetic_key(t) for t in tokens]
+        # Destinations usually come last in a sentence, so scan windows right-to-left,
+        # longest names first. An ambiguous key (two names sound alike) is not a match.
+        for size in sorted(self._window_sizes, reverse=True):
+            for start in range(len(keys) - size, -1, -1):
+                names = self._by_key.get(" ".join(keys[start:start + size]))
+                if names and len(names) == 1:
+                    return next(iter(names))
+        return None
+
+    def remember(self, text: str, destination: str) -> None:
+        """Cache an LLM answer for this exact (normalized) input. A stop's own name is never remapped."""
+        key = " ".join(_content_tokens(text))
+        destination = (destination or "").strip()
+        if not key or not destination:
+            return
+        with self._lock:
+            if key not in self._name_keys:
+                self._exact_put_locked(key, destination)
+
+    def learn(self, user_id: str, text: str, destination: str) -> None:
+        """
+        Record a rider's confirmed correction: for that rider, the input maps to
+        `destination` from now on, and so do phonetic neighbours of `destination`.
+        Other riders and the stop names themselves are unaffected.
+        """
+        key = " ".join(_content_tokens(text))
+        destination = (destination or "").strip()
+        dest_tokens = _content_tokens(destination)
+        if not user_id or not key or not dest_tokens:
+            return
+        with self._lock:
+            if key not in self._name_keys:
+                self._learned_put_locked((user_id, key), destination)
+            self._learned_put_locked((user_id, "~" + _phrase_key(dest_tokens)), destination)
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
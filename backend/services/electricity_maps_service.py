@@ -1,7 +1,16 @@
 import os
-from typing import Any, Dict, List, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-import httpx
+from services.carbon_forecast import carbon_forecaster
+from services.http_clients import sync_client
+from services.prefetch import prefetcher, region_center
+from services.resilience import get_guard, raise_for_provider_status
+from services.snapshots import LocalKeyed, snapshot_store
+
+LATEST_PATH = "/v3/carbon-intensity/latest"
+FORECAST_PATH = "/v3/carbon-intensity/forecast"
 
 class ElectricityMapsService:
     """
@@ -14,34 +23,116 @@ class ElectricityMapsService:
     def __init__(self) -> None:
         self.api_key = os.getenv("ELECTRICITY_MAPS_API_KEY", "").strip()
         self.base_url = os.getenv("ELECTRICITY_MAPS_BASE_URL", "https://api.electricitymap.org").strip()
+        # With several workers, answers younger than this are read from the host snapshot
+        self.snapshot_ttl_s = float(os.getenv("ELECTRICITY_MAPS_SNAPSHOT_TTL_S", "900"))
+        self.snapshots = snapshot_store
+        # Forecasts are prefetched this far ahead and cut down to each request's horizon
+        self.prefetch_horizon_h = int(os.getenv("ELECTRICITY_MAPS_PREFETCH_HORIZON_H", "72"))
+        # Per-region answers the prefetch scheduler keeps fresh (shared by the host's workers)
+        self.regions = snapshot_store.carbon if snapshot_store is not None else LocalKeyed()
 
-    def _get_json(self, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        if not self.api_key:
-            return None
-        try:
-            url = f"{self.base_url}{path}"
-            headers = {"auth-token": self.api_key}
-            with httpx.Client(timeout=10.0) as client:
-                r = client.get(url, headers=headers, params=params)
+    @staticmethod
+    def _key(path: str, params: Dict[str, Any]) -> str:
+        return f"{path}?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    def _fetch(self, path: str, params: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(cache key, JSON or None) straight from the provider, through its guard."""
+        url = f"{self.base_url}{path}"
+        headers = {"auth-token": self.api_key}
+
+        def _request() -> Optional[Dict[str, Any]]:
+            r = sync_client().get(url, headers=headers, params=params, timeout=10.0)
+            raise_for_provider_status(r.status_code)
             if r.status_code != 200:
                 return None
             return r.json()
-        except Exception:
+
+        key = self._key(path, params)
+        # Breaker-guarded and hedged; serves the last good answer while the circuit is open
+        return key, get_guard("electricity_maps").call(key, _request)
+
+    def _get_json(self, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.api_key:
             return None
+        key = self._key(path, params)
+        if self.snapshots is not None:
+            hit = self.snapshots.carbon.get(key)
+            if hit is not None and time.time() - hit[0] < self.snapshot_ttl_s:
+                return hit[1]
+
+        key, data = self._fetch(path, params)
+        if data is not None and self.snapshots is not None:
+            self.snapshots.carbon.put(key, data, get_guard("electricity_maps").cached_at(key))
+        return data
+
+    def _prefetched(self, kind: str, lat: float, lon: float) -> Tuple[Optional[Any], bool]:
+        """
+        (the scheduler's latest answer for the region around (lat, lon), whether it is
+        stale). A cold or stale region also gets a refresh request.
+        """
+        if not self.api_key:
+            return None, False
+        region = prefetcher.touch(lat, lon)
+        hit = self.regions.get(f"{kind}:{region}")
+        if hit is None:
+            prefetcher.request(region)
+            return None, False
+        stale = prefetcher.is_stale(f"carbon_{kind}", hit[0])
+        if stale:
+            prefetcher.request(region)
+        return hit[1], stale
+
+    def refresh_latest(self, region: str) -> None:
+        """Prefetch job: latest intensity for a region's centre. Raises when the provider had none."""
+        lat, lon = region_center(region)
+        key, data = self._fetch(LATEST_PATH, {"lat": lat, "lon": lon})
+        if data is None:
+            raise RuntimeError(f"no latest carbon intensity for {region}")
+        fetched_at = get_guard("electricity_maps").cached_at(key)
+        self.regions.put(f"latest:{region}", data, fetched_at)
+        # Feed the history the local forecaster falls back on when the provider has nothing
+        ci = self._extract_ci_value(data)
+        if ci is not None:
+            carbon_forecaster.record(region, data.get("zone"), ci, data.get("datetime"))
+
+    def refresh_forecast(self, region: str) -> None:
+        """Prefetch job: the full-horizon forecast for a region's centre."""
+        lat, lon = region_center(region)
+        key, data = self._fetch(FORECAST_PATH, {"lat": lat, "lon": lon, "horizon": self.prefetch_horizon_h})
+        points = self._forecast_points(data)
+        if points is None:
+            raise RuntimeError(f"no carbon intensity forecast for {region}")
+        self.regions.put(f"forecast:{region}", points, get_guard("electricity_maps").cached_at(key))
 
     def latest_carbon_intensity(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """
         GET /v3/carbon-intensity/latest?lat=...&lon=...
         Returns dict including carbonIntensity (gCO2eq/kWh) depending on API response shape.
+        While the prefetch scheduler runs, answers come from its region snapshot only;
+        one that missed its refresh comes back with "stale": True.
         """
-        return self._get_json("/v3/carbon-intensity/latest", {"lat": lat, "lon": lon})
+        if prefetcher.running:
+            data, stale = self._prefetched("latest", lat, lon)
+            return {**data, "stale": True} if stale and isinstance(data, dict) else data
+        return self._get_json(LATEST_PATH, {"lat": lat, "lon": lon})
 
     def forecast_carbon_intensity(self, lat: float, lon: float, horizon_hours: int = 24) -> Optional[List[Dict[str, Any]]]:
         """
         GET /v3/carbon-intensity/forecast?lat=...&lon=...&horizon=...
         Returns list under forecast/data depending on API response shape.
+        Points of a prefetched forecast that missed its refresh carry "stale": True.
         """
-        data = self._get_json("/v3/carbon-intensity/forecast", {"lat": lat, "lon": lon, "horizon": int(horizon_hours)})
+        if prefetcher.running:
+            points, stale = self._prefetched("forecast", lat, lon)
+            if points is None:
+                return None
+            points = self._within_horizon(points, horizon_hours)
+            return [{**p, "stale": True} for p in points] if stale else points
+        data = self._get_json(FORECAST_PATH, {"lat": lat, "lon": lon, "horizon": int(horizon_hours)})
+        return self._forecast_points(data)
+
+    @staticmethod
+    def _forecast_points(data: Any) -> Optional[List[Dict[str, Any]]]:
         if not isinstance(data, dict):
             return None
         if isinstance(data.get("forecast"), list):
@@ -50,6 +141,24 @@ class ElectricityMapsService:
             return data["data"]
         return None
 
+    @staticmethod
+    def _within_horizon(points: List[Dict[str, Any]], horizon_hours: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Points of a prefetched forecast from the current hour up to `horizon_hours` ahead."""
+        now = now or datetime.now(timezone.utc)
+        start = now.replace(minute=0, second=0, microsecond=0)
+        end = now + timedelta(hours=int(horizon_hours))
+        out: List[Dict[str, Any]] = []
+        for p in points:
+            try:
+                at = datetime.fromisoformat(str(p.get("datetime")))
+            except (TypeError, ValueError):
+                return points[: int(horizon_hours)]  # undated points: assume hourly from now
+            if at.tzinfo is None:
+                at = at.replace(tzinfo=timezone.utc)
+            if start <= at <= end:
+                out.append(p)
+        return out
+
     @staticmethod
     def _extract_ci_value(point: Dict[str, Any]) -> Optional[float]:
         for k in ("carbonIntensity", "carbon_intensity", "value"):
@@ -77,7 +186,10 @@ class ElectricityMapsService:
             ci = self._extract_ci_value(p)
             if ci is None:
                 continue
-            scored.append({"time": p.get("datetime") or p.get("time"), "carbonIntensity": ci})
+            item = {"time": p.get("datetime") or p.get("time"), "carbonIntensity": ci}
+            if p.get("stale"):
+                item["stale"] = True
+            scored.append(item)
 
         scored.sort(key=lambda x: x["carbonIntensity"])
         return scored[: max(1, int(top_n))]
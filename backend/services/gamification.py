@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from services.badge_engine import badge_engine
+from services.leaderboard import leaderboard
+from services.trip_store import trip_store
+
+
+def record_trip_event(user_id: str, impact: Dict[str, Any], ts_utc: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Everything that happens when a user completes a trip: ledger + aggregates,
+    leaderboard scores, and any badges the trip unlocks.
+    Blocking (SQLite), so async routes run it in a thread.
+    """
+    ts = ts_utc or datetime.now(timezone.utc)
+    # Counters and badges commit together: a crash can't leave a counted trip unawarded
+    stats = trip_store.record_trip(
+        user_id, impact, ts_utc=ts, counters=badge_engine.counter_deltas(impact), award=badge_engine.evaluate
+    )
+    leaderboard.award(user_id, int(impact.get("points_earned") or 0), float(impact.get("co2_saved_kg") or 0.0), ts=ts)
+
+    return {
+        "stats": stats,
+        "new_badges": badge_engine.describe((b, ts.isoformat()) for b in stats["new_badges"]),
+    }
+
+
+def user_summary(user_id: str) -> Dict[str, Any]:
+    """Read path for /api/user/{user_id}/stats: precomputed rows only."""
+    stats = trip_store.get_stats(user_id)
+    stats["counters"] = trip_store.get_counters(user_id)
+    return {
+        "user_id": user_id,
+        "total_co2_saved_kg": stats["total_co2_saved_kg"],
+        "total_trips": stats["total_trips"],
+        "total_points": stats["total_points"],
+        "badges": badge_engine.describe(trip_store.get_badges(user_id)),
+        "active_challenges": badge_engine.challenge_progress(stats),
+        "sustainability_streak_days": stats["streak_days"],
+        "best_streak_days": stats["best_streak_days"],
+        "ranking": leaderboard.tier(user_id),
+    }
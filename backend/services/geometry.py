@@ -0,0 +1,215 @@
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Coord = Sequence[float]  # GeoJSON order: (lon, lat)
+
+_M_PER_DEG_LAT = 110_540.0
+_M_PER_DEG_LON = 111_320.0
+_WEB_MERCATOR_M_PER_PX = 156_543.03392  # metres per pixel at zoom 0 on the equator (256px tiles)
+
+
+def zoom_tolerance_m(zoom: float, lat: float, px: float = 0.5) -> float:
+    """Metres covered by `px` screen pixels at `zoom` and latitude: error below that is invisible."""
+    return px * _WEB_MERCATOR_M_PER_PX * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def _project(coords: Sequence[Coord]) -> Tuple[List[float], List[float]]:
+    """Local equirectangular projection to metres; plenty accurate at route scale."""
+    lat0 = coords[0][1]
+    kx = _M_PER_DEG_LON * math.cos(math.radians(lat0))
+    return [c[0] * kx for c in coords], [c[1] * _M_PER_DEG_LAT for c in coords]
+
+
+def douglas_peucker(coords: Sequence[Coord], tolerance_m: float) -> List[Coord]:
+    """Ramer-Douglas-Peucker, iterative (no recursion limit on long routes)."""
+    n = len(coords)
+    if n < 3 or tolerance_m <= 0:
+        return list(coords)
+    xs, ys = _project(coords)
+    keep = bytearray(n)
+    keep[0] = keep[n - 1] = 1
+    tol2 = tolerance_m * tolerance_m
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        seg2 = dx * dx + dy * dy
+        worst, worst_d2 = -1, tol2
+        # The hot loop of the whole route endpoint: no calls or divisions per point. Points
+        # that project inside the segment compare cross**2 against worst_d2 * seg2.
+        i = first
+        for px, py in zip(xs[first + 1:last], ys[first + 1:last]):
+            i += 1
+            px -= ax
+            py -= ay
+            t = px * dx + py * dy
+            if t <= 0.0 or seg2 == 0.0:
+                d2 = px * px + py * py
+            elif t >= seg2:
+                ex, ey = px - dx, py - dy
+                d2 = ex * ex + ey * ey
+            else:
+                cross = px * dy - py * dx
+                if cross * cross <= worst_d2 * seg2:
+                    continue
+                d2 = cross * cross / seg2
+            if d2 > worst_d2:
+                worst, worst_d2 = i, d2
+        if worst != -1:
+            keep[worst] = 1
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [c for c, k in zip(coords, keep) if k]
+
+
+def visvalingam(coords: Sequence[Coord], tolerance_m: float) -> List[Coord]:
+    """
+    Visvalingam-Whyatt: repeatedly drop the point whose triangle with its neighbours
+    has the smallest area, until every remaining triangle exceeds tolerance_m**2 / 2.
+    Uses a heap with lazy invalidation over a linked list of survivors.
+    """
+    n = len(coords)
+    if n < 3 or tolerance_m <= 0:
+        return list(coords)
+    xs, ys = _project(coords)
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    alive = bytearray(b"\x01") * n
+    min_area = tolerance_m * tolerance_m / 2.0
+
+    def area(i: int) -> float:
+        a, c = prev[i], nxt[i]
+        return abs((xs[a] - xs[i]) * (ys[c] - ys[i]) - (xs[c] - xs[i]) * (ys[a] - ys[i])) / 2.0
+
+    areas = [0.0] * n
+    heap: List[Tuple[float, int]] = []
+    for i in range(1, n - 1):
+        areas[i] = area(i)
+        heap.append((areas[i], i))
+    heapq.heapify(heap)
+
+    while heap:
+        a, i = heapq.heappop(heap)
+        if not alive[i] or a != areas[i]:
+            continue  # stale entry
+        if a >= min_area:
+            break
+        alive[i] = 0
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                # Never let a neighbour's area drop below the one just removed, so the
+                # removal order stays monotonic (standard V-W refinement).
+                areas[j] = max(area(j), a)
+                heapq.heappush(heap, (areas[j], j))
+    return [c for c, k in zip(coords, alive) if k]
+
+
+SIMPLIFIERS = {"dp": douglas_peucker, "vw": visvalingam}
+
+
+def encode_polyline(coords: Sequence[Coord], precision: int = 5) -> str:
+    """Google encoded polyline (lat,lon order) from GeoJSON (lon,lat) coordinates."""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for c in coords:
+        lat = int(round(c[1] * factor))
+        lon = int(round(c[0] * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            v = ~(delta << 1) if delta < 0 else delta << 1
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1F)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev_lat, prev_lon = lat, lon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode_polyline, returning GeoJSON (lon, lat) pairs."""
+    factor = float(10 ** precision)
+    coords: List[List[float]] = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append([lon / factor, lat / factor])
+    return coords
+
+
+def compact_steps(legs: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    OSRM legs with each step cut down to what a turn-by-turn list shows: name,
+    distance, duration, mode and the maneuver (type, modifier, location). Step
+    geometries and intersections, usually most of the payload, are dropped.
+    """
+    out = []
+    for leg in legs:
+        steps = []
+        for s in leg.get("steps") or []:
+            m = s.get("maneuver") or {}
+            step = {
+                "name": s.get("name") or "",
+                "distance_m": round(float(s.get("distance") or 0.0), 1),
+                "duration_s": round(float(s.get("duration") or 0.0), 1),
+                "mode": s.get("mode"),
+                "maneuver": m.get("type"),
+                "location": m.get("location"),
+            }
+            if m.get("modifier"):
+                step["modifier"] = m["modifier"]
+            steps.append(step)
+        out.append({
+            "distance_m": leg.get("distance"),
+            "duration_s": leg.get("duration"),
+            "summary": leg.get("summary"),
+            "steps": steps,
+        })
+    return out
+
+
+def shape_geometry(
+    geometry: Optional[Dict[str, Any]],
+    fmt: str = "geojson",
+    zoom: Optional[float] = None,
+    tolerance_m: Optional[float] = None,
+    method: str = "dp",
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Simplify an OSRM GeoJSON LineString and encode it as requested.
+
+    Tolerance comes from `tolerance_m`, else from `zoom` (half a pixel at that zoom),
+    else 0.5 m, which only drops points that are effectively collinear.
+    Returns (geometry, info) where info reports the point counts and tolerance used.
+    """
+    coords = (geometry or {}).get("coordinates") or []
+    if not coords:
+        return geometry, {"points_in": 0, "points_out": 0, "tolerance_m": 0.0}
+
+    if tolerance_m is None:
+        tolerance_m = zoom_tolerance_m(zoom, coords[0][1]) if zoom is not None else 0.5
+    simplified = SIMPLIFIERS[method](coords, tolerance_m)
+    info = {"points_in": len(coords), "points_out": len(simplified), "tolerance_m": round(tolerance_m, 3)}
+
+    if fmt == "polyline":
+        return encode_polyline(simplified, 5), info
+    if fmt == "polyline6":
+        return encode_polyline(simplified, 6), info
+    return {"type": "LineString", "coordinates": simplified}, info
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+
+# Per-request timeouts are passed by each provider; this only bounds a call that passes none
+DEFAULT_TIMEOUT_S = 20.0
+
+_lock = threading.Lock()
+_sync: Optional[httpx.Client] = None
+_async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def sync_client() -> httpx.Client:
+    """
+    Process-wide httpx.Client for the blocking providers. Building a client costs
+    tens of milliseconds of CPU (TLS context, pool), so it is made once and its
+    keep-alive connections are reused by every call.
+    """
+    global _sync
+    client = _sync
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        if _sync is None or _sync.is_closed:
+            _sync = httpx.Client(timeout=DEFAULT_TIMEOUT_S)
+        return _sync
+
+
+def async_client() -> httpx.AsyncClient:
+    """
+    httpx.AsyncClient for the running event loop. Its connections belong to that
+    loop, so each loop (one per worker; tests start several) gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_S)
+            _async[loop] = client
+        return client
+
+
+async def aclose_clients() -> None:
+    """Close the shared clients (worker shutdown); the next call builds new ones."""
+    global _sync
+    with _lock:
+        sync, _sync = _sync, None
+        client = _async.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+    if sync is not None:
+        sync.close()
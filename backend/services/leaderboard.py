@@ -0,0 +1,416 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.shared_state import worker_sync
+from services.trip_store import trip_store
+
+DATA_DIR = Path(os.getenv("TRANSIT_DATA_DIR") or Path(__file__).resolve().parents[1] / "data")
+SNAPSHOT_PATH = DATA_DIR / "leaderboard.json"
+
+_MAX_LEVEL = 24
+
+WINDOWS = ("daily", "weekly", "all_time")
+METRICS = ("points", "co2_saved_kg")
+
+
+class _Node:
+    __slots__ = ("key", "member", "forward", "span")
+
+    def __init__(self, key: Tuple[float, str], member: Optional[str], level: int) -> None:
+        self.key = key
+        self.member = member
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+
+
+class IndexableSkipList:
+    """
+    Sorted set of (score, member) ordered high score first, ties by member id.
+
+    Each forward link records how many nodes it skips (its span), which gives
+    O(log n) insert, delete, rank-of and select-by-rank, the same structure Redis
+    uses for sorted sets.
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self._rnd = random.Random(seed)
+        self._head = _Node((0.0, ""), None, _MAX_LEVEL)
+        self._level = 1
+        self._len = 0
+        self._scores: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._scores
+
+    def score(self, member: str) -> Optional[float]:
+        return self._scores.get(member)
+
+    def scores(self) -> Dict[str, float]:
+        """A copy of every member's score, in no particular order (a dict copy, not a walk)."""
+        return dict(self._scores)
+
+    @staticmethod
+    def _sort_key(score: float, member: str) -> Tuple[float, str]:
+        # negate so the natural ascending walk visits the highest score first
+        return (-score, member)
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < _MAX_LEVEL and self._rnd.random() < 0.25:
+            level += 1
+        return level
+
+    def add(self, member: str, score: float) -> None:
+        """Insert or re-score `member`."""
+        if member in self._scores:
+            if self._scores[member] == score:
+                return
+            self.remove(member)
+
+        key = self._sort_key(score, member)
+        update: List[_Node] = [self._head] * _MAX_LEVEL
+        rank = [0] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            nxt = node.forward[i]
+            while nxt is not None and nxt.key < key:
+                rank[i] += node.span[i]
+                node = nxt
+                nxt = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                update[i].span[i] = self._len
+            self._level = level
+
+        new = _Node(key, member, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+        self._scores[member] = score
+        self._len += 1
+
+    def remove(self, member: str) -> bool:
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        key = self._sort_key(score, member)
+        update: List[_Node] = [self._head] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            nxt = node.forward[i]
+            while nxt is not None and nxt.key < key:
+                node = nxt
+                nxt = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._len -= 1
+        return True
+
+    def rank(self, member: str) -> Optional[int]:
+        """0-based position (0 = top), or None."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = self._sort_key(score, member)
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            nxt = node.forward[i]
+            while nxt is not None and nxt.key <= key:
+                rank += node.span[i]
+                node = nxt
+                nxt = node.forward[i]
+            if node.key == key and node is not self._head:
+                return rank - 1
+        return None
+
+    def _node_at(self, index: int) -> Optional[_Node]:
+        if index < 0 or index >= self._len:
+            return None
+        traversed = 0
+        node = self._head
+        target = index + 1
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.span[i] <= target:
+                traversed += node.span[i]
+                node = node.forward[i]  # type: ignore[assignment]
+            if traversed == target:
+                return node
+        return None
+
+    def range(self, start: int, stop: int) -> Iterator[Tuple[int, str, float]]:
+        """Yield (rank, member, score) for ranks in [start, stop)."""
+        start = max(0, start)
+        node = self._node_at(start)
+        rank = start
+        while node is not None and rank < stop:
+            yield rank, node.member, -node.key[0]  # type: ignore[misc]
+            node = node.forward[0]
+            rank += 1
+
+
+def _period_id(window: str, ts: datetime) -> str:
+    if window == "daily":
+        return ts.strftime("%Y-%m-%d")
+    if window == "weekly":
+        year, week, _ = ts.isocalendar()
+        return f"{year}-W{week:02d}"
+    return "all"
+
+
+class Leaderboard:
+    """
+    Users ranked by points and by CO2 saved, over daily / weekly / all-time windows.
+
+    One skip list per (window, metric). award() is O(log n) per board; when a day or
+    week rolls over, that window's boards start empty. Boards are snapshotted to a
+    JSON file periodically, from a background thread, and reloaded on start-up.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[Path] = None,
+        snapshot_every_s: float = 60.0,
+        rebuild_source: Optional[Callable[[], Iterable[Tuple[str, float, float]]]] = None,
+    ) -> None:
+        self.snapshot_path = Path(snapshot_path) if snapshot_path is not None else SNAPSHOT_PATH
+        self.snapshot_every_s = snapshot_every_s
+        # (user_id, points, co2_saved_kg) totals; when set, all-time boards are rebuilt from it
+        # on start-up since the ledger is authoritative and the snapshot may trail it
+        self.rebuild_source = rebuild_source
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._boards: Dict[Tuple[str, str], IndexableSkipList] = {}
+        self._periods: Dict[str, str] = {}
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+        self._snapshotting = False
+        self._write_lock = threading.Lock()
+        now = datetime.now(timezone.utc)
+        for window in WINDOWS:
+            self._periods[window] = _period_id(window, now)
+            for metric in METRICS:
+                self._boards[(window, metric)] = IndexableSkipList()
+
+    def ensure_loaded(self) -> None:
+        """Restore from the snapshot (all-time from rebuild_source if set) once, on first use."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self.load()
+            if self.rebuild_source is not None:
+                with self._lock:
+                    for metric in METRICS:
+                        self._boards[("all_time", metric)] = IndexableSkipList()
+                for user_id, points, co2 in self.rebuild_source():
+                    self.set_score(user_id, "points", points)
+                    self.set_score(user_id, "co2_saved_kg", co2)
+            self._loaded = True
+
+    # ---------- writes ----------
+    def _roll_locked(self, ts: datetime) -> None:
+        for window in ("daily", "weekly"):
+            period = _period_id(window, ts)
+            # ids sort chronologically ("2026-03-01", "2026-W09"); only ever roll forward
+            if period > self._periods[window]:
+                self._periods[window] = period
+                for metric in METRICS:
+                    self._boards[(window, metric)] = IndexableSkipList()
+
+    def award(self, user_id: str, points: int, co2_saved_kg: float, ts: Optional[datetime] = None) -> None:
+        """Add one trip's points / CO2 to the user's score on every window."""
+        ts = ts or datetime.now(timezone.utc)
+        self.apply_award(user_id, points, co2_saved_kg, ts)
+        worker_sync.emit("leaderboard", {"user_id": user_id, "points": points, "co2_saved_kg": co2_saved_kg, "ts": ts.isoformat()})
+
+    def apply_award(
+        self, user_id: str, points: int, co2_saved_kg: float, ts: datetime, windows: Tuple[str, ...] = WINDOWS
+    ) -> None:
+        """award() without telling the other workers (also how their awards are replayed here)."""
+        self.ensure_loaded()
+        with self._lock:
+            self._roll_locked(ts)
+            for window in windows:
+                if self._periods[window] != _period_id(window, ts):
+                    continue  # late event for a window that has already closed
+                for metric, delta in (("points", float(points)), ("co2_saved_kg", float(co2_saved_kg))):
+                    board = self._boards[(window, metric)]
+                    board.add(user_id, (board.score(user_id) or 0.0) + delta)
+            self._dirty = True
+        self.maybe_snapshot()
+
+    def set_score(self, user_id: str, metric: str, score: float, window: str = "all_time") -> None:
+        """Overwrite a score (used when rebuilding from the trip store)."""
+        with self._lock:
+            self._boards[(window, metric)].add(user_id, float(score))
+            self._dirty = True
+
+    # ---------- reads ----------
+    def _board(self, window: str, metric: str) -> IndexableSkipList:
+        # caller holds self._lock; ensure_loaded() has already run
+        if (window, metric) not in self._boards:
+            raise ValueError(f"Unknown leaderboard {window}/{metric}")
+        self._roll_locked(datetime.now(timezone.utc))
+        return self._boards[(window, metric)]
+
+    @staticmethod
+    def _row(rank: int, member: str, score: float) -> Dict[str, Any]:
+        return {"rank": rank + 1, "user_id": member, "score": round(score, 3)}
+
+    def top(self, k: int = 10, window: str = "all_time", metric: str = "points") -> List[Dict[str, Any]]:
+        self.ensure_loaded()
+        with self._lock:
+            board = self._board(window, metric)
+            return [self._row(*r) for r in board.range(0, k)]
+
+    def rank_of(self, user_id: str, window: str = "all_time", metric: str = "points") -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        with self._lock:
+            board = self._board(window, metric)
+            rank = board.rank(user_id)
+            if rank is None:
+                return None
+            return {
+                **self._row(rank, user_id, board.score(user_id) or 0.0),
+                "total_ranked": len(board),
+                "percentile": round(100.0 * (1 - rank / max(1, len(board))), 1),
+            }
+
+    def around(self, user_id: str, n: int = 2, window: str = "all_time", metric: str = "points") -> List[Dict[str, Any]]:
+        """The user plus `n` neighbours above and below."""
+        self.ensure_loaded()
+        with self._lock:
+            board = self._board(window, metric)
+            rank = board.rank(user_id)
+            if rank is None:
+                return []
+            return [self._row(*r) for r in board.range(rank - n, rank + n + 1)]
+
+    def tier(self, user_id: str) -> str:
+        """Percentile tier on all-time points."""
+        info = self.rank_of(user_id)
+        if info is None:
+            return "Unranked"
+        pct = info["percentile"]
+        if pct >= 90:
+            return "Platinum Tier"
+        if pct >= 70:
+            return "Gold Tier"
+        if pct >= 40:
+            return "Silver Tier"
+        return "Bronze Tier"
+
+    # ---------- persistence ----------
+    def snapshot(self) -> None:
+        """Write every board to disk atomically (temp file + rename)."""
+        # Writers go one at a time so snapshots land in the order they were taken
+        with self._write_lock:
+            with self._lock:
+                # Only the copy happens under the board lock; serializing and writing do not
+                periods = dict(self._periods)
+                boards = {f"{w}:{m}": board.scores() for (w, m), board in self._boards.items()}
+                self._dirty = False
+                self._last_snapshot = time.monotonic()
+
+            data = {"periods": periods, "boards": {key: list(scores.items()) for key, scores in boards.items()}}
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_path.with_suffix(f".{os.getpid()}.tmp")  # workers may snapshot at once
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.snapshot_path)
+
+    def flush(self) -> None:
+        """Snapshot now if anything changed since the last snapshot (used at shutdown)."""
+        if self._dirty:
+            self.snapshot()
+
+    def maybe_snapshot(self) -> None:
+        """Start a snapshot in a background thread when one is due; the caller never waits on it."""
+        if not self._dirty or time.monotonic() - self._last_snapshot < self.snapshot_every_s:
+            return
+        with self._lock:
+            if self._snapshotting:
+                return
+            self._snapshotting = True
+            self._last_snapshot = time.monotonic()
+        threading.Thread(target=self._background_snapshot, name="leaderboard-snapshot", daemon=True).start()
+
+    def _background_snapshot(self) -> None:
+        try:
+            self.snapshot()
+        except OSError:
+            pass
+        finally:
+            self._snapshotting = False
+
+    def load(self) -> bool:
+        """Restore boards from the last snapshot. Windows whose period has passed stay empty."""
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for key, rows in (data.get("boards") or {}).items():
+                window, _, metric = key.partition(":")
+                if (window, metric) not in self._boards:
+                    continue
+                if data.get("periods", {}).get(window) != _period_id(window, now):
+                    continue
+                board = IndexableSkipList()
+                for member, score in rows:
+                    board.add(str(member), float(score))
+                self._boards[(window, metric)] = board
+        return True
+
+
+# Shared by the routes that award points (climate) and read rankings (users)
+leaderboard = Leaderboard(rebuild_source=trip_store.iter_user_totals)
+
+
+def _replay_award(event: Dict[str, Any]) -> None:
+    if not leaderboard._loaded:
+        return  # loading rebuilds from the trip ledger, which already has this trip
+    user_id = event["user_id"]
+    leaderboard.apply_award(
+        user_id, event["points"], event["co2_saved_kg"], datetime.fromisoformat(event["ts"]), windows=("daily", "weekly")
+    )
+    # All-time scores come from the ledger's totals, so a replay can never count a trip twice
+    stats = trip_store.get_stats(user_id)
+    leaderboard.set_score(user_id, "points", stats["total_points"])
+    leaderboard.set_score(user_id, "co2_saved_kg", stats["total_co2_saved_kg"])
+
+
+worker_sync.on("leaderboard", _replay_award)
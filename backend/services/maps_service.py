@@ -1,8 +1,13 @@
-import httpx
+import os
 from typing import Any, Dict, List
 
-NOMINATIM_BASE = "https://nominatim.openstreetmap.org"
-OSRM_BASE = "https://router.project-osrm.org"
+import httpx
+
+from services.http_clients import async_client
+from services.resilience import get_guard, raise_for_provider_status
+
+NOMINATIM_BASE = os.getenv("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org").rstrip("/")
+OSRM_BASE = os.getenv("OSRM_BASE_URL", "https://router.project-osrm.org").rstrip("/")
 
 HEADERS = {
     "User-Agent": "transit-accessibility-app/1.0 (school project)"
@@ -10,10 +15,15 @@ HEADERS = {
 
 async def geocode(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     params = {"q": query, "format": "json", "limit": limit}
-    async with httpx.AsyncClient(timeout=20.0, headers=HEADERS) as client:
-        r = await client.get(f"{NOMINATIM_BASE}/search", params=params)
-        r.raise_for_status()
-        return r.json()
+
+    async def _request() -> httpx.Response:
+        r = await async_client().get(f"{NOMINATIM_BASE}/search", params=params, headers=HEADERS, timeout=20.0)
+        raise_for_provider_status(r.status_code)
+        return r
+
+    r = await get_guard("nominatim").acall(f"search:{query}:{limit}", _request, raise_when_empty=True)
+    r.raise_for_status()
+    return r.json()
 
 async def route_osrm(
     origin_lat: float, origin_lon: float,
@@ -22,7 +32,12 @@ async def route_osrm(
 ) -> Dict[str, Any]:
     coords = f"{origin_lon},{origin_lat};{dest_lon},{dest_lat}"
     params = {"overview": "full", "geometries": "geojson", "steps": "true"}
-    async with httpx.AsyncClient(timeout=20.0, headers=HEADERS) as client:
-        r = await client.get(f"{OSRM_BASE}/route/v1/{profile}/{coords}", params=params)
-        r.raise_for_status()
-        return r.json()
+
+    async def _request() -> httpx.Response:
+        r = await async_client().get(f"{OSRM_BASE}/route/v1/{profile}/{coords}", params=params, headers=HEADERS, timeout=20.0)
+        raise_for_provider_status(r.status_code)
+        return r
+
+    r = await get_guard("osrm").acall(f"route:{profile}:{coords}", _request, raise_when_empty=True)
+    r.raise_for_status()
+    return r.json()
@@ -0,0 +1,345 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Seconds; covers a cache hit (~1 ms) up to a provider timing out
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Outbound providers known up front, so their label sets exist before the first call
+PROVIDERS = ("nominatim", "osrm", "electricity_maps", "noaa", "firms", "gemini")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class _Metric:
+    """
+    One metric family. Label children are created once per label combination and
+    cached, with their exposition label text rendered at creation, so updating a
+    child is an attribute increment under the family lock and nothing else.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self._new_child(())
+
+    def _new_child(self, values: Tuple[str, ...]) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """Child for these label values; look it up once and keep the reference."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child(values)
+                    self._children[values] = child
+        return child
+
+    def _samples(self) -> List[Any]:
+        with self._lock:
+            return list(self._children.values()) if self.labelnames else [self._default]
+
+    def render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for child in self._samples():
+            child.render(self.name, out)
+
+
+class _ValueChild:
+    __slots__ = ("_lock", "_labels", "value")
+
+    def __init__(self, lock: threading.Lock, labels: str) -> None:
+        self._lock = lock
+        self._labels = labels
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name: str, out: List[str]) -> None:
+        out.append(f"{name}{self._labels} {_fmt(self.value)}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self, values: Tuple[str, ...]) -> _ValueChild:
+        return _ValueChild(self._lock, _label_text(self.labelnames, values))
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_buckets", "_labels", "_le_labels", "counts", "sum", "count")
+
+    def __init__(self, lock: threading.Lock, buckets: Tuple[float, ...], names: Sequence[str], values: Sequence[str]) -> None:
+        self._lock = lock
+        self._buckets = buckets
+        self._labels = _label_text(names, values)
+        les = [_fmt(b) for b in buckets] + ["+Inf"]
+        self._le_labels = [_label_text(tuple(names) + ("le",), tuple(values) + (le,)) for le in les]
+        self.counts = [0] * (len(buckets) + 1)  # per bucket, not cumulative; last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._buckets, value)  # first bound >= value, i.e. le semantics
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name: str, out: List[str]) -> None:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        running = 0
+        for le, n in zip(self._le_labels, counts):
+            running += n
+            out.append(f"{name}_bucket{le} {running}")
+        out.append(f"{name}_sum{self._labels} {_fmt(total)}")
+        out.append(f"{name}_count{self._labels} {count}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self, values: Tuple[str, ...]) -> _HistogramChild:
+        return _HistogramChild(self._lock, self.buckets, self.labelnames, values)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out: List[str] = []
+        for m in metrics:
+            m.render(out)
+        return "\n".join(out) + "\n"
+
+
+# ---------- HTTP server metrics ----------
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _RouteMetrics:
+    """Pre-resolved children for one (route, method): a histogram and one counter per status class."""
+
+    __slots__ = ("latency", "by_class")
+
+    def __init__(self, latency: _HistogramChild, by_class: List[_ValueChild]) -> None:
+        self.latency = latency
+        self.by_class = by_class
+
+    def record(self, status: int, seconds: float) -> None:
+        self.latency.observe(seconds)
+        i = status // 100 - 1
+        self.by_class[i if 0 <= i < 5 else 4].inc()
+
+
+class HttpMetrics:
+    """
+    Request metrics keyed by route template (`/api/station/{station_id}/accessibility`,
+    not the raw path), so the label set is bounded by the number of routes.
+
+    Lookups are keyed by the template string of the route FastAPI puts in the ASGI
+    scope, then by method; both dicts are filled by prime() at startup, so a request
+    only does two dict lookups to find its children.
+    """
+
+    def __init__(self, registry: Registry) -> None:
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template", ("route", "method")
+        )
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP responses by route template and status class", ("route", "method", "status")
+        )
+        self._routes: Dict[str, Dict[str, _RouteMetrics]] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, template: str, method: str) -> _RouteMetrics:
+        return _RouteMetrics(
+            self.latency.labels(template, method),
+            [self.requests.labels(template, method, c) for c in STATUS_CLASSES],
+        )
+
+    def prime(self, routes: Sequence[Any]) -> None:
+        """Create the label children for every HTTP route/method of the app."""
+        for route in routes:
+            methods = getattr(route, "methods", None)
+            path = getattr(route, "path", None)
+            if methods and path is not None:
+                for method in methods:
+                    self.for_route(route, method)
+
+    def for_route(self, route: Any, method: str) -> _RouteMetrics:
+        template = UNMATCHED_ROUTE if route is None else route.path
+        by_method = self._routes.get(template)
+        if by_method is not None:
+            rm = by_method.get(method)
+            if rm is not None:
+                return rm
+        with self._lock:
+            by_method = self._routes.setdefault(template, {})
+            rm = by_method.get(method)
+            if rm is None:
+                rm = by_method[method] = self._build(template, method)
+        return rm
+
+
+# ---------- outbound provider metrics ----------
+class ProviderMetrics:
+    """
+    Timing, outcome and cache counters for one upstream provider.
+
+    "short_circuited" counts calls the breaker refused without going upstream. The
+    cache counters track lookups of a provider's cached answer (the guard's last-good
+    cache when a call fails or is refused; the destination index for Gemini).
+    """
+
+    __slots__ = ("name", "latency", "ok", "error", "short_circuited", "cache_hit", "cache_miss")
+
+    def __init__(self, name: str, latency: Histogram, calls: Counter, cache: Counter) -> None:
+        self.name = name
+        self.latency = latency.labels(name)
+        self.ok = calls.labels(name, "ok")
+        self.error = calls.labels(name, "error")
+        self.short_circuited = calls.labels(name, "short_circuited")
+        self.cache_hit = cache.labels(name, "hit")
+        self.cache_miss = cache.labels(name, "miss")
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.latency.observe(seconds)
+        (self.ok if ok else self.error).inc()
+
+    def cache(self, hit: bool) -> None:
+        (self.cache_hit if hit else self.cache_miss).inc()
+
+    def timed(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call fn, recording its latency and whether it raised (the exception propagates)."""
+        start = time.perf_counter()
+        try:
+            value = fn(*args, **kwargs)
+        except Exception:
+            self.record(time.perf_counter() - start, False)
+            raise
+        self.record(time.perf_counter() - start, True)
+        return value
+
+
+registry = Registry()
+http_metrics = HttpMetrics(registry)
+
+_provider_latency = registry.histogram(
+    "provider_request_duration_seconds", "Outbound provider call latency (successful and failed calls)", ("provider",)
+)
+_provider_calls = registry.counter(
+    "provider_requests_total", "Outbound provider calls by outcome", ("provider", "outcome")
+)
+_provider_cache = registry.counter(
+    "provider_cache_total", "Provider cache lookups by result", ("provider", "result")
+)
+_providers: Dict[str, ProviderMetrics] = {}
+_providers_lock = threading.Lock()
+
+
+def provider_metrics(name: str) -> ProviderMetrics:
+    """Process-wide metrics for one provider (created on first use for unlisted names)."""
+    pm = _providers.get(name)
+    if pm is None:
+        with _providers_lock:
+            pm = _providers.get(name)
+            if pm is None:
+                pm = _providers[name] = ProviderMetrics(name, _provider_latency, _provider_calls, _provider_cache)
+    return pm
+
+
+for _name in PROVIDERS:
+    provider_metrics(_name)
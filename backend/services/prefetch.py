@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.shared_state import WorkerSync, worker_sync
+
+logger = logging.getLogger(__name__)
+
+# Requests are grouped into grid cells this many degrees on a side (0.25° is ~28 km N-S)
+REGION_DEG = float(os.getenv("PREFETCH_REGION_DEG", "0.25"))
+
+
+def region_of(lat: float, lon: float, deg: float = REGION_DEG) -> str:
+    """The grid cell a coordinate falls in, named by its centre: "49.3750,-123.1250"."""
+    lat = min(90.0 - deg / 2, max(-90.0, lat))
+    lon = min(180.0 - deg / 2, max(-180.0, lon))
+    return f"{(math.floor(lat / deg) + 0.5) * deg:.4f},{(math.floor(lon / deg) + 0.5) * deg:.4f}"
+
+
+def region_center(region: str) -> Tuple[float, float]:
+    lat, lon = region.split(",")
+    return float(lat), float(lon)
+
+
+class RegionDemand:
+    """
+    Recent request volume per region: a count that halves every `half_life_s`, so
+    regions people stopped asking about drop down the ranking on their own.
+
+    Touches made in this worker are also kept as pending counts, which the scheduler
+    hands to the other workers (the leader fetches for everyone's users).
+    """
+
+    def __init__(self, half_life_s: float = 1800.0, max_regions: int = 4096) -> None:
+        self.half_life_s = half_life_s
+        self.max_regions = max_regions
+        self._lock = threading.Lock()
+        self._scores: Dict[str, Tuple[float, float]] = {}  # region -> (score, as of)
+        self._pending: Dict[str, float] = {}
+
+    def _decayed(self, score: float, as_of: float, now: float) -> float:
+        return score * 0.5 ** ((now - as_of) / self.half_life_s)
+
+    def add(self, region: str, n: float = 1.0, local: bool = True) -> None:
+        now = time.time()
+        with self._lock:
+            hit = self._scores.get(region)
+            score = n if hit is None else self._decayed(hit[0], hit[1], now) + n
+            self._scores[region] = (score, now)
+            if local:
+                self._pending[region] = self._pending.get(region, 0.0) + n
+            if len(self._scores) > self.max_regions:
+                ranked = sorted(self._scores, key=lambda r: self._decayed(*self._scores[r], now))
+                for r in ranked[: len(self._scores) - self.max_regions]:
+                    del self._scores[r]
+
+    def merge(self, counts: Dict[str, float]) -> None:
+        for region, n in counts.items():
+            self.add(region, float(n), local=False)
+
+    def take_pending(self) -> Dict[str, float]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def top(self, n: int) -> List[str]:
+        """The `n` busiest regions, busiest first."""
+        now = time.time()
+        with self._lock:
+            scored = [(self._decayed(s, t, now), r) for r, (s, t) in self._scores.items()]
+        scored.sort(reverse=True)
+        return [r for _, r in scored[:n]]
+
+    def scores(self, n: int = 10) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            scored = sorted(((self._decayed(s, t, now), r) for r, (s, t) in self._scores.items()), reverse=True)
+        return {r: round(score, 2) for score, r in scored[:n]}
+
+
+class Source:
+    """One upstream feed the scheduler keeps fresh, and its schedule/backoff state."""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        cadence_s: float,
+        per_region: bool,
+        max_regions: int,
+        backoff_base_s: float,
+        backoff_max_s: float,
+        initial_delay_s: float,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.cadence_s = cadence_s
+        self.per_region = per_region
+        self.max_regions = max_regions
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.next_due = time.monotonic() + initial_delay_s
+        self.failures = 0
+        self.runs = 0
+        self.last_ok: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def backing_off(self, now: float) -> bool:
+        return self.failures > 0 and now < self.next_due
+
+    def status(self, now: float) -> Dict[str, Any]:
+        return {
+            "cadence_s": self.cadence_s,
+            "per_region": self.per_region,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_ok_age_s": None if self.last_ok is None else round(time.time() - self.last_ok, 1),
+            "next_in_s": round(max(0.0, self.next_due - now), 1),
+            "last_error": self.last_error,
+        }
+
+
+class PrefetchScheduler:
+    """
+    Keeps time-varying upstream data (smoke polygons, fire detections, carbon
+    intensity) fresh off the request path.
+
+    Each source refreshes on its own cadence, with +/- `jitter` so sources (and
+    hosts) started together do not hit their providers in lockstep; a failing source
+    backs off exponentially instead of retrying every cadence. Per-region sources
+    refresh the busiest regions by recent request volume (RegionDemand).
+
+    While run() is going, services answer from the snapshots this fills and never
+    fetch on a request: a request for a region with no snapshot yet gets a "pending"
+    answer and calls request(), which refreshes that region straight away; one whose
+    snapshot missed its refresh (is_stale) gets that answer marked stale and calls
+    request() the same way. With
+    several workers only the leader fetches; the others send it their demand and
+    cold regions through the worker relay. Scripts and tests that never start the
+    scheduler keep the lazy fetch-on-request path.
+
+    Source functions are blocking and run in threads; they raise when the upstream
+    had nothing to give, which counts as a failure for backoff.
+    """
+
+    def __init__(
+        self,
+        demand: Optional[RegionDemand] = None,
+        sync: WorkerSync = worker_sync,
+        jitter: float = 0.1,
+        flush_s: float = 5.0,
+        concurrency: int = 4,
+        request_dedupe_s: float = 30.0,
+        leader_check_s: float = 5.0,
+    ) -> None:
+        self.demand = demand or RegionDemand()
+        self.sync = sync
+        self.jitter = jitter
+        self.flush_s = flush_s
+        self.concurrency = concurrency
+        self.request_dedupe_s = request_dedupe_s
+        self.leader_check_s = leader_check_s
+        self.sources: Dict[str, Source] = {}
+        self.running = False
+        self.leader = False
+        self._lock = threading.Lock()
+        self._urgent: Set[str] = set()
+        self._requested: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        sync.on("prefetch_demand", self.demand.merge)
+        sync.on("prefetch_request", lambda data: self._enqueue(data.get("regions") or [], dedupe=False))
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        cadence_s: float,
+        *,
+        per_region: bool = False,
+        max_regions: int = 16,
+        backoff_base_s: float = 30.0,
+        backoff_max_s: float = 1800.0,
+        initial_delay_s: float = 0.0,
+    ) -> None:
+        """Register a source: fn() for a global feed, fn(region) for a per-region one."""
+        self.sources[name] = Source(
+            name, fn, cadence_s, per_region, max_regions, backoff_base_s, backoff_max_s, initial_delay_s
+        )
+
+    # ---------- request path (any thread) ----------
+    def touch(self, lat: float, lon: float) -> str:
+        """Count a request at (lat, lon) towards its region's demand; returns the region."""
+        region = region_of(lat, lon)
+        self.demand.add(region)
+        return region
+
+    def request(self, region: str) -> None:
+        """A request found no snapshot (or a stale one) for `region`: refresh its per-region sources now."""
+        self._enqueue([region], dedupe=True)
+
+    def is_stale(self, name: str, fetched_at: float) -> bool:
+        """
+        Whether a snapshot `name` fetched at `fetched_at` (epoch seconds) has missed its
+        refresh: older than the source's cadence plus its jitter, and half a cadence
+        more for the fetch itself. Regions outside a source's busiest `max_regions`
+        are only refreshed on request, so their snapshots go stale this way.
+        """
+        source = self.sources.get(name)
+        if source is None:
+            return False
+        return time.time() - fetched_at > source.cadence_s * (1.5 + self.jitter)
+
+    def _enqueue(self, regions: Iterable[str], dedupe: bool) -> None:
+        now = time.monotonic()
+        added = False
+        with self._lock:
+            for region in regions:
+                if dedupe and now - self._requested.get(region, -math.inf) < self.request_dedupe_s:
+                    continue
+                self._requested[region] = now
+                self._urgent.add(region)
+                added = True
+        if added and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take_urgent(self) -> Set[str]:
+        cutoff = time.monotonic() - self.request_dedupe_s
+        with self._lock:
+            urgent, self._urgent = self._urgent, set()
+            if len(self._requested) > 256:
+                self._requested = {r: t for r, t in self._requested.items() if t >= cutoff}
+        return urgent
+
+    # ---------- loop ----------
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+    async def _refresh(self, source: Source, regions: List[str], scheduled: bool) -> None:
+        error: Optional[BaseException] = None
+        if not source.per_region:
+            try:
+                await asyncio.to_thread(source.fn)
+            except Exception as e:
+                error = e
+        else:
+            gate = asyncio.Semaphore(self.concurrency)
+
+            async def _one(region: str) -> None:
+                async with gate:
+                    await asyncio.to_thread(source.fn, region)
+
+            results = await asyncio.gather(*(_one(r) for r in regions), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            # One region answering means the provider is up; only back off when none did
+            if errors and len(errors) == len(results):
+                error = errors[0]
+
+        source.runs += 1
+        now = time.monotonic()
+        if error is None:
+            source.failures = 0
+            source.last_ok = time.time()
+            source.last_error = None
+            if scheduled:
+                source.next_due = now + self._jittered(source.cadence_s)
+        else:
+            source.failures += 1
+            source.last_error = str(error) or type(error).__name__
+            delay = min(source.backoff_max_s, source.backoff_base_s * 2 ** (source.failures - 1))
+            source.next_due = now + self._jittered(delay)
+            logger.warning("prefetch: %s failed (%d in a row), next try in %.0fs: %s",
+                           source.name, source.failures, delay, source.last_error)
+
+    def _start(self, source: Source, regions: List[str], scheduled: bool) -> None:
+        task = asyncio.ensure_future(self._refresh(source, regions, scheduled))
+        self._inflight[source.name] = task
+
+        def _done(_: asyncio.Task) -> None:
+            self._inflight.pop(source.name, None)
+            if self._wake is not None:
+                self._wake.set()
+
+        task.add_done_callback(_done)
+
+    def _flush_demand(self) -> None:
+        pending = self.demand.take_pending()
+        if pending:
+            self.sync.emit("prefetch_demand", {r: round(n, 3) for r, n in pending.items()})
+
+    def tick(self, is_leader: Callable[[], bool]) -> float:
+        """Start whatever is due; returns how long the loop may sleep."""
+        now = time.monotonic()
+        self.leader = is_leader()
+        urgent = self._take_urgent()
+        if not self.leader:
+            if urgent:
+                self.sync.emit("prefetch_request", {"regions": sorted(urgent)})
+            return self.leader_check_s
+
+        deferred: Set[str] = set()
+        for source in self.sources.values():
+            if source.name in self._inflight:
+                if source.per_region:
+                    deferred |= urgent  # picked up again when the running refresh finishes
+                continue
+            if now >= source.next_due:
+                regions = self.demand.top(source.max_regions) if source.per_region else []
+                if source.per_region:
+                    regions = list(dict.fromkeys(sorted(urgent) + regions))
+                self._start(source, regions, scheduled=True)
+            elif urgent and source.per_region and not source.backing_off(now):
+                self._start(source, sorted(urgent), scheduled=False)
+        if deferred:
+            with self._lock:
+                self._urgent |= deferred
+
+        # Running refreshes wake the loop when they finish
+        idle = [s.next_due for s in self.sources.values() if s.name not in self._inflight]
+        return max(0.0, min(idle) - now) if idle else self.flush_s
+
+    async def run(self, is_leader: Optional[Callable[[], bool]] = None) -> None:
+        """Refresh sources until cancelled; services read snapshots only while this runs."""
+        is_leader = is_leader or (lambda: True)
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.running = True
+        next_flush = time.monotonic() + self.flush_s
+        try:
+            while True:
+                self._wake.clear()
+                if time.monotonic() >= next_flush:
+                    self._flush_demand()
+                    next_flush = time.monotonic() + self.flush_s
+                wait = min(self.tick(is_leader), next_flush - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.05, wait))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            for task in list(self._inflight.values()):
+                task.cancel()
+            self._inflight.clear()
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": self.running,
+            "leader": self.leader,
+            "sources": {name: s.status(now) for name, s in self.sources.items()},
+            "busiest_regions": self.demand.scores(10),
+        }
+
+
+prefetcher = PrefetchScheduler(
+    RegionDemand(half_life_s=float(os.getenv("PREFETCH_DEMAND_HALF_LIFE_S", "1800"))),
+    jitter=float(os.getenv("PREFETCH_JITTER", "0.1")),
+)
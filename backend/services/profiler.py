@@ -0,0 +1,131 @@
+import cProfile
+import io
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+Stack = Tuple[Tuple[str, str], ...]  # (module, function) pairs, root first
+
+MAX_DEPTH = 128
+
+
+def _stack(frame) -> Stack:
+    out: List[Tuple[str, str]] = []
+    while frame is not None and len(out) < MAX_DEPTH:
+        out.append((frame.f_globals.get("__name__", "?"), frame.f_code.co_name))
+        frame = frame.f_back
+    out.reverse()
+    return tuple(out)
+
+
+class StackSampler:
+    """
+    Statistical profiler: every `interval_s` it records the Python stack of every
+    thread, and renders the counts as collapsed stacks ("root;...;leaf count" per
+    line), the input format of flamegraph.pl, speedscope and similar tools.
+
+    Two modes:
+      - "cpu": driven by SIGPROF from setitimer(ITIMER_PROF), so ticks follow the
+        process's CPU time and an idle worker costs nothing. Python runs signal
+        handlers on the main thread between bytecodes, so this sees the event loop
+        (where async handlers run) well, but collects little while the main thread
+        sits blocked in the selector and only worker threads are busy.
+      - "wall": a daemon thread wakes every interval and samples, busy or not.
+        Used when "cpu" is unavailable (not on the main thread, or no setitimer).
+    Either way the request path is never instrumented: the cost is one stack walk
+    per thread per tick.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: "Counter[Tuple[int, Stack]]" = Counter()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._old_handler = None
+        self.mode: Optional[str] = None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration_s = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _sample(self, skip_ident: Optional[int] = None) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident != skip_ident:
+                self._counts[(ident, _stack(frame))] += 1
+        self.samples += 1
+
+    def _on_signal(self, signum, frame) -> None:
+        self._sample()
+
+    def _run_thread(self, interval_s: float) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(interval_s):
+            self._sample(skip_ident=me)
+
+    def start(self, interval_s: float = 0.01, mode: str = "cpu") -> str:
+        """Start sampling; returns the mode actually used."""
+        with self._lock:
+            if self._running:
+                raise RuntimeError("sampler already running")
+            self._running = True
+            self._counts = Counter()
+            self.samples = 0
+            self.started_at = time.monotonic()
+
+        can_signal = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+        if mode == "cpu" and can_signal:
+            self._old_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, interval_s, interval_s)
+            self.mode = "cpu"
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_thread, args=(interval_s,), name="stack-sampler", daemon=True)
+            self._thread.start()
+            self.mode = "wall"
+        return self.mode
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        if self.mode == "cpu":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._old_handler or signal.SIG_DFL)
+        elif self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.duration_s = time.monotonic() - (self.started_at or time.monotonic())
+        self._running = False
+
+    def collapsed(self) -> str:
+        """
+        Collapsed stacks, heaviest first, each rooted at its thread's name (threads
+        that have exited since are shown as thread-<ident>).
+        """
+        names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+        merged: "Counter[str]" = Counter()
+        for (ident, stack), n in list(self._counts.items()):
+            frames = [names.get(ident, f"thread-{ident}")]
+            frames.extend(f"{module}:{func}" for module, func in stack)
+            merged[";".join(frames)] += n
+        return "".join(f"{line} {n}\n" for line, n in merged.most_common())
+
+
+# One per worker; the admin endpoint runs at most one sampling session at a time
+sampler = StackSampler()
+
+
+def profile_summary(profile: cProfile.Profile, sort: str = "cumulative", limit: int = 40) -> str:
+    """pstats text report for one cProfile run."""
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
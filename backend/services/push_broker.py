@@ -0,0 +1,201 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+DEFAULT_QUEUE_SIZE = 64
+
+
+def station_topic(station_id: str) -> str:
+    return f"station:{station_id}"
+
+
+def journey_topic(session_id: str) -> str:
+    return f"journey:{session_id}"
+
+
+class Message:
+    """
+    One published event, encoded once for every transport.
+
+    `text` is the JSON envelope sent over WebSockets; `sse` is the same envelope as
+    a ready-to-write Server-Sent Events frame.
+    """
+
+    __slots__ = ("id", "event", "text", "sse")
+
+    def __init__(self, msg_id: int, event: str, data: Any) -> None:
+        self.id = msg_id
+        self.event = event
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        self.text = f'{{"id":{msg_id},"event":{json.dumps(event)},"data":{payload}}}'
+        self.sse = f"id: {msg_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscription:
+    """
+    A connection's inbox: a bounded deque that drops the oldest message when full.
+
+    A slow client therefore costs at most `maxsize` message references (the encoded
+    bytes are shared with every other subscriber); `dropped` counts what it missed so
+    the connection can tell the client to resync.
+    """
+
+    __slots__ = ("topics", "loop", "_queue", "_waiter", "dropped", "closed")
+
+    def __init__(self, topics: Set[str], maxsize: int, loop: asyncio.AbstractEventLoop) -> None:
+        self.topics = topics
+        self.loop = loop
+        self._queue: Deque[Message] = deque(maxlen=maxsize)
+        self._waiter: Optional[asyncio.Future] = None
+        self.dropped = 0
+        self.closed = False
+
+    def _wake(self) -> None:
+        w = self._waiter
+        if w is not None and not w.done():
+            w.set_result(None)
+
+    def _put(self, msg: Message) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(msg)
+        self._wake()
+
+    def put(self, msg: Message) -> None:
+        """Queue a message for this connection only (e.g. a snapshot reply), in order with published ones."""
+        self._put(msg)
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Message]:
+        """Next message, or None on timeout / close."""
+        while not self._queue:
+            if self.closed:
+                return None
+            # A bare future is the cheapest wake-up: one per idle connection, set by _put
+            self._waiter = self.loop.create_future()
+            try:
+                if timeout is None:
+                    await self._waiter
+                else:
+                    await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    def take_dropped(self) -> int:
+        n, self.dropped = self.dropped, 0
+        return n
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class PushBroker:
+    """
+    Topic fan-out for SSE and WebSocket connections in one worker process.
+
+    publish() resolves the subscribers of every topic it is given (deduplicated, so a
+    client watching two stations on one alert gets it once), encodes the message once,
+    and appends the shared Message to each inbox. Publishing never awaits and never
+    blocks on a slow client. It may be called from any thread: deliveries are handed
+    to the subscriber's event loop when called from elsewhere.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str], maxsize: Optional[int] = None) -> Subscription:
+        sub = Subscription(set(topics), maxsize or self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            for t in sub.topics:
+                self._topics.setdefault(t, set()).add(sub)
+        return sub
+
+    def add_topics(self, sub: Subscription, topics: Iterable[str]) -> None:
+        with self._lock:
+            for t in topics:
+                if t not in sub.topics:
+                    sub.topics.add(t)
+                    self._topics.setdefault(t, set()).add(sub)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.closed = True
+        if sub.loop is _running_loop():
+            sub._wake()
+        elif not sub.loop.is_closed():
+            sub.loop.call_soon_threadsafe(sub._wake)
+        with self._lock:
+            for t in sub.topics:
+                subs = self._topics.get(t)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._topics[t]
+
+    def publish(self, topics: Iterable[str], event: str, data: Any) -> int:
+        """Send `data` to every subscriber of any of `topics`; returns how many got it."""
+        with self._lock:
+            targets: Set[Subscription] = set()
+            for t in topics:
+                subs = self._topics.get(t)
+                if subs:
+                    targets.update(subs)
+        if not targets:
+            return 0  # nobody listening: skip encoding entirely
+
+        msg = Message(next(self._ids), event, data)
+        self.published += 1
+
+        running = _running_loop()
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription]] = {}
+        for sub in targets:
+            if sub.loop is running:
+                sub._put(msg)
+            else:
+                by_loop.setdefault(sub.loop, []).append(sub)
+        for loop, subs in by_loop.items():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver, subs, msg)
+
+        self.delivered += len(targets)
+        return len(targets)
+
+    @staticmethod
+    def _deliver(subs: List[Subscription], msg: Message) -> None:
+        for sub in subs:
+            if not sub.closed:
+                sub._put(msg)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subs: Set[Subscription] = set()
+            for s in self._topics.values():
+                subs.update(s)
+            topics = len(self._topics)
+        return {
+            "subscribers": len(subs),
+            "topics": topics,
+            "published": self.published,
+            "delivered": self.delivered,
+            "queued": sum(s.pending() for s in subs),
+        }
+
+
+# One broker per worker process; routes and services publish through it.
+broker = PushBroker()
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import time
+from typing import Callable
+
+from fastapi import HTTPException, Request
+
+from services.shared_state import shared_state
+
+
+def rate_limit(name: str, env_var: str, default_per_min: int) -> Callable[[Request], None]:
+    """
+    Route dependency: at most `env_var` (default `default_per_min`) requests a minute
+    per client address, counted in shared state so every worker shares one budget.
+    0 disables the limit.
+
+    A plain function on purpose: FastAPI runs it in the threadpool, and with several
+    workers each count is a SQLite write.
+    """
+    def _check(request: Request) -> None:
+        limit = int(os.getenv(env_var, str(default_per_min)) or 0)
+        if limit <= 0:
+            return
+        client = request.client.host if request.client else "unknown"
+        now = time.time()
+        window = int(now // 60)
+        try:
+            count = shared_state.incr(f"ratelimit:{name}:{client}:{window}", ttl_s=120.0)
+        except sqlite3.Error:
+            return  # the store is busy: let the request through rather than fail it
+        if count > limit:
+            raise HTTPException(
+                status_code=429, detail="Too many requests", headers={"Retry-After": str(60 - int(now) % 60)}
+            )
+
+    _check.__name__ = f"rate_limit_{name}"
+    return _check
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Check = Callable[[], Dict[str, Any]]
+
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+
+
+class Readiness:
+    """
+    Warm-up gating and dependency probes behind /ready.
+
+    Warm-up steps are blocking callables (load a file, fetch a feed) run one after the
+    other in a worker thread. The worker reports ready once they have all run; a step
+    that fails is recorded in the report but does not hold readiness back, since the
+    code paths they warm all have their own cold/unavailable fallbacks.
+
+    Checks return a dict with at least "ok". A failing critical check makes the worker
+    unready (503); other failures only mark it "degraded".
+    """
+
+    def __init__(self, warmup_timeout_s: float = 60.0) -> None:
+        self.warmup_timeout_s = warmup_timeout_s
+        self.state = STARTING
+        self._steps: List[Tuple[str, Callable[[], Any]]] = []
+        self._checks: List[Tuple[str, Check, bool]] = []
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def add_warmup(self, name: str, fn: Callable[[], Any]) -> None:
+        self._steps.append((name, fn))
+
+    def add_check(self, name: str, fn: Check, critical: bool = False) -> None:
+        self._checks.append((name, fn, critical))
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == READY
+
+    def _run_steps(self) -> None:
+        for name, fn in self._steps:
+            start = time.perf_counter()
+            try:
+                fn()
+                self.warmup[name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                self.warmup[name] = {"ok": False, "seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+
+    async def run_warmup(self) -> None:
+        """Run every warm-up step off the event loop, then mark the worker ready."""
+        self.state = WARMING
+        job = asyncio.ensure_future(asyncio.to_thread(self._run_steps))
+        done, _ = await asyncio.wait({job}, timeout=self.warmup_timeout_s)
+        if not done:
+            # The steps keep running in their thread; serve anyway rather than never becoming ready
+            for name, _ in self._steps:
+                self.warmup.setdefault(name, {"ok": False, "error": "warm-up timed out"})
+        self.state = READY
+        self.ready_at = time.time()
+
+    def report(self) -> Tuple[bool, Dict[str, Any]]:
+        """(ready, body) for the /ready endpoint."""
+        checks: Dict[str, Dict[str, Any]] = {}
+        critical_ok = True
+        degraded = False
+        for name, fn, critical in self._checks:
+            try:
+                result = dict(fn())
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+            result["critical"] = critical
+            checks[name] = result
+            if not result.get("ok"):
+                if critical:
+                    critical_ok = False
+                else:
+                    degraded = True
+
+        ready = self.is_ready and critical_ok
+        if not self.is_ready:
+            status = self.state
+        elif not critical_ok:
+            status = "unavailable"
+        else:
+            status = "degraded" if degraded else READY
+        return ready, {
+            "status": status,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "warmup": dict(self.warmup),
+            "checks": checks,
+        }
+
+
+# One per worker process; main.py registers the warm-up steps and checks
+readiness = Readiness(warmup_timeout_s=float(os.getenv("WARMUP_TIMEOUT_S", "60")))
@@ -0,0 +1,457 @@
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from services.metrics import provider_metrics
+from services.shared_state import shared_state
+
+# With a multi-worker shared state, last-good values are also written there (at most
+# once a minute per key) so a worker that never fetched a key can still fall back to it
+SHARED_CACHE_TTL_S = 24 * 3600.0
+SHARED_CACHE_REFRESH_S = 60.0
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's breaker is open and there is nothing cached to serve."""
+
+
+class ProviderError(Exception):
+    """An upstream answered, but with something we count as a failure (5xx, 429)."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a rolling time window of call outcomes.
+
+    Opens when at least `min_calls` calls landed in the last `window_s` seconds and
+    the failure ratio reaches `failure_ratio`. After `open_s` seconds one probe call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 4,
+        window_s: float = 30.0,
+        open_s: float = 20.0,
+    ) -> None:
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_s = window_s
+        self.open_s = open_s
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_s:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_s
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def allow(self) -> bool:
+        """True if a call may go upstream now."""
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                    self._failures = 0
+                else:
+                    self._state = self.OPEN
+                    self._opened_at = now
+                return
+
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._trim(now)
+
+            total = len(self._outcomes)
+            if (
+                self._state == self.CLOSED
+                and total >= self.min_calls
+                and self._failures / total >= self.failure_ratio
+            ):
+                self._state = self.OPEN
+                self._opened_at = now
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            self._trim(now)
+            return {
+                "state": self._state,
+                "window_calls": len(self._outcomes),
+                "window_failures": self._failures,
+            }
+
+
+class LatencyTracker:
+    """Rolling sample of recent successful call latencies (seconds)."""
+
+    def __init__(self, size: int = 200, default_s: float = 1.0, floor_s: float = 0.05) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.default_s = default_s
+        self.floor_s = floor_s
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> float:
+        with self._lock:
+            if len(self._samples) < 20:
+                return self.default_s
+            ordered = sorted(self._samples)
+        return max(self.floor_s, ordered[int(0.95 * (len(ordered) - 1))])
+
+
+class HedgeBudget:
+    """
+    Token bucket that caps hedges to a fraction of calls: every call earns `ratio`
+    of a token (up to `burst`), every hedge spends one. When an upstream slows down
+    across the board, hedging stops at that fraction instead of doubling its traffic.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class _HedgeTimer:
+    """
+    One daemon thread that runs actions at their due time, so arming a hedge costs a
+    heap push instead of a thread (or a pool slot held for the whole delay).
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, delay_s: float, action: Callable[[], None]) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay_s, next(self._seq), action))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hedge-timer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due, _, action = self._heap[0]
+                wait_s = due - time.monotonic()
+                if wait_s > 0:
+                    self._cond.wait(wait_s)
+                    continue
+                heapq.heappop(self._heap)
+            try:
+                action()
+            except Exception:
+                pass
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+_hedge_timer = _HedgeTimer()
+
+
+def hedged_call(fn: Callable[[], Any], delay_s: float, budget: Optional[HedgeBudget] = None) -> Any:
+    """
+    Run `fn` in the calling thread; if it hasn't finished after `delay_s`, start a second
+    copy in the hedge pool (when `budget` allows one). Only for idempotent calls.
+
+    A blocking caller can't walk away from its own copy, so it returns the first copy's
+    answer; the hedge's answer is used when the first copy fails (a hung connection that
+    times out, a reset). hedged_call_async() returns whichever copy finishes first.
+    """
+    lock = threading.Lock()
+    state: Dict[str, Any] = {"done": False, "hedge": None}
+
+    def launch() -> None:
+        with lock:
+            if state["done"] or (budget is not None and not budget.spend()):
+                return
+            state["hedge"] = _hedge_pool.submit(fn)
+
+    _hedge_timer.schedule(delay_s, launch)
+    try:
+        return fn()
+    except Exception:
+        with lock:
+            state["done"] = True
+            hedge = state["hedge"]
+        if hedge is None:
+            raise
+        return hedge.result()
+    finally:
+        with lock:
+            state["done"] = True
+
+
+async def hedged_call_async(
+    factory: Callable[[], Awaitable[Any]], delay_s: float, budget: Optional[HedgeBudget] = None
+) -> Any:
+    """Async counterpart of hedged_call(); the loser is cancelled."""
+    first = asyncio.ensure_future(factory())
+    done, _ = await asyncio.wait({first}, timeout=delay_s)
+    if done or (budget is not None and not budget.spend()):
+        return await first
+
+    pending = {first, asyncio.ensure_future(factory())}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    return t.result()
+                error = t.exception()
+    finally:
+        for t in pending:
+            t.cancel()
+    raise error  # type: ignore[misc]
+
+
+class ProviderGuard:
+    """
+    Everything an outbound provider call goes through: circuit breaker, p95-delayed
+    hedging (at most `hedge_ratio` of calls get a second copy), and a small last-good
+    cache that is served while the circuit is open (or when a call fails). Every call
+    is recorded in the provider's metrics.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hedge: bool = True,
+        cache_size: int = 256,
+        hedge_ratio: float = 0.1,
+        **breaker_kwargs: Any,
+    ) -> None:
+        self.name = name
+        self.hedge = hedge
+        self.hedge_budget = HedgeBudget(hedge_ratio)
+        self.breaker = CircuitBreaker(name, **breaker_kwargs)
+        self.latency = LatencyTracker()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._shared_at: Dict[str, float] = {}
+        self.metrics = provider_metrics(name)
+
+    def _store_locked(self, key: str, ts: float, value: Any) -> None:
+        self._cache[key] = (ts, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            old, _ = self._cache.popitem(last=False)
+            self._shared_at.pop(old, None)
+
+    def _remember(self, key: str, value: Any) -> None:
+        # Raw responses pass through for the caller to check; only 2xx ones are a "last good" answer
+        if value is None or getattr(value, "is_success", True) is False:
+            return
+        now = time.time()
+        with self._cache_lock:
+            self._store_locked(key, now, value)
+            share = shared_state.shared and now - self._shared_at.get(key, 0.0) >= SHARED_CACHE_REFRESH_S
+            if share:
+                self._shared_at[key] = now
+        if share:
+            try:
+                shared_state.set(f"guard:{self.name}:{key}", [now, value], ttl_s=SHARED_CACHE_TTL_S)
+            except (TypeError, ValueError, sqlite3.Error):
+                pass  # not JSON, or the store is busy: this worker's copy still serves
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._cache_lock:
+            hit = self._cache.get(key)
+        if hit is None and shared_state.shared:
+            try:
+                shared = shared_state.get(f"guard:{self.name}:{key}")
+            except sqlite3.Error:
+                shared = None
+            if shared is not None:
+                hit = (float(shared[0]), shared[1])
+                with self._cache_lock:
+                    self._store_locked(key, hit[0], hit[1])
+                    self._shared_at[key] = hit[0]
+        return hit
+
+    def cached(self, key: str) -> Optional[Any]:
+        hit = self._lookup(key)
+        return None if hit is None else hit[1]
+
+    def cached_at(self, key: str) -> Optional[float]:
+        hit = self._lookup(key)
+        return None if hit is None else hit[0]
+
+    def newest_cache_time(self) -> Optional[float]:
+        with self._cache_lock:
+            return max((ts for ts, _ in self._cache.values()), default=None)
+
+    def _fallback(self, key: str, default: Any, raise_when_empty: bool) -> Any:
+        hit = self.cached(key)
+        self.metrics.cache(hit is not None)
+        if hit is not None:
+            return hit
+        if raise_when_empty:
+            raise CircuitOpenError(f"{self.name} unavailable (circuit {self.breaker.state})")
+        return default
+
+    def call(self, key: str, fn: Callable[[], Any], default: Any = None, raise_when_empty: bool = False) -> Any:
+        """
+        Run a blocking provider call. `fn` should raise on failure; its return value
+        is cached under `key` and returned. This blocks, so async routes call it
+        from a thread (or use acall()).
+        """
+        if not self.breaker.allow():
+            self.metrics.short_circuited.inc()
+            return self._fallback(key, default, raise_when_empty)
+
+        start = time.perf_counter()
+        try:
+            if self.hedge:
+                self.hedge_budget.earn()
+                value = hedged_call(fn, self.latency.p95(), self.hedge_budget)
+            else:
+                value = fn()
+        except Exception:
+            self.breaker.record(False)
+            self.metrics.record(time.perf_counter() - start, False)
+            return self._fallback(key, default, raise_when_empty)
+
+        elapsed = time.perf_counter() - start
+        self.breaker.record(True)
+        self.latency.add(elapsed)
+        self.metrics.record(elapsed, True)
+        self._remember(key, value)
+        return value
+
+    async def _off_loop(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # The last-good cache is in memory, except that a multi-worker shared state also
+        # reads and writes SQLite, which must not run on the event loop
+        if shared_state.shared:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def acall(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        default: Any = None,
+        raise_when_empty: bool = False,
+    ) -> Any:
+        """Async counterpart of call() for httpx.AsyncClient based providers."""
+        if not self.breaker.allow():
+            self.metrics.short_circuited.inc()
+            return await self._off_loop(self._fallback, key, default, raise_when_empty)
+
+        start = time.perf_counter()
+        try:
+            if self.hedge:
+                self.hedge_budget.earn()
+                value = await hedged_call_async(factory, self.latency.p95(), self.hedge_budget)
+            else:
+                value = await factory()
+        except Exception:
+            self.breaker.record(False)
+            self.metrics.record(time.perf_counter() - start, False)
+            return await self._off_loop(self._fallback, key, default, raise_when_empty)
+
+        elapsed = time.perf_counter() - start
+        self.breaker.record(True)
+        self.latency.add(elapsed)
+        self.metrics.record(elapsed, True)
+        await self._off_loop(self._remember, key, value)
+        return value
+
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+# Nominatim's usage policy allows ~1 request/second, so it is never hedged.
+_PROVIDER_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "nominatim": {"hedge": False},
+}
+
+
+def get_guard(name: str) -> ProviderGuard:
+    """Process-wide guard per provider, shared by every service instance."""
+    with _guards_lock:
+        guard = _guards.get(name)
+        if guard is None:
+            guard = ProviderGuard(name, **_PROVIDER_DEFAULTS.get(name, {}))
+            _guards[name] = guard
+        return guard
+
+
+def all_guards() -> Dict[str, ProviderGuard]:
+    with _guards_lock:
+        return dict(_guards)
+
+
+def raise_for_provider_status(status_code: int) -> None:
+    """5xx and rate limiting count against the breaker; other statuses do not."""
+    if status_code >= 500 or status_code == 429:
+        raise ProviderError(f"upstream status {status_code}")
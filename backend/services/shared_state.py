@@ -0,0 +1,334 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(os.getenv("TRANSIT_DATA_DIR") or Path(__file__).resolve().parents[1] / "data")
+
+# Events are only needed until every worker's relay has polled past them
+EVENT_RETENTION_S = 3600.0
+_PURGE_EVERY = 256
+
+Event = Tuple[int, str, str, Any]  # (id, stream, origin, data)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class LocalState:
+    """
+    Shared state for a single worker process: a locked dict, nobody to share with.
+
+    Values go through JSON like the SQLite backend, so code that works here keeps
+    working when the deployment moves to several workers.
+    """
+
+    shared = False
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def _live_locked(self, key: str, now: float) -> Optional[str]:
+        hit = self._data.get(key)
+        if hit is None:
+            return None
+        text, expires_at = hit
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return text
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            text = self._live_locked(key, time.time())
+        return default if text is None else json.loads(text)
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        text = _dumps(value)
+        with self._lock:
+            self._data[key] = (text, None if ttl_s is None else time.time() + ttl_s)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        """Add to a counter; `ttl_s` applies when the counter is created (fixed-window rate limits)."""
+        now = time.time()
+        with self._lock:
+            text = self._live_locked(key, now)
+            if text is None:
+                value, expires_at = amount, (None if ttl_s is None else now + ttl_s)
+            else:
+                value, expires_at = int(json.loads(text)) + amount, self._data[key][1]
+            self._data[key] = (str(value), expires_at)
+            return value
+
+    @contextmanager
+    def transaction(self, key: str, default: Callable[[], Any] = dict, ttl_s: Optional[float] = None) -> Iterator[Any]:
+        """Read-modify-write of one value; other writers wait until the block exits."""
+        with self._lock:
+            text = self._live_locked(key, time.time())
+            value = default() if text is None else json.loads(text)
+            yield value
+            self.set(key, value, ttl_s)
+
+    def append(self, stream: str, origin: str, data: Any) -> int:
+        return 0
+
+    def read_since(self, after_id: int, limit: int = 500) -> List[Event]:
+        return []
+
+    def last_event_id(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteState:
+    """
+    Shared state for several worker processes on one host, in a WAL-mode SQLite file.
+
+    - kv: JSON values with optional expiry (sessions, caches, counters). Expired rows
+      are skipped on read and purged every few hundred writes.
+    - events: an append-only log the per-worker relay (WorkerSync) polls, so a
+      change made in one worker is replayed in the others.
+
+    Each thread gets its own connection in autocommit mode. Counters and
+    transaction() take the write lock up front (BEGIN IMMEDIATE), so concurrent
+    read-modify-writes from different processes serialize, not interleave.
+    """
+
+    shared = True
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS kv (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stream TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            data TEXT NOT NULL,
+            ts REAL NOT NULL
+        )
+        """,
+    )
+
+    def __init__(self, path: Path, busy_timeout_s: float = 5.0) -> None:
+        self.path = Path(path)
+        self.busy_timeout_s = busy_timeout_s
+        self._local = threading.local()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write(self._conn()) as conn:
+            for stmt in self._SCHEMA:
+                conn.execute(stmt)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout_s, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    @contextmanager
+    def _write(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, key: str, now: float) -> Optional[str]:
+        row = conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _put(conn: sqlite3.Connection, key: str, text: str, expires_at: Optional[float]) -> None:
+        conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, text, expires_at),
+        )
+
+    def _maybe_purge(self, conn: sqlite3.Connection, now: float) -> None:
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            conn.execute("DELETE FROM events WHERE ts < ?", (now - EVENT_RETENTION_S,))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        text = self._read(self._conn(), key, time.time())
+        return default if text is None else json.loads(text)
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        text = _dumps(value)
+        now = time.time()
+        conn = self._conn()
+        self._put(conn, key, text, None if ttl_s is None else now + ttl_s)
+        self._maybe_purge(conn, now)
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl_s: Optional[float] = None) -> int:
+        """Add to a counter; `ttl_s` applies when the counter is created (fixed-window rate limits)."""
+        now = time.time()
+        with self._write(self._conn()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                value, expires_at = amount, (None if ttl_s is None else now + ttl_s)
+            else:
+                value, expires_at = int(json.loads(row[0])) + amount, row[1]
+            self._put(conn, key, str(value), expires_at)
+            self._maybe_purge(conn, now)
+        return value
+
+    @contextmanager
+    def transaction(self, key: str, default: Callable[[], Any] = dict, ttl_s: Optional[float] = None) -> Iterator[Any]:
+        """Read-modify-write of one value; other writers (in any worker) wait until the block exits."""
+        now = time.time()
+        with self._write(self._conn()) as conn:
+            text = self._read(conn, key, now)
+            value = default() if text is None else json.loads(text)
+            yield value
+            self._put(conn, key, _dumps(value), None if ttl_s is None else now + ttl_s)
+
+    def append(self, stream: str, origin: str, data: Any) -> int:
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT INTO events (stream, origin, data, ts) VALUES (?, ?, ?, ?)", (stream, origin, _dumps(data), now)
+        )
+        self._maybe_purge(conn, now)
+        return int(cur.lastrowid)
+
+    def read_since(self, after_id: int, limit: int = 500) -> List[Event]:
+        rows = self._conn().execute(
+            "SELECT id, stream, origin, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+        return [(r[0], r[1], r[2], json.loads(r[3])) for r in rows]
+
+    def last_event_id(self) -> int:
+        row = self._conn().execute("SELECT MAX(id) FROM events").fetchone()
+        return int(row[0] or 0)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+SharedState = Any  # LocalState | SQLiteState
+
+
+def open_shared_state() -> SharedState:
+    """
+    SHARED_STATE_BACKEND picks the backend: "local" (default, one worker) or "sqlite"
+    (several workers on one host; serve.py sets it when it starts more than one).
+    """
+    backend = os.getenv("SHARED_STATE_BACKEND", "local").strip().lower()
+    if backend == "sqlite":
+        return SQLiteState(Path(os.getenv("SHARED_STATE_PATH") or DATA_DIR / "shared_state.db"))
+    if backend != "local":
+        logger.warning("unknown SHARED_STATE_BACKEND %r, using local", backend)
+    return LocalState()
+
+
+class WorkerSync:
+    """
+    Replays state changes made by other workers.
+
+    A component that keeps per-worker, in-memory state (leaderboard boards, posted
+    alerts, push subscribers) emits each change it makes and registers a handler
+    for the same stream; run() polls the shared event log and calls the handlers for
+    events that came from other workers, off the event loop, so handlers must be
+    thread-safe. With the local backend emit() is a no-op and run() returns at once.
+    """
+
+    def __init__(self, state: SharedState, poll_s: float = 0.1) -> None:
+        self.state = state
+        self.poll_s = poll_s
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, Callable[[Any], None]] = {}
+        self._seen: Optional[int] = None
+        self.applied = 0
+
+    def on(self, stream: str, handler: Callable[[Any], None]) -> None:
+        self._handlers[stream] = handler
+
+    def emit(self, stream: str, data: Any) -> None:
+        if not self.state.shared:
+            return
+        try:
+            self.state.append(stream, self.worker_id, data)
+        except sqlite3.Error as e:
+            # The change already happened here; the other workers just won't see it
+            logger.warning("shared state: could not emit %s event: %s", stream, e)
+
+    def poll_once(self) -> int:
+        if self._seen is None:
+            self._seen = self.state.last_event_id()  # history before this worker started is not replayed
+            return 0
+        applied = 0
+        for event_id, stream, origin, data in self.state.read_since(self._seen):
+            self._seen = event_id
+            handler = self._handlers.get(stream)
+            if handler is None or origin == self.worker_id:
+                continue
+            try:
+                handler(data)
+                applied += 1
+            except Exception as e:
+                logger.warning("shared state: %s handler failed: %s", stream, e)
+        self.applied += applied
+        return applied
+
+    async def run(self) -> None:
+        if not self.state.shared:
+            return
+        # Reading the log and the handlers (some read SQLite too) run on the relay's own
+        # thread; the handlers are thread-safe and reach the loop only through the broker
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker-sync") as relay:
+            await loop.run_in_executor(relay, self.poll_once)
+            while True:
+                await asyncio.sleep(self.poll_s)
+                try:
+                    await loop.run_in_executor(relay, self.poll_once)
+                except sqlite3.Error as e:
+                    logger.warning("shared state: poll failed: %s", e)
+
+
+shared_state = open_shared_state()
+worker_sync = WorkerSync(shared_state, poll_s=float(os.getenv("SHARED_STATE_POLL_S", "0.1")))
@@ -0,0 +1,340 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every worker acts as its own leader
+    fcntl = None
+
+from services.shared_state import DATA_DIR, shared_state
+
+# Smoke: header, one record per polygon, the coordinates as one float64 array, then
+# the severity names as a JSON list. Little-endian, every section 8-byte aligned, so
+# a reader can cast the mapped bytes to doubles and slice polygons out without copying.
+_SMOKE_MAGIC = b"SMK1"
+_SMOKE_HEADER = struct.Struct("<4sIdII")  # magic, reserved, fetched_at, n_polys, n_values
+_SMOKE_RECORD = struct.Struct("<IIII")    # first value, n values, severity index, reserved
+
+# Keyed: header, records sorted by key hash (binary-searchable in place), then the
+# blobs, each the UTF-8 key, a newline and the JSON value.
+_KEYED_MAGIC = b"KVS1"
+_KEYED_HEADER = struct.Struct("<4sII")    # magic, reserved, n_records
+_KEYED_RECORD = struct.Struct("<QdII")    # key hash, fetched_at, blob offset, blob length
+
+Polygons = List[Tuple[Sequence[float], str]]
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write a whole file and rename it into place: readers see the old or the new file, never half."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class MappedFile:
+    """
+    A read-only mapping of a file that is replaced (not rewritten) by its writers.
+
+    current() re-stats the path at most every `check_s` and maps the new file when its
+    inode changed. The old mapping is never closed explicitly: views handed out from it
+    keep it alive until the requests using them finish.
+    """
+
+    def __init__(self, path: Path, check_s: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_s = check_s
+        self._lock = threading.Lock()
+        self._ident: Optional[Tuple[int, int]] = None
+        self._view: Optional[memoryview] = None
+        self._checked = 0.0
+        self.generation = 0
+
+    def current(self) -> Optional[memoryview]:
+        now = time.monotonic()
+        if now - self._checked < self.check_s:
+            return self._view
+        with self._lock:
+            self._checked = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._ident, self._view = None, None
+                return None
+            ident = (st.st_ino, st.st_mtime_ns)
+            if ident != self._ident:
+                self._view = self._map() if st.st_size else None
+                self._ident = ident
+                self.generation += 1
+            return self._view
+
+    def _map(self) -> Optional[memoryview]:
+        try:
+            with open(self.path, "rb") as f:
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            return None
+
+    def invalidate(self) -> None:
+        self._checked = 0.0
+
+
+def encode_smoke(polys: Iterable[Tuple[Sequence[float], str]], fetched_at: float) -> bytes:
+    severities: List[str] = []
+    sev_index: Dict[str, int] = {}
+    records = bytearray()
+    coords = bytearray()
+    n_polys = n_values = 0
+    for poly, sev in polys:
+        if sev not in sev_index:
+            sev_index[sev] = len(severities)
+            severities.append(sev)
+        records += _SMOKE_RECORD.pack(n_values, len(poly), sev_index[sev], 0)
+        coords += memoryview(poly).cast("B")  # array('d') or a mapped view: raw doubles either way
+        n_polys += 1
+        n_values += len(poly)
+    header = _SMOKE_HEADER.pack(_SMOKE_MAGIC, 0, float(fetched_at), n_polys, n_values)
+    return bytes(header) + bytes(records) + bytes(coords) + json.dumps(severities).encode("utf-8")
+
+
+def decode_smoke(view: memoryview) -> Optional[Tuple[float, Polygons]]:
+    """(fetched_at, [(coordinate view, severity), ...]); the coordinate views point into `view`."""
+    if len(view) < _SMOKE_HEADER.size:
+        return None
+    magic, _, fetched_at, n_polys, n_values = _SMOKE_HEADER.unpack_from(view, 0)
+    if magic != _SMOKE_MAGIC:
+        return None
+    coords_at = _SMOKE_HEADER.size + n_polys * _SMOKE_RECORD.size
+    names_at = coords_at + 8 * n_values
+    values = view[coords_at:names_at].cast("d")
+    severities = json.loads(bytes(view[names_at:]).decode("utf-8"))
+    polys: Polygons = []
+    for i in range(n_polys):
+        first, count, sev, _ = _SMOKE_RECORD.unpack_from(view, _SMOKE_HEADER.size + i * _SMOKE_RECORD.size)
+        polys.append((values[first:first + count], severities[sev]))
+    return fetched_at, polys
+
+
+class SmokeSnapshot:
+    """The parsed NOAA smoke polygons, shared by every worker through one mapped file."""
+
+    def __init__(self, path: Path, check_s: float = 1.0) -> None:
+        self.file = MappedFile(path, check_s)
+        self._decoded: Optional[Tuple[int, Optional[Tuple[float, Polygons]]]] = None
+
+    def load(self) -> Optional[Tuple[float, Polygons]]:
+        view = self.file.current()
+        if view is None:
+            return None
+        cached = self._decoded
+        if cached is not None and cached[0] == self.file.generation:
+            return cached[1]
+        decoded = decode_smoke(view)
+        self._decoded = (self.file.generation, decoded)
+        return decoded
+
+    def publish(self, polys: Iterable[Tuple[Sequence[float], str]], fetched_at: float) -> None:
+        write_atomic(self.file.path, encode_smoke(polys, fetched_at))
+        self.file.invalidate()
+
+
+class KeyedSnapshot:
+    """
+    Provider responses by cache key (Electricity Maps JSON, FIRMS CSV), in one mapped
+    file. get() binary-searches the sorted hash records in place and decodes only the
+    value it returns. put() merges under an exclusive flock and replaces the file;
+    entries older than `max_age_s` and beyond `max_entries` (oldest first) are dropped.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 512, max_age_s: float = 6 * 3600.0, check_s: float = 1.0) -> None:
+        self.file = MappedFile(path, check_s)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._write_lock = threading.Lock()
+
+    def _find(self, view: memoryview, key: str) -> Optional[Tuple[float, bytes]]:
+        magic, _, n = _KEYED_HEADER.unpack_from(view, 0)
+        if magic != _KEYED_MAGIC:
+            return None
+        h = _key_hash(key)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_hash = _KEYED_RECORD.unpack_from(view, _KEYED_HEADER.size + mid * _KEYED_RECORD.size)[0]
+            if mid_hash < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        raw_key = key.encode("utf-8")
+        while lo < n:
+            rec_hash, fetched_at, offset, length = _KEYED_RECORD.unpack_from(view, _KEYED_HEADER.size + lo * _KEYED_RECORD.size)
+            if rec_hash != h:
+                break
+            blob = view[offset:offset + length]
+            sep = len(raw_key)
+            if blob[:sep] == raw_key and blob[sep:sep + 1] == b"\n":
+                return fetched_at, bytes(blob[sep + 1:])
+            lo += 1
+        return None
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(fetched_at, value) or None."""
+        view = self.file.current()
+        if view is None or len(view) < _KEYED_HEADER.size:
+            return None
+        hit = self._find(view, key)
+        return None if hit is None else (hit[0], json.loads(hit[1]))
+
+    def _entries(self) -> Dict[str, Tuple[float, bytes]]:
+        self.file.invalidate()
+        view = self.file.current()
+        out: Dict[str, Tuple[float, bytes]] = {}
+        if view is None or len(view) < _KEYED_HEADER.size:
+            return out
+        magic, _, n = _KEYED_HEADER.unpack_from(view, 0)
+        if magic != _KEYED_MAGIC:
+            return out
+        for i in range(n):
+            _, fetched_at, offset, length = _KEYED_RECORD.unpack_from(view, _KEYED_HEADER.size + i * _KEYED_RECORD.size)
+            key, _, value = bytes(view[offset:offset + length]).partition(b"\n")
+            out[key.decode("utf-8")] = (fetched_at, value)
+        return out
+
+    @staticmethod
+    def encode(entries: Dict[str, Tuple[float, bytes]]) -> bytes:
+        items = sorted((_key_hash(k), k, ts, v) for k, (ts, v) in entries.items())
+        blob_at = _KEYED_HEADER.size + len(items) * _KEYED_RECORD.size
+        records = bytearray()
+        blobs = bytearray()
+        for h, key, ts, value in items:
+            blob = key.encode("utf-8") + b"\n" + value
+            records += _KEYED_RECORD.pack(h, ts, blob_at + len(blobs), len(blob))
+            blobs += blob
+        return _KEYED_HEADER.pack(_KEYED_MAGIC, 0, len(items)) + bytes(records) + bytes(blobs)
+
+    def put_many(self, updates: Dict[str, Tuple[float, Any]]) -> None:
+        if not updates:
+            return
+        lock_path = self.file.path.with_name(self.file.path.name + ".lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write_lock, open(lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)  # other workers merging at the same time wait here
+            entries = self._entries()
+            for key, (ts, value) in updates.items():
+                if key in entries and entries[key][0] >= ts:
+                    continue  # another worker already published something newer
+                entries[key] = (float(ts), json.dumps(value, separators=(",", ":")).encode("utf-8"))
+            cutoff = time.time() - self.max_age_s
+            kept = sorted(((ts, k) for k, (ts, _) in entries.items() if ts >= cutoff), reverse=True)[: self.max_entries]
+            write_atomic(self.file.path, self.encode({k: entries[k] for _, k in kept}))
+            self.file.invalidate()
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None) -> None:
+        self.put_many({key: (fetched_at or time.time(), value)})
+
+
+class LocalKeyed:
+    """KeyedSnapshot's get/put over a dict, for a single worker with nobody to share with."""
+
+    def __init__(self, max_entries: int = 512, max_age_s: float = 6 * 3600.0) -> None:
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        hit = self._entries.get(key)
+        if hit is None or time.time() - hit[0] > self.max_age_s:
+            return None
+        return hit
+
+    def put_many(self, updates: Dict[str, Tuple[float, Any]]) -> None:
+        with self._lock:
+            for key, (ts, value) in updates.items():
+                if key in self._entries and self._entries[key][0] > ts:
+                    continue
+                self._entries[key] = (float(ts), value)
+            if len(self._entries) > self.max_entries:
+                kept = sorted(self._entries.items(), key=lambda kv: kv[1][0], reverse=True)[: self.max_entries]
+                self._entries = dict(kept)
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None) -> None:
+        self.put_many({key: (fetched_at or time.time(), value)})
+
+
+class LeaderLock:
+    """
+    One leader per host, elected with a non-blocking flock on a lock file.
+
+    The winner keeps the file open (and so the lock) for the life of the process; when
+    it exits, the kernel releases the lock and the next try_acquire() from another
+    worker takes over. Without flock every process counts as leader.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._fh = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fh is not None or fcntl is None
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        with self._lock:
+            if self._fh is not None:
+                return True
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fh = open(self.path, "a")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+            self._fh = fh
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()  # closing drops the flock
+                self._fh = None
+
+
+class SnapshotStore:
+    """The per-host snapshot directory: smoke polygons, carbon and FIRMS responses, leader lock."""
+
+    def __init__(self, directory: Path, check_s: float = 1.0) -> None:
+        self.directory = Path(directory)
+        self.smoke = SmokeSnapshot(self.directory / "smoke.bin", check_s)
+        self.carbon = KeyedSnapshot(self.directory / "carbon.bin", check_s=check_s)
+        self.firms = KeyedSnapshot(self.directory / "firms.bin", check_s=check_s)
+        self.leader = LeaderLock(self.directory / "leader.lock")
+
+
+def _build_store() -> Optional[SnapshotStore]:
+    # One worker keeps everything in its own memory; files only pay off with several
+    if not shared_state.shared:
+        return None
+    return SnapshotStore(
+        Path(os.getenv("SNAPSHOT_DIR") or DATA_DIR / "snapshots"),
+        check_s=float(os.getenv("SNAPSHOT_CHECK_S", "1")),
+    )
+
+
+snapshot_store = _build_store()
@@ -0,0 +1,359 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.alert_store import AlertStore, alert_store
+
+# Feature flags, packed into one int per station
+AUDIO = 1
+VISUAL = 2
+RESTROOMS = 4
+RAMP = 8
+LEVEL_BOARDING = 16
+
+_CSV_FLAGS = {
+    "audio_announcements": AUDIO,
+    "visual_displays": VISUAL,
+    "accessible_restrooms": RESTROOMS,
+    "ramp": RAMP,
+    "level_boarding": LEVEL_BOARDING,
+}
+
+# GTFS pathways.txt pathway_mode values we surface as features
+_PATHWAY_ELEVATOR = "5"
+_PATHWAY_ESCALATOR = "4"
+
+# Alert types that take a station feature out of service
+_ALERT_EFFECTS = {
+    "elevator_outage": "elevator",
+    "escalator_outage": "escalator",
+    "ramp_blocked": "ramp",
+    "audio_outage": "audio",
+    "display_outage": "visual",
+}
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+
+MAX_BATCH = 500
+
+
+class StationRecord:
+    """One station's static accessibility data; slots keep ~10k of these small."""
+
+    __slots__ = ("station_id", "name", "lat", "lon", "wheelchair_boarding", "flags", "elevators", "escalators")
+
+    def __init__(
+        self,
+        station_id: str,
+        name: str,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        wheelchair_boarding: int = 0,
+        flags: int = 0,
+        elevators: Tuple[str, ...] = (),
+        escalators: Tuple[str, ...] = (),
+    ) -> None:
+        self.station_id = station_id
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.wheelchair_boarding = wheelchair_boarding  # GTFS: 0 unknown, 1 yes, 2 no
+        self.flags = flags
+        self.elevators = elevators
+        self.escalators = escalators
+
+
+def _placeholder(station_id: str) -> StationRecord:
+    # What the endpoint returned before station data existed; still used when none is loaded.
+    return StationRecord(
+        station_id,
+        f"Station {station_id}",
+        wheelchair_boarding=1,
+        flags=AUDIO | VISUAL | RESTROOMS | RAMP,
+        elevators=("elevator_1",),
+    )
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def load_gtfs(gtfs_dir: Path, accessibility_csv: Optional[Path] = None) -> Dict[str, StationRecord]:
+    """
+    Station records from GTFS stops.txt (+ pathways.txt if present) and an optional
+    accessibility CSV with a station_id column and 0/1 columns named like _CSV_FLAGS.
+
+    Stations are stops with location_type=1, plus standalone stops (no parent). Child
+    platforms/entrances only contribute their pathways to the parent station.
+    """
+    parent_of: Dict[str, str] = {}
+    records: Dict[str, StationRecord] = {}
+
+    with open(gtfs_dir / "stops.txt", newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            stop_id = row.get("stop_id") or ""
+            parent = row.get("parent_station") or ""
+            location_type = (row.get("location_type") or "0").strip() or "0"
+            if parent:
+                parent_of[stop_id] = parent
+            if location_type == "1" or (location_type == "0" and not parent):
+                try:
+                    boarding = int(row.get("wheelchair_boarding") or 0)
+                except ValueError:
+                    boarding = 0
+                records[stop_id] = StationRecord(
+                    stop_id,
+                    row.get("stop_name") or stop_id,
+                    _to_float(row.get("stop_lat")),
+                    _to_float(row.get("stop_lon")),
+                    boarding,
+                )
+
+    elevators: Dict[str, List[str]] = {}
+    escalators: Dict[str, List[str]] = {}
+    pathways = gtfs_dir / "pathways.txt"
+    if pathways.exists():
+        with open(pathways, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                mode = (row.get("pathway_mode") or "").strip()
+                if mode not in (_PATHWAY_ELEVATOR, _PATHWAY_ESCALATOR):
+                    continue
+                stop = row.get("from_stop_id") or ""
+                station = parent_of.get(stop, stop)
+                if station not in records:
+                    continue
+                target = elevators if mode == _PATHWAY_ELEVATOR else escalators
+                target.setdefault(station, []).append(row.get("pathway_id") or f"{station}_{mode}")
+
+    for sid, ids in elevators.items():
+        records[sid].elevators = tuple(ids)
+    for sid, ids in escalators.items():
+        records[sid].escalators = tuple(ids)
+
+    if accessibility_csv is not None and accessibility_csv.exists():
+        with open(accessibility_csv, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                rec = records.get(row.get("station_id") or "")
+                if rec is None:
+                    continue
+                for column, bit in _CSV_FLAGS.items():
+                    if str(row.get(column) or "").strip().lower() in _TRUE:
+                        rec.flags |= bit
+
+    return records
+
+
+class StationRepository:
+    """
+    Station accessibility records with their JSON responses cached as bytes.
+
+    A lookup is a dict hit returning ready-to-send bytes. The cached body already has
+    the live alert overlay applied; the alert store notifies the repository when an
+    alert for a station changes, which drops just that station's bytes and bumps its
+    version (the version is what batch ETags are built from).
+    """
+
+    def __init__(
+        self,
+        gtfs_dir: Optional[Path] = None,
+        accessibility_csv: Optional[Path] = None,
+        alerts: Optional[AlertStore] = None,
+        max_cached: int = 50_000,
+    ) -> None:
+        self.gtfs_dir = gtfs_dir
+        self.accessibility_csv = accessibility_csv
+        self.alerts = alerts
+        self.max_cached = max_cached
+        self._records: Dict[str, StationRecord] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._bytes: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes_lock = threading.Lock()  # LRU order, inserts and invalidation
+        self._versions: Dict[str, int] = {}
+        self._seq = itertools.count(1)
+        self.generation = 0  # bumped whenever the whole data set is replaced
+        if alerts is not None:
+            alerts.add_listener(self._on_alert)
+
+    # ---------- loading ----------
+    @property
+    def has_data(self) -> bool:
+        self.ensure_loaded()
+        return bool(self._records)
+
+    def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            if self.gtfs_dir is not None and (self.gtfs_dir / "stops.txt").exists():
+                self._records = load_gtfs(self.gtfs_dir, self.accessibility_csv)
+            self._loaded = True
+
+    def load_records(self, records: Iterable[StationRecord]) -> None:
+        """Replace all station data (tests, or a reload from a new GTFS drop)."""
+        with self._load_lock:
+            self._records = {r.station_id: r for r in records}
+            self._loaded = True
+            with self._bytes_lock:
+                self._bytes.clear()
+            self.generation = next(self._seq)
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return len(self._records)
+
+    def names(self) -> List[str]:
+        """Every loaded station name (feeds the destination gazetteer)."""
+        self.ensure_loaded()
+        return [r.name for r in self._records.values()]
+
+    # ---------- invalidation ----------
+    def _on_alert(self, event: str, alert: Dict[str, Any]) -> None:
+        for sid in alert.get("station_ids") or ():
+            self.invalidate(sid)
+
+    def invalidate(self, station_id: str) -> None:
+        with self._bytes_lock:
+            self._versions[station_id] = next(self._seq)
+            self._bytes.pop(station_id, None)
+
+    def version(self, station_id: str) -> int:
+        return self._versions.get(station_id, 0)
+
+    # ---------- reads ----------
+    def record(self, station_id: str) -> Optional[StationRecord]:
+        self.ensure_loaded()
+        rec = self._records.get(station_id)
+        if rec is None and not self._records:
+            return _placeholder(station_id)
+        return rec
+
+    def get_bytes(self, station_id: str) -> Optional[bytes]:
+        """Serialized StationAccessibilityInfo for one station, or None if unknown."""
+        if self.alerts is not None:
+            self.alerts.expire()  # O(1) unless an alert is due; expiring one invalidates its stations
+        with self._bytes_lock:
+            body = self._bytes.get(station_id)
+            if body is not None:
+                self._bytes.move_to_end(station_id)
+                return body
+
+        rec = self.record(station_id)
+        if rec is None:
+            return None
+        version = self.version(station_id)
+        body = json.dumps(self.build(rec), separators=(",", ":")).encode("utf-8")
+        with self._bytes_lock:
+            # Only cache if no alert changed this station while we were building
+            if self.version(station_id) == version:
+                self._bytes[station_id] = body
+                if len(self._bytes) > self.max_cached:
+                    self._bytes.popitem(last=False)
+        return body
+
+    def get(self, station_id: str) -> Optional[Dict[str, Any]]:
+        body = self.get_bytes(station_id)
+        return None if body is None else json.loads(body)
+
+    def batch_etag(self, station_ids: Iterable[str]) -> str:
+        """
+        Strong ETag for a batch response: a hash of the requested IDs (in order) and
+        each one's version, so it changes exactly when one of those stations does.
+        Compute it before batch_bytes() so a concurrent change can only make the tag
+        older than the body, never newer.
+        """
+        self.ensure_loaded()
+        if self.alerts is not None:
+            self.alerts.expire()
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.generation};".encode("utf-8"))
+        versions = self._versions
+        for sid in station_ids:
+            h.update(f"{sid}\x1f{versions.get(sid, 0)}\x1e".encode("utf-8"))
+        return f'"{h.hexdigest()}"'
+
+    def batch_bytes(self, station_ids: Iterable[str]) -> bytes:
+        """{"stations": {id: record, ...}, "missing": [...]} stitched from cached bytes."""
+        parts: List[bytes] = []
+        missing: List[str] = []
+        for sid in station_ids:
+            body = self.get_bytes(sid)
+            if body is None:
+                missing.append(sid)
+            else:
+                parts.append(json.dumps(sid).encode("utf-8") + b":" + body)
+        return b'{"stations":{' + b",".join(parts) + b'},"missing":' + json.dumps(missing).encode("utf-8") + b"}"
+
+    def build(self, rec: StationRecord) -> Dict[str, Any]:
+        """StationAccessibilityInfo dict for `rec` with current alerts applied."""
+        active = self.alerts.query(station_id=rec.station_id) if self.alerts is not None else []
+        out_of_service = {_ALERT_EFFECTS.get(a["alert_type"]) for a in active}
+        blocks_wheelchair = any(a["severity"] == "high" and "wheelchair" in a["affected_accessibility"] for a in active)
+
+        features: List[Dict[str, Any]] = []
+        for i, eid in enumerate(rec.elevators):
+            features.append({
+                "feature_id": eid,
+                "feature_name": "Main Entrance Elevator" if i == 0 else f"Elevator {i + 1}",
+                "is_available": "elevator" not in out_of_service,
+                "description": "Accessible elevator with audio and Braille buttons",
+            })
+        for i, eid in enumerate(rec.escalators):
+            features.append({
+                "feature_id": eid,
+                "feature_name": f"Escalator {i + 1}",
+                "is_available": "escalator" not in out_of_service,
+                "description": None,
+            })
+        if rec.flags & RAMP:
+            features.append({
+                "feature_id": "ramp_1",
+                "feature_name": "Wheelchair Ramp",
+                "is_available": "ramp" not in out_of_service,
+                "description": "Gentle slope ramp meeting ADA standards",
+            })
+        if rec.flags & LEVEL_BOARDING:
+            features.append({
+                "feature_id": "level_boarding",
+                "feature_name": "Level Boarding",
+                "is_available": True,
+                "description": "Platform level with vehicle floor",
+            })
+
+        return {
+            "station_id": rec.station_id,
+            "station_name": rec.name,
+            "features": features,
+            "wheelchair_accessible": rec.wheelchair_boarding == 1 and not blocks_wheelchair,
+            "audio_announcements": bool(rec.flags & AUDIO) and "audio" not in out_of_service,
+            "visual_displays": bool(rec.flags & VISUAL) and "visual" not in out_of_service,
+            "elevators_working": bool(rec.elevators) and "elevator" not in out_of_service,
+            "accessible_restrooms": bool(rec.flags & RESTROOMS),
+            "active_alerts": [
+                {"alert_id": a["alert_id"], "alert_type": a["alert_type"], "severity": a["severity"], "message": a["message"]}
+                for a in active
+            ],
+        }
+
+
+def _path_env(name: str) -> Optional[Path]:
+    value = os.getenv(name)
+    return Path(value) if value else None
+
+
+station_repository = StationRepository(
+    gtfs_dir=_path_env("GTFS_DIR"),
+    accessibility_csv=_path_env("STATION_ACCESSIBILITY_CSV"),
+    alerts=alert_store,
+)
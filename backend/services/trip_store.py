@@ -0,0 +1,361 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# TRANSIT_DATA_DIR relocates the SQLite files and snapshots (benchmarks use a temp dir)
+DB_DIR = Path(os.getenv("TRANSIT_DATA_DIR") or Path(__file__).resolve().parents[1] / "data")
+DB_PATH = DB_DIR / "trips.db"
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS trips (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        ts_utc TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        mode TEXT NOT NULL,
+        distance_km REAL NOT NULL,
+        baseline_car_kg REAL NOT NULL,
+        actual_kg REAL NOT NULL,
+        co2_saved_kg REAL NOT NULL,
+        points INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_trips_user ON trips(user_id, id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_counters (
+        user_id TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        value REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, metric)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_badges (
+        user_id TEXT NOT NULL,
+        badge_id TEXT NOT NULL,
+        awarded_utc TEXT NOT NULL,
+        PRIMARY KEY (user_id, badge_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id TEXT PRIMARY KEY,
+        total_co2_saved_kg REAL NOT NULL DEFAULT 0,
+        total_trips INTEGER NOT NULL DEFAULT 0,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        streak_days INTEGER NOT NULL DEFAULT 0,
+        best_streak_days INTEGER NOT NULL DEFAULT 0,
+        last_trip_day INTEGER,
+        updated_utc TEXT
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def _empty_stats(user_id: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "total_co2_saved_kg": 0.0,
+        "total_trips": 0,
+        "total_points": 0,
+        "streak_days": 0,
+        "best_streak_days": 0,
+        "last_trip_day": None,
+    }
+
+
+def _next_streak(streak: int, last_day: Optional[int], day: int) -> int:
+    if last_day is None:
+        return 1
+    if day == last_day:
+        return streak
+    if day == last_day + 1:
+        return streak + 1
+    if day < last_day:
+        # late/backfilled trip: does not change the running streak
+        return streak
+    return 1
+
+
+class TripStore:
+    """
+    Append-only trip ledger plus per-user aggregates kept in step on every write.
+
+    Each record_trip() inserts the trip and updates that user's user_stats row in the
+    same transaction, so reading stats is a primary-key lookup no matter how long the
+    trip history gets.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, pool_size: int = 4) -> None:
+        self.db_path = Path(db_path) if db_path is not None else DB_PATH
+        self.pool_size = pool_size
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=pool_size)
+        self._created = 0
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    # ---------- connections ----------
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self) -> None:
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            try:
+                for stmt in _SCHEMA:
+                    conn.execute(stmt)
+            finally:
+                conn.close()
+            self._initialized = True
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        self._ensure_schema()
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._init_lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            conn = self._connect() if grow else self._pool.get(timeout=10.0)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def pool_status(self) -> Dict[str, Any]:
+        return {"size": self.pool_size, "open": self._created, "idle": self._pool.qsize()}
+
+    def ping(self) -> float:
+        """Round-trip a trivial query through the pool; returns the seconds it took."""
+        start = time.perf_counter()
+        with self._conn() as conn:
+            conn.execute("SELECT 1").fetchone()
+        return time.perf_counter() - start
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+    # ---------- writes ----------
+    def record_trip(
+        self,
+        user_id: str,
+        impact: Dict[str, Any],
+        ts_utc: Optional[datetime] = None,
+        counters: Optional[Dict[str, float]] = None,
+        award: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store one ClimateEngine.calculate_savings() result for `user_id` and return the
+        user's updated aggregates.
+
+        `counters` are extra per-user tallies to bump in the same transaction (e.g.
+        {"mode:bike": 1}). The result carries their new values under "counters" and the
+        aggregates as they were before this trip under "previous".
+
+        `award` maps those stats to the badge ids the trip earns (BadgeEngine.evaluate);
+        they are written in the same transaction, so a trip is never counted without
+        its badges. The ones actually inserted are returned under "new_badges".
+        """
+        counters = counters or {}
+        ts = ts_utc or datetime.now(timezone.utc)
+        day = ts.date().toordinal()
+        saved = float(impact.get("co2_saved_kg") or 0.0)
+        points = int(impact.get("points_earned") or 0)
+
+        with self._conn() as conn:
+            # IMMEDIATE takes the write lock up front, so concurrent writers (threads or
+            # worker processes) serialize on the read-modify-write of user_stats.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO trips (user_id, ts_utc, day, mode, distance_km, baseline_car_kg, actual_kg, co2_saved_kg, points)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        user_id,
+                        ts.isoformat(),
+                        day,
+                        str(impact.get("mode") or "").lower(),
+                        float(impact.get("distance_km") or 0.0),
+                        float(impact.get("baseline_car_kg") or 0.0),
+                        float(impact.get("actual_kg") or 0.0),
+                        saved,
+                        points,
+                    ),
+                )
+                previous = self._read_stats(conn, user_id)
+                previous["counters"] = self._read_counters(conn, user_id, counters)
+                streak = previous["streak_days"]
+                best = previous["best_streak_days"]
+                last_day = previous["last_trip_day"]
+                streak = _next_streak(streak, last_day, day)
+                best = max(best, streak)
+                last_day = day if last_day is None else max(last_day, day)
+
+                conn.execute(
+                    """
+                    INSERT INTO user_stats (user_id, total_co2_saved_kg, total_trips, total_points,
+                                            streak_days, best_streak_days, last_trip_day, updated_utc)
+                    VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        total_co2_saved_kg = total_co2_saved_kg + excluded.total_co2_saved_kg,
+                        total_trips = total_trips + 1,
+                        total_points = total_points + excluded.total_points,
+                        streak_days = excluded.streak_days,
+                        best_streak_days = excluded.best_streak_days,
+                        last_trip_day = excluded.last_trip_day,
+                        updated_utc = excluded.updated_utc
+                    """,
+                    (user_id, saved, points, streak, best, last_day, ts.isoformat()),
+                )
+                for metric, delta in counters.items():
+                    conn.execute(
+                        """
+                        INSERT INTO user_counters (user_id, metric, value) VALUES (?, ?, ?)
+                        ON CONFLICT(user_id, metric) DO UPDATE SET value = value + excluded.value
+                        """,
+                        (user_id, metric, float(delta)),
+                    )
+                stats = self._read_stats(conn, user_id)
+                stats["counters"] = self._read_counters(conn, user_id, counters)
+                stats["previous"] = previous
+                stats["new_badges"] = self._insert_badges(conn, user_id, award(stats) if award else (), ts.isoformat())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return stats
+
+    # ---------- reads ----------
+    @staticmethod
+    def _read_stats(conn: sqlite3.Connection, user_id: str) -> Dict[str, Any]:
+        row = conn.execute(
+            """
+            SELECT total_co2_saved_kg, total_trips, total_points, streak_days, best_streak_days, last_trip_day
+            FROM user_stats WHERE user_id = ?
+            """,
+            (user_id,),
+        ).fetchone()
+        if row is None:
+            return _empty_stats(user_id)
+        return {
+            "user_id": user_id,
+            "total_co2_saved_kg": round(float(row[0]), 3),
+            "total_trips": int(row[1]),
+            "total_points": int(row[2]),
+            "streak_days": int(row[3]),
+            "best_streak_days": int(row[4]),
+            "last_trip_day": row[5],
+        }
+
+    @staticmethod
+    def _read_counters(conn: sqlite3.Connection, user_id: str, metrics: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        if metrics is None:
+            rows = conn.execute("SELECT metric, value FROM user_counters WHERE user_id = ?", (user_id,)).fetchall()
+            return {m: float(v) for m, v in rows}
+        out: Dict[str, float] = {}
+        for metric in metrics:
+            row = conn.execute(
+                "SELECT value FROM user_counters WHERE user_id = ? AND metric = ?", (user_id, metric)
+            ).fetchone()
+            out[metric] = float(row[0]) if row else 0.0
+        return out
+
+    def get_counters(self, user_id: str) -> Dict[str, float]:
+        with self._conn() as conn:
+            return self._read_counters(conn, user_id)
+
+    @staticmethod
+    def _insert_badges(conn: sqlite3.Connection, user_id: str, badge_ids: Iterable[str], ts: str) -> List[str]:
+        """Badges not held yet are inserted; returns those ids."""
+        inserted = []
+        for badge_id in badge_ids:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO user_badges (user_id, badge_id, awarded_utc) VALUES (?, ?, ?)",
+                (user_id, badge_id, ts),
+            )
+            if cur.rowcount:
+                inserted.append(badge_id)
+        return inserted
+
+    def award_badges(self, user_id: str, badge_ids: Iterable[str], ts_utc: Optional[datetime] = None) -> None:
+        """Awards outside a trip (backfills, manual grants); trips award through record_trip(award=...)."""
+        ts = (ts_utc or datetime.now(timezone.utc)).isoformat()
+        rows = [(user_id, b, ts) for b in badge_ids]
+        if not rows:
+            return
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO user_badges (user_id, badge_id, awarded_utc) VALUES (?, ?, ?)", rows
+            )
+
+    def get_badges(self, user_id: str) -> List[Tuple[str, str]]:
+        """(badge_id, awarded_utc) in the order they were earned."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT badge_id, awarded_utc FROM user_badges WHERE user_id = ? ORDER BY awarded_utc, badge_id",
+                (user_id,),
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def get_stats(self, user_id: str, today: Optional[datetime] = None) -> Dict[str, Any]:
+        """Aggregates for one user (primary-key lookup; no trip scan)."""
+        with self._conn() as conn:
+            stats = self._read_stats(conn, user_id)
+
+        # A streak only counts while it is unbroken: today or yesterday must have a trip.
+        last_day = stats["last_trip_day"]
+        if last_day is not None:
+            day = (today or datetime.now(timezone.utc)).date().toordinal()
+            if day - last_day > 1:
+                stats["streak_days"] = 0
+        return stats
+
+    def iter_user_totals(self) -> Iterator[Tuple[str, int, float]]:
+        """(user_id, total_points, total_co2_saved_kg) for every user, e.g. to rebuild rankings."""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT user_id, total_points, total_co2_saved_kg FROM user_stats").fetchall()
+        for r in rows:
+            yield r[0], int(r[1]), float(r[2])
+
+    def recent_trips(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT ts_utc, mode, distance_km, co2_saved_kg, points
+                FROM trips WHERE user_id = ?
+                ORDER BY id DESC LIMIT ?
+                """,
+                (user_id, int(limit)),
+            ).fetchall()
+        return [
+            {"ts_utc": r[0], "mode": r[1], "distance_km": r[2], "co2_saved_kg": r[3], "points": r[4]}
+            for r in rows
+        ]
+
+
+# Shared by the routes that write trips (climate) and read stats (users)
+trip_store = TripStore()
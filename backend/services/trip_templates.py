@@ -0,0 +1,182 @@
+import re
+import zlib
+from typing import Dict, Optional, Tuple
+
+
+# ---------- input shapes ----------
+# transit: "Bus 504, 15 mins away" / "Subway Line 1, 4 min" / "Walk, 12 minutes"
+_TRANSIT_RE = re.compile(
+    r"^\s*(?P<mode>bus|streetcar|tram|subway|metro|train|skytrain|lrt|ferry|walk|walking|bike|cycling)"
+    r"(?:\s+(?P<line>(?:line\s+|route\s+)?[a-z0-9][a-z0-9-]*))?"
+    # The line needs a separator before the minutes, so "Bus 15 mins" isn't line 1 in 5 min
+    r"(?:\s*,\s*|\s+)(?:in\s+)?(?P<minutes>\d{1,3})\s*(?:min|mins|minute|minutes)\.?"
+    r"(?:\s+away)?\s*$",
+    re.IGNORECASE,
+)
+
+# climate: "0.4kg CO2 saved" / "Saved 1.2 kg of CO2"
+_CLIMATE_RES = (
+    re.compile(r"^\s*(?P<kg>\d+(?:\.\d+)?)\s*kg\s*(?:of\s+)?co2(?:e)?\s+saved\.?\s*$", re.IGNORECASE),
+    re.compile(r"^\s*saved\s+(?P<kg>\d+(?:\.\d+)?)\s*kg\s*(?:of\s+)?co2(?:e)?\.?\s*$", re.IGNORECASE),
+)
+
+# vision: "Ramp Detected: True" / "No hazards" / "Hazard: snow, construction"
+_RAMP_RE = re.compile(r"^\s*ramp\s+detected\s*:\s*(?P<flag>true|false|yes|no)\s*$", re.IGNORECASE)
+_NO_HAZARD_RE = re.compile(r"^\s*no\s+hazards?(?:\s+detected)?\.?\s*$", re.IGNORECASE)
+_HAZARD_RE = re.compile(r"^\s*hazards?(?:\s+detected)?\s*:\s*(?P<what>[a-z ,/-]{2,60}?)\.?\s*$", re.IGNORECASE)
+
+_MODE_ALIASES = {
+    "metro": "subway",
+    "lrt": "train",
+    "tram": "streetcar",
+    "walking": "walk",
+    "cycling": "bike",
+}
+
+# ---------- phrasings ----------
+# Keyed by (mode group, co2 bucket) and vision state. Each slot has several variants;
+# the choice is a stable hash of the inputs so the same trip always reads the same.
+_LEAD = {
+    "ride": (
+        "{Vehicle} arrives in {duration}",
+        "Your {vehicle} is {duration} away",
+        "{Vehicle} will be here in {duration}",
+    ),
+    "active": (
+        "It's a {minutes}-minute {activity}",
+        "You're looking at a {minutes}-minute {activity}",
+    ),
+}
+
+_CO2 = {
+    "none": (
+        "",
+    ),
+    "small": (
+        " and saves {kg} kg of CO2 compared to driving",
+        " — that's {kg} kg of CO2 kept out of the air",
+    ),
+    "medium": (
+        " and saves a solid {kg} kg of CO2 versus driving",
+        " — nice, that's {kg} kg of CO2 saved",
+    ),
+    "large": (
+        " and saves an impressive {kg} kg of CO2 compared to driving",
+        " — a big win: {kg} kg of CO2 saved",
+    ),
+}
+
+_VISION = {
+    "ramp": (
+        ". A wheelchair ramp was detected at the stop.",
+        ", and there's a ramp available for step-free boarding.",
+    ),
+    "no_ramp": (
+        ". Heads up: no ramp was detected, so you may want to check step-free access.",
+        ". Note that a ramp wasn't detected at this stop.",
+    ),
+    "clear": (
+        ". No accessibility hazards were spotted.",
+        ", and the way looks clear of hazards.",
+    ),
+    "hazard": (
+        ". Please take care: {hazard} reported along the way.",
+        ". Heads up — {hazard} spotted, so allow a little extra time.",
+    ),
+}
+
+
+def _co2_bucket(kg: float) -> str:
+    if kg <= 0:
+        return "none"
+    if kg < 0.5:
+        return "small"
+    if kg < 2.0:
+        return "medium"
+    return "large"
+
+
+def _fmt_kg(kg: float) -> str:
+    return f"{kg:.2f}".rstrip("0").rstrip(".")
+
+
+def _fmt_minutes(minutes: str) -> str:
+    return f"{minutes} minute" if minutes == "1" else f"{minutes} minutes"
+
+
+def parse_trip_inputs(transit: str, climate: str, vision: str) -> Optional[Dict[str, str]]:
+    """
+    Pull the fields we template on out of the three synthesize() inputs.
+    Returns None when any input falls outside a known shape (caller uses the LLM).
+    """
+    t = _TRANSIT_RE.match(transit or "")
+    if not t:
+        return None
+
+    kg = None
+    for rx in _CLIMATE_RES:
+        c = rx.match(climate or "")
+        if c:
+            kg = float(c.group("kg"))
+            break
+    if kg is None:
+        return None
+
+    vision_state, hazard = None, ""
+    v = vision or ""
+    m = _RAMP_RE.match(v)
+    if m:
+        vision_state = "ramp" if m.group("flag").lower() in ("true", "yes") else "no_ramp"
+    elif _NO_HAZARD_RE.match(v):
+        vision_state = "clear"
+    else:
+        m = _HAZARD_RE.match(v)
+        if m:
+            vision_state, hazard = "hazard", m.group("what").strip().lower()
+    if vision_state is None:
+        return None
+
+    mode = t.group("mode").lower()
+    mode = _MODE_ALIASES.get(mode, mode)
+    return {
+        "mode": mode,
+        "line": t.group("line") or "",
+        "minutes": str(int(t.group("minutes"))),
+        "kg": _fmt_kg(kg),
+        "co2_bucket": _co2_bucket(kg),
+        "vision": vision_state,
+        "hazard": hazard,
+    }
+
+
+def _pick(options: Tuple[str, ...], seed: int) -> str:
+    return options[seed % len(options)]
+
+
+def render_trip_message(transit: str, climate: str, vision: str) -> Optional[str]:
+    """
+    Deterministic one-sentence trip summary, or None if the inputs need the LLM.
+    """
+    facts = parse_trip_inputs(transit, climate, vision)
+    if facts is None:
+        return None
+
+    seed = zlib.crc32(f"{transit}|{climate}|{vision}".encode("utf-8"))
+
+    if facts["mode"] in ("walk", "bike"):
+        lead = _pick(_LEAD["active"], seed).format(
+            minutes=facts["minutes"],
+            activity="walk" if facts["mode"] == "walk" else "bike ride",
+        )
+    else:
+        vehicle = f"{facts['mode']} {facts['line']}".strip()
+        # "Bus 504 arrives", but "The bus arrives" when no line was given
+        lead_vehicle = vehicle[0].upper() + vehicle[1:] if facts["line"] else f"The {vehicle}"
+        lead = _pick(_LEAD["ride"], seed).format(
+            vehicle=vehicle, Vehicle=lead_vehicle, duration=_fmt_minutes(facts["minutes"])
+        )
+
+    co2 = _pick(_CO2[facts["co2_bucket"]], seed >> 4).format(kg=facts["kg"])
+    tail = _pick(_VISION[facts["vision"]], seed >> 8).format(hazard=facts["hazard"])
+
+    return f"{lead}{co2}{tail}"
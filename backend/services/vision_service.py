@@ -1,17 +1,20 @@
-import os
-import google.generativeai as genai
-from PIL import Image
 import io
+import os
+
+from services.chat_service import genai_options
+from services.metrics import provider_metrics
 
 
 class VisionService:
     def __init__(self):
+        self.model = None
         # Configure the Gemini API
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             print("⚠️ WARNING: GEMINI_API_KEY not found. Vision service will fail.")
         else:
-            genai.configure(api_key=api_key)
+            import google.generativeai as genai  # deferred: slow to import, unused without a key
+            genai.configure(api_key=api_key, **genai_options())
             self.model = genai.GenerativeModel('gemini-2.5-flash')
 
     def analyze_image(self, image_bytes: bytes) -> dict:
@@ -19,6 +22,10 @@ class VisionService:
         Analyzes an image for accessibility hazards using Gemini Vision.
         """
         try:
+            from PIL import Image
+
+            if self.model is None:
+                raise RuntimeError("GEMINI_API_KEY not configured")
             image = Image.open(io.BytesIO(image_bytes))
 
             prompt = (
@@ -31,7 +38,7 @@ class VisionService:
                 "4. 'accessibility_score' (1-10)."
             )
 
-            response = self.model.generate_content([prompt, image])
+            response = provider_metrics("gemini").timed(self.model.generate_content, [prompt, image])
 
             # Clean up Markdown formatting (Gemini loves adding ```json)
             text_response = response.text.replace('```json', '').replace('```', '').strip()
@@ -0,0 +1,140 @@
+import json
+
+try:
+    from backend.services.alert_store import AlertStore
+except Exception:
+    from alert_store import AlertStore
+
+
+class _Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def test_indexed_queries_and_bulk_station_lookup():
+    store = AlertStore(clock=_Clock())
+    store.upsert({"alert_id": "a1", "station_id": "s1", "severity": "high", "message": "Elevator out of service"})
+    store.upsert({"alert_id": "a2", "station_ids": ["s1", "s2"], "severity": "low", "alert_type": "display_outage"})
+    store.upsert({"alert_id": "a3", "station_id": "s3", "severity": "medium", "message": "Ramp blocked by works"})
+
+    assert [a["alert_id"] for a in store.query(station_id="s1")] == ["a1", "a2"]  # most severe first
+    assert store.query(station_id="s1")[0]["alert_type"] == "elevator_outage"
+    assert [a["alert_id"] for a in store.query(affected="wheelchair")] == ["a1", "a3"]
+    assert [a["alert_id"] for a in store.query(station_id="s1", affected="hearing_impaired")] == ["a2"]
+    assert store.query(station_id="nope") == []
+
+    bulk = store.alerts_for_stations(["s2", "s3", "s9"])
+    assert set(bulk) == {"s2", "s3"}
+    assert [a["alert_id"] for a in bulk["s2"]] == ["a2"]
+
+
+def test_ttl_expiry_replacement_and_listeners():
+    clock = _Clock()
+    store = AlertStore(default_ttl_s=60, clock=clock)
+    events = []
+    store.add_listener(lambda event, alert: events.append((event, alert["alert_id"])))
+
+    store.upsert({"alert_id": "a1", "station_id": "s1", "ttl_s": 10})
+    store.upsert({"alert_id": "a1", "station_id": "s2", "ttl_s": 100})  # replaces; old heap entry is stale
+    store.upsert({"alert_id": "a2", "station_id": "s1"})
+
+    clock.t += 30
+    assert store.query(station_id="s1")[0]["alert_id"] == "a2"
+    assert store.get("a1")["station_id"] == "s2"
+
+    clock.t += 40  # a2 (60s default) expires, a1 (100s) does not
+    assert store.query(station_id="s1") == []
+    assert len(store) == 1
+    assert store.remove("a1") and not store.remove("a1")
+    assert events == [("upsert", "a1"), ("upsert", "a1"), ("upsert", "a2"), ("expire", "a2"), ("remove", "a1")]
+
+
+def test_feed_reload_replaces_feed_alerts_only(tmp_path):
+    clock = _Clock()
+    store = AlertStore(clock=clock)
+    store.upsert({"alert_id": "manual", "station_id": "s1"})
+
+    def feed(*entities):
+        return {"header": {"gtfs_realtime_version": "2.0"}, "entity": list(entities)}
+
+    def entity(eid, stop, text, severity="SEVERE", end=None):
+        alert = {
+            "informed_entity": [{"stop_id": stop}],
+            "header_text": {"translation": [{"text": text, "language": "en"}]},
+            "severity_level": severity,
+        }
+        if end:
+            alert["active_period"] = [{"start": 0, "end": end}]
+        return {"id": eid, "alert": alert}
+
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(feed(entity("e1", "s1", "Elevator out of service"),
+                                    entity("e2", "s2", "Escalator closed", "INFO", end=clock.t + 5))))
+    store.feed_path = path
+    store.feed_check_s = 0.0
+    assert store.refresh_from_feed()
+    assert not store.refresh_from_feed()  # unchanged file is not re-parsed
+
+    s1 = {a["alert_id"]: a for a in store.query(station_id="s1")}
+    assert set(s1) == {"manual", "feed_e1"}
+    assert s1["feed_e1"]["severity"] == "high" and s1["feed_e1"]["alert_type"] == "elevator_outage"
+    assert store.get("feed_e2")["alert_type"] == "escalator_outage"
+
+    store.load_feed(feed(entity("e3", "s3", "Ramp blocked")))
+    assert store.get("feed_e1") is None and store.get("feed_e2") is None
+    assert store.get("manual") is not None and store.get("feed_e3") is not None
+
+
+def test_feed_file_is_checked_at_most_once_per_interval(tmp_path, monkeypatch):
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps({"entity": []}))
+    store = AlertStore(clock=_Clock())
+    store.feed_path = path
+    store.feed_check_s = 60.0
+    assert store.refresh_from_feed()
+
+    stats = []
+    real_stat = type(path).stat
+    monkeypatch.setattr(type(path), "stat", lambda self, *a, **k: stats.append(self) or real_stat(self, *a, **k))
+    for _ in range(100):
+        store.refresh_from_feed()
+    assert stats == []
+
+    store._feed_checked -= 61.0
+    assert not store.refresh_from_feed()
+    assert stats == [path]
+
+
+def test_alert_routes_filter_per_station_and_require_admin_to_write(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    try:
+        from backend.routes import accessibility
+    except Exception:
+        from routes import accessibility
+
+    store = AlertStore(clock=_Clock())
+    monkeypatch.setattr(accessibility, "alert_store", store)
+    monkeypatch.setattr(accessibility.worker_sync, "emit", lambda stream, data: None)
+    app = FastAPI()
+    app.include_router(accessibility.router)
+    client = TestClient(app)
+
+    alert = {"alert_id": "a1", "station_id": "s1", "severity": "high", "message": "Elevator out of service"}
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/api/alerts", json=alert).status_code == 404
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert client.post("/api/alerts", json=alert).status_code == 401
+    assert client.delete("/api/alerts/a1").status_code == 401
+    assert client.post("/api/alerts", json=alert, headers={"X-Admin-Token": "s3cret"}).status_code == 201
+    store.upsert({"alert_id": "a2", "station_ids": ["s1", "s2"], "severity": "low", "alert_type": "display_outage"})
+
+    out = client.get("/api/alerts", params={"station_ids": "s1,s2", "severity": "high"}).json()
+    assert [a["alert_id"] for a in out["alerts"]] == ["a1"]
+    assert {sid: [a["alert_id"] for a in v] for sid, v in out["by_station"].items()} == {"s1": ["a1"]}
+
+    assert client.delete("/api/alerts/a1", headers={"Authorization": "Bearer s3cret"}).json()["resolved"] is True
@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+try:
+    from backend.services.carbon_forecast import CarbonForecaster, ZoneModel, cis
+    from backend.services.prefetch import region_of
+except Exception:
+    from services.carbon_forecast import CarbonForecaster, ZoneModel, cis
+    from services.prefetch import region_of
+
+MONDAY = datetime(2026, 6, 1, tzinfo=timezone.utc)  # a Monday
+
+
+def _evening_peak(at):
+    return 150.0 if 17 <= at.hour <= 20 else 100.0
+
+
+def _weeks(n, value=_evening_peak, start=MONDAY):
+    return [(start + timedelta(hours=h), value(start + timedelta(hours=h))) for h in range(n * 168)]
+
+
+def test_profile_learns_hour_of_week_and_interpolates_between_hours():
+    model = ZoneModel()
+    model.add_many([(at.timestamp(), v) for at, v in _weeks(3)])
+    later = MONDAY + timedelta(weeks=5)
+    assert abs(model.intensity_at(later + timedelta(hours=18, minutes=30)) - 150.0) < 1e-6
+    assert abs(model.intensity_at(later + timedelta(hours=3, minutes=30)) - 100.0) < 1e-6
+    # Halfway between the 16:30 (100) and 17:30 (150) bin centres
+    assert abs(model.intensity_at(later + timedelta(hours=17)) - 125.0) < 1e-6
+
+
+def test_smoothed_deviation_lifts_near_term_then_decays_to_profile():
+    model = ZoneModel(alpha=0.5, damping_per_hour=0.9)
+    readings = _weeks(2)
+    # The last day ran 40 g dirtier than usual
+    readings += [(at, v + 40.0) for at, v in _weeks(1, start=MONDAY + timedelta(weeks=2))[:24]]
+    model.add_many([(at.timestamp(), v) for at, v in readings])
+    last = readings[-1][0]
+
+    def deviation(at):
+        return model.intensity_at(at) - model.seasonal(at.timestamp())
+
+    assert 20.0 < deviation(last + timedelta(hours=1, minutes=30)) < 40.0
+    assert 0.0 <= deviation(last + timedelta(hours=48)) < 1.0
+
+
+def test_empty_bins_fall_back_to_the_same_hour_on_other_days():
+    model = ZoneModel()
+    # Only Monday and Tuesday of one week
+    model.add_many([(at.timestamp(), v) for at, v in _weeks(1)[:48]])
+    saturday = MONDAY + timedelta(days=5, hours=18, minutes=30)
+    assert abs(model.intensity_at(saturday) - 150.0) < 1e-6
+
+
+def _forecaster(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(cis, "DB_DIR", tmp_path)
+    monkeypatch.setattr(cis, "DB_PATH", tmp_path / "carbon_intensity.db")
+    return CarbonForecaster(**kwargs)
+
+
+def test_recorded_readings_map_regions_to_zones_and_answer_when_live_is_down(tmp_path, monkeypatch):
+    fc = _forecaster(tmp_path, monkeypatch)
+    region = region_of(49.28, -123.12)
+    assert fc.estimate(49.28, -123.12) is None  # nothing known yet: caller uses its default
+
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for at, v in _weeks(1, start=now - timedelta(weeks=1)):
+        fc.record(region, "CA-BC", v, at.isoformat())
+    fc.record(region, "CA-BC", 999.0, (now - timedelta(hours=1)).isoformat())  # same hour again: ignored
+
+    with sqlite3.connect(cis.DB_PATH) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM carbon_intensity WHERE location = 'CA-BC'").fetchone()[0] == 168
+
+    # A fresh instance (another worker) finds the zone through the shared table
+    other = _forecaster(tmp_path, monkeypatch)
+    evening = now.replace(hour=18, minute=30) + timedelta(days=1)
+    assert other.zone_for(49.30, -123.01) == "CA-BC"
+    assert abs(other.estimate(49.30, -123.01, evening) - 150.0) < 5.0
+
+
+def test_recording_swaps_in_a_new_model_instead_of_mutating_the_cached_one(tmp_path, monkeypatch):
+    fc = _forecaster(tmp_path, monkeypatch)
+    region = region_of(49.28, -123.12)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for at, v in _weeks(1, start=now - timedelta(weeks=1)):
+        fc.record(region, "CA-BC", v, at.isoformat())
+    before = fc.model("CA-BC")
+    readings, profile = before.readings, list(before.profile)
+
+    fc.record(region, "CA-BC", 500.0, now.isoformat())
+
+    after = fc.model("CA-BC")
+    assert after is not before and after.readings == readings + 1
+    # A request still holding the old model sees it unchanged
+    assert before.readings == readings and list(before.profile) == profile
+
+
+def test_fill_keeps_live_hours_and_models_the_gaps(tmp_path, monkeypatch):
+    fc = _forecaster(tmp_path, monkeypatch, default_zone="Toronto")
+    cis.init_db()
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    for at, v in _weeks(2, start=start - timedelta(weeks=2)):
+        cis.insert_reading("Toronto", v, at.isoformat())
+
+    live = [{"datetime": (start + timedelta(hours=1)).isoformat(), "carbonIntensity": 42}]
+    points = fc.fill(None, None, start, 4, live)
+    assert [p["source"] for p in points] == ["history", "forecast", "history", "history"]
+    assert points[1]["carbonIntensity"] == 42
+    assert all(p["carbonIntensity"] > 0 for p in points)
@@ -1,7 +1,13 @@
+import sys
+import xml.etree.ElementTree as ET
+
+import httpx
+import pytest
+
 try:
-    from backend.services.climate_hazards_service import ClimateHazardsService
+    from backend.services.climate_hazards_service import ClimateHazardsService, _iter_smoke_placemarks
 except Exception:
-    from climate_hazards_service import ClimateHazardsService
+    from climate_hazards_service import ClimateHazardsService, _iter_smoke_placemarks
 
 
 # Minimal KML with ONE polygon that contains (lat=49.28, lon=-123.12)
@@ -28,14 +34,15 @@ _FAKE_SMOKE_KML = """<?xml version="1.0" encoding="UTF-8"?>
 _FAKE_FIRMS_CSV = "latitude,longitude\n49.281,-123.121\n"
 
 
+def _parse(kml: str):
+    return list(_iter_smoke_placemarks([kml.encode("utf-8")]))
+
+
 def test_hazards_smoke_detected_and_alerts_for_asthma(monkeypatch):
     s = ClimateHazardsService()
     s.firms_key = ""  # force FIRMS off for this test
 
-    def fake_fetch(url: str):
-        return _FAKE_SMOKE_KML
-
-    monkeypatch.setattr(s, "_fetch_text", fake_fetch)
+    monkeypatch.setattr(s, "_fetch_smoke", lambda: _parse(_FAKE_SMOKE_KML))
 
     out = s.get_hazards(lat=49.28, lon=-123.12, impairments=["asthma"])
 
@@ -48,13 +55,141 @@ def test_hazards_firms_enabled_detects_nearby_fire(monkeypatch):
     s = ClimateHazardsService()
     s.firms_key = "dummy"
 
-    def fake_fetch(url: str):
-        if "firms.modaps.eosdis.nasa.gov" in url:
-            return _FAKE_FIRMS_CSV
-        return _FAKE_SMOKE_KML
-
-    monkeypatch.setattr(s, "_fetch_text", fake_fetch)
+    monkeypatch.setattr(s, "_fetch_text", lambda url: _FAKE_FIRMS_CSV)
+    monkeypatch.setattr(s, "_fetch_smoke", lambda: _parse(_FAKE_SMOKE_KML))
 
     out = s.get_hazards(lat=49.28, lon=-123.12, impairments=["respiratory"])
     assert any(h["type"] == "active_fire_nearby" for h in out["hazards"])
     assert out["fire_detail"]["count"] == 1
+
+
+def test_hazards_async_returns_partial_result_when_smoke_misses_deadline(monkeypatch):
+    import asyncio
+    import time
+
+    s = ClimateHazardsService()
+    s.firms_key = "dummy"
+    s.smoke_deadline_s = 0.05
+
+    def slow_smoke():
+        time.sleep(0.3)  # NOAA is slow today
+        return _parse(_FAKE_SMOKE_KML)
+
+    monkeypatch.setattr(s, "_fetch_text", lambda url: _FAKE_FIRMS_CSV)
+    monkeypatch.setattr(s, "_fetch_smoke", slow_smoke)
+
+    out = asyncio.run(s.get_hazards_async(lat=49.28, lon=-123.12, impairments=["asthma"]))
+
+    assert out["unavailable"] == ["smoke"]
+    assert out["smoke_detail"]["status"] == "unavailable"
+    assert any(h["type"] == "active_fire_nearby" for h in out["hazards"])
+    assert out["fire_detail"]["count"] == 1
+
+
+def test_hazards_async_fetches_in_its_own_bounded_pool(monkeypatch):
+    import asyncio
+    import threading
+
+    module = sys.modules[ClimateHazardsService.__module__]
+    s = ClimateHazardsService()
+    s.smoke_deadline_s = 0.05
+    release = threading.Event()
+    started = []
+
+    def stuck_smoke():
+        started.append(threading.current_thread().name)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(s, "_fetch_smoke", stuck_smoke)
+
+    async def burst():
+        return await asyncio.gather(*(s.get_hazards_async(49.28, -123.12) for _ in range(20)))
+
+    try:
+        outs = asyncio.run(burst())
+    finally:
+        release.set()
+    assert all(out["unavailable"] == ["smoke"] for out in outs)
+    # Queued fetches were dropped at the deadline; only the pool's threads were ever busy
+    assert 0 < len(started) <= module._fetch_pool._max_workers
+    assert all(name.startswith("hazards") for name in started)
+
+
+def test_smoke_placemarks_parse_into_flat_arrays():
+    kml = _FAKE_SMOKE_KML.replace(
+        "</Document>",
+        """<Placemark><styleUrl>#heavy</styleUrl><Polygon><outerBoundaryIs><LinearRing>
+        <coordinates>1,2 3,4 5,6</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>
+        <Placemark><name>No polygon</name></Placemark>
+        </Document>""",
+    )
+    polys = _parse(kml)
+
+    assert [sev for _, sev in polys] == ["medium", "heavy"]
+    assert list(polys[0][0][:4]) == [-123.30, 49.20, -123.00, 49.20]
+    assert list(polys[1][0]) == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    with pytest.raises(ET.ParseError):
+        _parse("<kml><not-closed>")
+
+
+def test_smoke_feed_is_parsed_from_the_streamed_body(monkeypatch):
+    body = _FAKE_SMOKE_KML.encode("utf-8")
+    served = []
+
+    def handler(request):
+        served.append(request.url.path)
+        if request.url.path.endswith("broken.kml"):
+            return httpx.Response(200, content=b"<kml><not-closed>")
+        # Several small chunks, as a real body arrives
+        return httpx.Response(200, content=iter([body[i:i + 64] for i in range(0, len(body), 64)]))
+
+    module = sys.modules[ClimateHazardsService.__module__]
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(module, "sync_client", lambda: client)
+
+    s = ClimateHazardsService()
+    s.noaa_smoke_kml_url = "http://noaa.test/smoke.kml"
+    assert s.get_hazards(lat=49.28, lon=-123.12)["smoke_detail"]["severity"] == "medium"
+
+    # A document that does not parse is a failed fetch, not "no smoke"
+    s2 = ClimateHazardsService()
+    s2.noaa_smoke_kml_url = "http://noaa.test/broken.kml"
+    assert s2.get_hazards(lat=49.28, lon=-123.12)["unavailable"] == ["smoke"]
+    assert served == ["/smoke.kml", "/broken.kml"]
+
+
+def test_smoke_polygons_are_fetched_once_per_ttl(monkeypatch):
+    s = ClimateHazardsService()
+    calls = []
+
+    def fake_fetch():
+        calls.append(1)
+        return _parse(_FAKE_SMOKE_KML)
+
+    monkeypatch.setattr(s, "_fetch_smoke", fake_fetch)
+    assert s.smoke_snapshot_age_s() is None
+
+    s.get_hazards(lat=49.28, lon=-123.12)
+    s.get_hazards(lat=10.0, lon=10.0)
+    assert len(calls) == 1
+    assert s.smoke_snapshot_age_s() is not None
+
+    s.smoke_ttl_s = 0.0
+    s.get_hazards(lat=49.28, lon=-123.12)
+    assert len(calls) == 2
+
+
+def test_failed_sources_are_reported_unavailable_not_empty(monkeypatch):
+    import asyncio
+
+    s = ClimateHazardsService()
+    s.firms_key = "dummy"
+    monkeypatch.setattr(s, "_fetch_text", lambda url: None)  # both providers errored
+    monkeypatch.setattr(s, "_fetch_smoke", lambda: None)
+
+    for out in (s.get_hazards(lat=49.28, lon=-123.12), asyncio.run(s.get_hazards_async(lat=49.28, lon=-123.12))):
+        assert out["unavailable"] == ["fires", "smoke"]
+        assert out["smoke_detail"]["status"] == "unavailable"
+        assert out["fire_detail"]["status"] == "unavailable"
+        assert out["hazards"] == []
@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+try:
+    from backend.middleware.compression import CompressionMiddleware
+except Exception:
+    from middleware.compression import CompressionMiddleware
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    def big():
+        return {"items": ["accessible"] * 200}
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok", headers={"Cache-Control": "public, max-age=60"})
+
+    @app.get("/stream")
+    def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {'x' * 200}{i}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/echo")
+    def echo():
+        return {"items": ["accessible"] * 200}
+
+    return TestClient(app)
+
+
+def test_large_body_is_gzipped_with_encoding_specific_etag_and_304():
+    c = _client()
+    r = c.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.headers["etag"].endswith('-gzip"')
+    assert r.json()["items"][0] == "accessible"  # client transparently decompresses
+
+    plain = c.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"].strip('"') + "-gzip" == r.headers["etag"].strip('"')
+
+    # either representation's tag revalidates
+    for tag in (r.headers["etag"], plain.headers["etag"]):
+        nm = c.get("/big", headers={"If-None-Match": tag, "Accept-Encoding": "gzip"})
+        assert nm.status_code == 304 and nm.content == b""
+        # ...and the 304 carries the validator of the variant it stands in for
+        assert nm.headers["etag"] == r.headers["etag"]
+        assert nm.headers["vary"] == "Accept-Encoding"
+
+    nm = c.get("/big", headers={"If-None-Match": r.headers["etag"], "Accept-Encoding": "identity"})
+    assert nm.status_code == 304 and nm.headers["etag"] == plain.headers["etag"]
+
+
+def test_small_bodies_posts_and_streams_are_left_alone():
+    c = _client()
+    r = c.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers and r.headers["cache-control"] == "public, max-age=60"
+    nm = c.get("/small", headers={"If-None-Match": r.headers["etag"]})
+    assert nm.status_code == 304 and nm.headers["cache-control"] == "public, max-age=60"
+
+    post = c.post("/echo", headers={"Accept-Encoding": "gzip"})
+    assert post.headers["content-encoding"] == "gzip" and "etag" not in post.headers
+
+    s = c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in s.headers and "etag" not in s.headers
+    assert s.text.count("data:") == 3
+
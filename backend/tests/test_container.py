@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+try:
+    from backend.services.container import Container, StartupClock, container
+except Exception:
+    from services.container import Container, StartupClock, container
+
+
+def test_services_are_built_once_on_first_use_and_timed():
+    c = Container()
+    built = []
+    c.register("svc", lambda: built.append(1) or object())
+
+    assert built == [] and c.report() == {"svc": {"built": False, "ms": None}}
+    first = c.get("svc")
+    assert c.get("svc") is first
+    assert built == [1]
+    assert c.report()["svc"]["built"] is True and c.report()["svc"]["ms"] >= 0
+
+
+def test_concurrent_first_use_shares_one_instance():
+    c = Container()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    c.register("svc", slow)
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(c.get("svc"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len({id(x) for x in got}) == 1
+
+
+def test_provider_override_and_reset():
+    c = Container()
+    c.register("svc", lambda: "real")
+    provide = c.provider("svc")
+
+    c.override("svc", "fake")
+    assert asyncio.run(provide()) == "fake"
+    c.reset("svc")
+    assert not c.is_built("svc")
+    assert asyncio.run(provide()) == "real"
+
+
+def test_unknown_service_raises_key_error():
+    c = Container()
+    try:
+        c.get("missing")
+    except KeyError as e:
+        assert "missing" in str(e)
+    else:
+        raise AssertionError("expected KeyError")
+
+
+def test_gazetteer_fills_without_building_chat_and_chat_shares_it():
+    container.reset("destinations")
+    container.reset("chat")
+    try:
+        container.get("destinations").add_names(["Zorblat Plaza"])
+        assert not container.is_built("chat")
+
+        chat = container.get("chat")
+        assert chat.destinations is container.get("destinations")
+        assert chat.destinations.lookup("zorblat plaza") == "Zorblat Plaza"
+    finally:
+        container.reset("destinations")
+        container.reset("chat")
+
+
+def test_startup_clock_reports_phases_in_order():
+    clock = StartupClock()
+    clock.mark("imports")
+    clock.mark("routes")
+    report = clock.report()
+    assert list(report["phases_ms"]) == ["imports", "routes"]
+    assert report["total_ms"] >= sum(report["phases_ms"].values()) - 0.1
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+try:
+    from backend.services.climate_service import ClimateEngine
+    from backend.services.departure_optimizer import DepartureOptimizer
+except Exception:
+    from services.climate_service import ClimateEngine
+    from services.departure_optimizer import DepartureOptimizer
+
+T0 = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _forecast(values):
+    return [{"datetime": (T0 + timedelta(hours=h)).isoformat().replace("+00:00", "Z"), "carbonIntensity": v}
+            for h, v in enumerate(values)]
+
+
+def _brute_force_kg(engine, grid, start_min, segments):
+    # Reference: integrate minute by minute for one candidate
+    kg, t = 0.0, start_min
+    for seg in segments:
+        mins = int(seg["minutes"])
+        if seg["mode"] in engine.ELECTRIC_MODES:
+            mean = sum(grid[t:t + mins]) / mins
+            kg += engine._electric_emissions_kg(seg["distance_km"], mean)
+        else:
+            kg += engine.calculate_savings(seg["distance_km"], seg["mode"])["actual_kg"]
+        t += mins
+    return kg
+
+
+def test_forecast_is_held_per_minute_until_the_forecast_ends():
+    points = [(T0, 100.0), (T0 + timedelta(hours=1), 200.0)]
+    grid = DepartureOptimizer.forecast_minutes(points, T0 + timedelta(minutes=30), 600)
+    assert len(grid) == 90  # 30 min of the first hour, then the last hour
+    assert grid[0] == 100.0 and grid[29] == 100.0 and grid[30] == 200.0
+
+
+def test_sliding_windows_match_per_candidate_integration():
+    engine = ClimateEngine()
+    opt = DepartureOptimizer(engine)
+    segments = [
+        {"mode": "walk", "minutes": 7, "distance_km": 0.5},
+        {"mode": "skytrain", "minutes": 40, "distance_km": 20.0},
+        {"mode": "bus", "minutes": 13, "distance_km": 4.0},
+    ]
+    forecast = _forecast([300, 250, 90, 80, 260, 310])
+    out = opt.optimize_departures(forecast, segments, T0, window_hours=4, headway_minutes=1, top_n=500,
+                                  delay_weight_kg_per_min=0.0)
+
+    grid = DepartureOptimizer.forecast_minutes([(T0 + timedelta(hours=h), float(v)) for h, v in
+                                                enumerate([300, 250, 90, 80, 260, 310])], T0, 10_000)
+    assert out["candidates"] == 241
+    for row in out["best"][::37]:
+        expected = _brute_force_kg(engine, grid, row["wait_minutes"], segments)
+        assert abs(row["co2_kg"] - expected) < 1e-4
+    # The electric leg is cheapest when it runs entirely inside the 80-90 g hours
+    assert 120 - 7 <= out["best"][0]["wait_minutes"] <= 240 - 47
+
+
+def test_timetable_and_delay_weight_shape_the_choice():
+    opt = DepartureOptimizer()
+    segments = [{"mode": "subway", "minutes": 30, "distance_km": 15.0}]
+    forecast = _forecast([400, 100, 100, 100])
+    timetable = [T0 + timedelta(minutes=m) for m in (5, 50, 65, 125, 500)]
+
+    patient = opt.optimize_departures(forecast, segments, T0, departures=timetable, delay_weight_kg_per_min=0.0)
+    # 65 and 125 run wholly in the 100 g hours (ties go to the sooner); 50 catches 10 min of 400 g
+    assert [r["wait_minutes"] for r in patient["best"]] == [65, 125, 50]
+    assert patient["candidates"] == 4  # 500 min is past the forecast
+    assert patient["earliest"]["wait_minutes"] == 5
+
+    hurried = opt.optimize_departures(forecast, segments, T0, departures=timetable, delay_weight_kg_per_min=1.0)
+    assert hurried["best"][0]["wait_minutes"] == 5
+
+
+def test_no_forecast_no_candidates():
+    out = DepartureOptimizer().optimize_departures([], [{"mode": "subway", "minutes": 10, "distance_km": 5}], T0)
+    assert out == {"best": [], "earliest": None, "candidates": 0}
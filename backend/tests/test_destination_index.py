@@ -0,0 +1,54 @@
+try:
+    from backend.services.destination_index import DestinationIndex, phonetic_key
+except Exception:
+    from destination_index import DestinationIndex, phonetic_key
+
+
+def test_phonetic_key_folds_initial_vowels():
+    assert phonetic_key("onion") == phonetic_key("union")
+    assert phonetic_key("station") != phonetic_key("street")
+
+
+def test_lookup_resolves_misheard_stop_locally():
+    idx = DestinationIndex()
+
+    out = idx.lookup("I want to go to... un... un... onion station... please.")
+    assert out == "Union Station"
+
+    # Second time round it is an exact-match hit
+    assert idx.lookup("i want to go to un un onion station please") == "Union Station"
+    assert idx.hits == 2
+
+
+def test_lookup_returns_none_for_novel_input():
+    idx = DestinationIndex()
+    assert idx.lookup("the blue house by the lake") is None
+    assert idx.misses == 1
+
+
+def test_learn_adds_confirmed_correction_for_that_rider():
+    idx = DestinationIndex(names=[])
+    assert idx.lookup("joy center station", "u1") is None
+
+    idx.learn("u1", "joy center station", "Joyce-Collingwood Station")
+
+    assert idx.lookup("Joy... center station", "u1") == "Joyce-Collingwood Station"
+    # Phonetic neighbours of the learned name resolve too
+    assert idx.lookup("take me to joice collingwood station", "u1") == "Joyce-Collingwood Station"
+    # Nobody else is affected
+    assert idx.lookup("joy center station", "u2") is None
+    assert idx.lookup("joy center station") is None
+
+
+def test_learned_entries_never_remap_stop_names_and_are_bounded():
+    idx = DestinationIndex(max_learned_entries=4)
+    idx.learn("u1", "union station", "Somewhere Else")
+    idx.remember("union station", "Somewhere Else")
+    assert idx.lookup("union station", "u1") == "Union Station"
+    assert idx.lookup("union station") == "Union Station"
+
+    for i in range(10):
+        idx.learn(f"u{i}", f"place number {i}", f"Place {i}")
+    assert len(idx._learned) == 4
+    assert idx.lookup("place number 9", "u9") == "Place 9"
+    assert idx.lookup("place number 0", "u0") is None
@@ -0,0 +1,46 @@
+import importlib
+import json
+import sys
+from datetime import datetime, timezone
+
+from pydantic import BaseModel
+
+try:
+    from backend.services import fast_json
+except Exception:
+    import fast_json
+
+
+class _Point(BaseModel):
+    lat: float
+    lon: float
+
+
+PAYLOAD = {
+    "when": datetime(2026, 5, 1, 12, tzinfo=timezone.utc),
+    "points": [_Point(lat=43.6, lon=-79.4)],
+    "tags": {"a"},
+    "name": "Café",
+}
+EXPECTED = {"when": "2026-05-01T12:00:00+00:00", "points": [{"lat": 43.6, "lon": -79.4}], "tags": ["a"], "name": "Café"}
+
+
+def test_response_renders_models_dates_and_sets():
+    body = fast_json.FastJSONResponse(PAYLOAD).body
+    assert json.loads(body) == EXPECTED
+
+
+def test_stdlib_fallback_matches():
+    missing = object()
+    original = sys.modules.get("orjson", missing)
+    sys.modules["orjson"] = None  # makes `import orjson` raise ImportError
+    try:
+        fallback = importlib.reload(fast_json)
+        assert fallback.BACKEND == "json"
+        assert json.loads(fallback.FastJSONResponse(PAYLOAD).body) == EXPECTED
+    finally:
+        if original is missing:
+            del sys.modules["orjson"]
+        else:
+            sys.modules["orjson"] = original
+        importlib.reload(fast_json)
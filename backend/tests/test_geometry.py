@@ -0,0 +1,82 @@
+import math
+import random
+import time
+
+try:
+    from backend.services.geometry import (
+        compact_steps, decode_polyline, douglas_peucker, encode_polyline, shape_geometry, visvalingam, zoom_tolerance_m,
+    )
+except Exception:
+    from geometry import (
+        compact_steps, decode_polyline, douglas_peucker, encode_polyline, shape_geometry, visvalingam, zoom_tolerance_m,
+    )
+
+
+def _wiggly_line(n=2000, seed=5):
+    rnd = random.Random(seed)
+    lon, lat, coords = -79.38, 43.65, []
+    for i in range(n):
+        lon += 1e-4 + rnd.uniform(-2e-6, 2e-6)
+        lat += 5e-5 * math.sin(i / 50.0) + rnd.uniform(-2e-6, 2e-6)
+        coords.append([lon, lat])
+    return coords
+
+
+def test_google_reference_polyline_round_trip():
+    # Example from Google's encoded polyline algorithm documentation
+    coords = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+    encoded = encode_polyline(coords)
+    assert encoded == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline(encoded) == coords
+    assert decode_polyline(encode_polyline(coords, 6), 6) == coords
+
+
+def test_simplifiers_keep_endpoints_and_shrink_with_tolerance():
+    line = _wiggly_line()
+    for simplify in (douglas_peucker, visvalingam):
+        fine = simplify(line, 1.0)
+        coarse = simplify(line, 20.0)
+        assert fine[0] == line[0] and fine[-1] == line[-1]
+        assert len(line) > len(fine) > len(coarse) >= 2
+    # collinear points go even at a tiny tolerance
+    straight = [[i * 1e-4, 0.0] for i in range(100)]
+    assert douglas_peucker(straight, 0.01) == [straight[0], straight[-1]]
+    assert visvalingam(straight, 0.01) == [straight[0], straight[-1]]
+
+
+def test_zoom_tolerance_and_shape_geometry():
+    assert zoom_tolerance_m(10, 0.0) > zoom_tolerance_m(16, 0.0) > zoom_tolerance_m(16, 60.0)
+    line = _wiggly_line()
+    geom, info = shape_geometry({"type": "LineString", "coordinates": line}, fmt="polyline", zoom=12)
+    assert isinstance(geom, str) and info["points_in"] == len(line) > info["points_out"]
+    assert len(decode_polyline(geom)) == info["points_out"]
+
+
+def test_simplifying_a_long_route_stays_cheap():
+    # OSRM-like: 20k points rounded to 5 decimals, at the default (near-lossless) tolerance
+    rnd = random.Random(7)
+    lon, lat, coords = -79.38, 43.65, []
+    for i in range(20_000):
+        lon += 1e-5 + rnd.uniform(-2e-6, 2e-6)
+        lat += 5e-6 * math.sin(i / 80.0) + rnd.uniform(-2e-6, 2e-6)
+        coords.append([round(lon, 5), round(lat, 5)])
+
+    start = time.perf_counter()
+    geom, info = shape_geometry({"type": "LineString", "coordinates": coords}, fmt="polyline")
+    elapsed = time.perf_counter() - start
+
+    assert info["points_in"] == 20_000 > info["points_out"]
+    # ~0.2 s here; the bound leaves room for slow CI machines but catches a quadratic blow-up
+    assert elapsed < 2.0
+
+
+def test_compact_steps_drops_geometry_and_intersections():
+    legs = [{"distance": 100.0, "duration": 80.0, "summary": "King St", "steps": [{
+        "name": "King St", "distance": 100.04, "duration": 80.0, "mode": "walking", "weight": 80.0,
+        "geometry": {"type": "LineString", "coordinates": [[0, 0], [1, 1]]},
+        "intersections": [{"location": [0, 0]}],
+        "maneuver": {"type": "depart", "location": [0, 0], "bearing_after": 90},
+    }]}]
+    out = compact_steps(legs)
+    assert out[0]["steps"] == [{"name": "King St", "distance_m": 100.0, "duration_s": 80.0,
+                                "mode": "walking", "maneuver": "depart", "location": [0, 0]}]
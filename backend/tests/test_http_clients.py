@@ -0,0 +1,24 @@
+import asyncio
+
+try:
+    from backend.services.http_clients import aclose_clients, async_client, sync_client
+except Exception:
+    from services.http_clients import aclose_clients, async_client, sync_client
+
+
+def test_clients_are_shared_and_rebuilt_after_close():
+    async def twice():
+        return async_client(), async_client()
+
+    a, b = asyncio.run(twice())
+    assert a is b
+    assert sync_client() is sync_client()
+
+    async def closed():
+        first = async_client()
+        await aclose_clients()
+        return first, async_client()
+
+    first, second = asyncio.run(closed())
+    assert first.is_closed and second is not first
+    assert not sync_client().is_closed
@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    from backend.services.leaderboard import IndexableSkipList, Leaderboard
+except Exception:
+    from leaderboard import IndexableSkipList, Leaderboard
+
+
+def test_skiplist_matches_sorted_reference_under_random_updates():
+    sl = IndexableSkipList(seed=1)
+    ref = {}
+    rnd = random.Random(3)
+    for _ in range(3000):
+        member = f"u{rnd.randrange(200)}"
+        if ref and rnd.random() < 0.2:
+            victim = rnd.choice(list(ref))
+            sl.remove(victim)
+            del ref[victim]
+        else:
+            ref[member] = rnd.randrange(50)
+            sl.add(member, ref[member])
+
+    order = sorted(ref, key=lambda m: (-ref[m], m))
+    assert [m for _, m, _ in sl.range(0, len(sl))] == order
+    assert all(sl.rank(m) == i for i, m in enumerate(order))
+    assert [m for _, m, _ in sl.range(5, 10)] == order[5:10]
+
+
+def test_leaderboard_top_rank_and_neighbours(tmp_path):
+    lb = Leaderboard(snapshot_path=tmp_path / "lb.json")
+    for i, pts in enumerate([50, 300, 120, 10, 220]):
+        lb.award(f"u{i}", pts, pts / 100)
+
+    assert [e["user_id"] for e in lb.top(3)] == ["u1", "u4", "u2"]
+    assert lb.rank_of("u2")["rank"] == 3
+    assert [e["user_id"] for e in lb.around("u2", n=1)] == ["u4", "u2", "u0"]
+    assert lb.top(1, metric="co2_saved_kg")[0]["user_id"] == "u1"
+    assert lb.tier("u1") == "Platinum Tier"
+    assert lb.tier("nobody") == "Unranked"
+
+
+def test_daily_window_rolls_over_but_all_time_keeps_scores(tmp_path):
+    lb = Leaderboard(snapshot_path=tmp_path / "lb.json")
+    today = datetime.now(timezone.utc)
+    lb.award("a", 100, 1.0, ts=today)
+    lb.award("b", 10, 0.1, ts=today + timedelta(days=1))
+
+    assert [e["user_id"] for e in lb.top(5, window="daily")] == ["b"]
+    assert [e["user_id"] for e in lb.top(5)] == ["a", "b"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "lb.json"
+    lb = Leaderboard(snapshot_path=path)
+    lb.award("a", 100, 1.0)
+    lb.award("b", 200, 2.0)
+    lb.snapshot()
+
+    restored = Leaderboard(snapshot_path=path)
+    assert [e["user_id"] for e in restored.top(2)] == ["b", "a"]
+    assert [e["user_id"] for e in restored.top(2, window="weekly")] == ["b", "a"]
+
+
+def test_due_snapshots_are_written_off_the_request_thread(tmp_path):
+    path = tmp_path / "lb.json"
+    lb = Leaderboard(snapshot_path=path, snapshot_every_s=0.0)
+    writers = []
+    snapshot = lb.snapshot
+    lb.snapshot = lambda: (writers.append(threading.current_thread()), snapshot())
+
+    lb.award("a", 100, 1.0)
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert writers and threading.current_thread() not in writers
+    assert [e["user_id"] for e in Leaderboard(snapshot_path=path).top(1)] == ["a"]
@@ -0,0 +1,81 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+try:
+    from backend.middleware.metrics import MetricsMiddleware
+    from backend.services.metrics import HttpMetrics, Registry
+    from backend.services.resilience import ProviderGuard
+except Exception:
+    from middleware.metrics import MetricsMiddleware
+    from services.metrics import HttpMetrics, Registry
+    from services.resilience import ProviderGuard
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not in output")
+
+
+def test_histogram_buckets_are_cumulative_with_le_semantics():
+    reg = Registry()
+    h = reg.histogram("lat_seconds", "x", ("route",), buckets=(0.1, 1.0))
+    child = h.labels("/a")
+    for v in (0.05, 0.1, 0.5, 3.0):
+        child.observe(v)
+    out = reg.render()
+    assert "# TYPE lat_seconds histogram" in out
+    assert _sample(out, 'lat_seconds_bucket{route="/a",le="0.1"}') == 2
+    assert _sample(out, 'lat_seconds_bucket{route="/a",le="1.0"}') == 3
+    assert _sample(out, 'lat_seconds_bucket{route="/a",le="+Inf"}') == 4
+    assert _sample(out, 'lat_seconds_count{route="/a"}') == 4
+    assert h.labels("/a") is child
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.counter("c_total", "x", ("v",)).labels('a"b\\c\n').inc()
+    assert 'c_total{v="a\\"b\\\\c\\n"} 1' in reg.render()
+
+
+def test_middleware_labels_by_route_template_and_status_class():
+    reg = Registry()
+    metrics = HttpMetrics(reg)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/station/{station_id}")
+    def station(station_id: str):
+        if station_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": station_id}
+
+    metrics.prime(app.routes)
+    c = TestClient(app)
+    for sid in ("a", "b", "missing"):
+        c.get(f"/station/{sid}")
+    c.get("/nowhere")
+
+    out = reg.render()
+    assert _sample(out, 'http_requests_total{route="/station/{station_id}",method="GET",status="2xx"}') == 2
+    assert _sample(out, 'http_requests_total{route="/station/{station_id}",method="GET",status="4xx"}') == 1
+    assert _sample(out, 'http_requests_total{route="<unmatched>",method="GET",status="4xx"}') == 1
+    assert _sample(out, 'http_request_duration_seconds_count{route="/station/{station_id}",method="GET"}') == 3
+    assert _sample(out, "http_requests_in_flight") == 0
+    assert "/station/a" not in out
+
+
+def test_provider_guard_records_outcomes_and_cache_fallbacks():
+    guard = ProviderGuard("test_metrics_provider", hedge=False, min_calls=100)
+    m = guard.metrics
+    assert guard.call("k", lambda: {"ok": 1}) == {"ok": 1}
+
+    def boom():
+        raise RuntimeError("down")
+
+    assert guard.call("k", boom) == {"ok": 1}      # served from the last-good cache
+    assert guard.call("other", boom) is None       # nothing cached
+    assert (m.ok.value, m.error.value) == (1, 2)
+    assert (m.cache_hit.value, m.cache_miss.value) == (1, 1)
+    assert m.latency.count == 3
@@ -0,0 +1,167 @@
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    from backend.services.climate_hazards_service import ClimateHazardsService
+    from backend.services.electricity_maps_service import ElectricityMapsService
+    from backend.services.prefetch import PrefetchScheduler, RegionDemand, region_center, region_of
+    from backend.services.shared_state import LocalState, WorkerSync
+except Exception:
+    from services.climate_hazards_service import ClimateHazardsService
+    from services.electricity_maps_service import ElectricityMapsService
+    from services.prefetch import PrefetchScheduler, RegionDemand, region_center, region_of
+    from services.shared_state import LocalState, WorkerSync
+
+
+def _no_fetch(*args):
+    raise AssertionError("fetched on the request path")
+
+
+def _scheduler(**kwargs):
+    return PrefetchScheduler(RegionDemand(), sync=WorkerSync(LocalState()), jitter=0.0, **kwargs)
+
+
+def test_regions_are_grid_cells_named_by_centre():
+    assert region_of(49.28, -123.12) == "49.3750,-123.1250"
+    assert region_of(49.30, -123.01) == region_of(49.28, -123.12)
+    assert region_center(region_of(49.28, -123.12)) == (49.375, -123.125)
+
+
+def test_demand_ranks_busiest_first_and_decays():
+    demand = RegionDemand(half_life_s=0.05)
+    demand.add("a", 1)
+    demand.add("b", 5)
+    assert demand.top(2) == ["b", "a"]
+    time.sleep(0.2)  # four half-lives: b is worth ~0.3 now
+    demand.add("a", 1)
+    assert demand.top(1) == ["a"]
+    assert demand.take_pending() == {"a": 2.0, "b": 5.0}
+    assert demand.take_pending() == {}
+
+
+def test_sources_run_on_their_own_cadence_and_back_off_on_failure():
+    sched = _scheduler()
+    calls = {"fast": 0, "flaky": 0}
+
+    def fast():
+        calls["fast"] += 1
+
+    def flaky():
+        calls["flaky"] += 1
+        raise RuntimeError("feed down")
+
+    sched.add("fast", fast, cadence_s=0.05)
+    sched.add("flaky", flaky, cadence_s=0.05, backoff_base_s=10.0)
+
+    async def scenario():
+        task = asyncio.create_task(sched.run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert calls["fast"] >= 3
+    assert calls["flaky"] == 1  # first failure backs off 10 s, far past the 0.05 s cadence
+    status = sched.status()["sources"]["flaky"]
+    assert status["failures"] == 1 and status["last_error"] == "feed down"
+    assert not sched.running
+
+
+def test_cold_region_request_is_refreshed_at_once_and_busiest_regions_on_schedule():
+    sched = _scheduler()
+    seen = []
+    sched.add("carbon", seen.append, cadence_s=60.0, per_region=True, max_regions=1, initial_delay_s=60.0)
+    sched.demand.add("busy", 10)
+
+    async def scenario():
+        task = asyncio.create_task(sched.run())
+        await asyncio.sleep(0.05)
+        sched.request("cold")
+        sched.request("cold")  # deduplicated
+        await asyncio.sleep(0.1)
+        sched.sources["carbon"].next_due = 0.0
+        sched.request("other")
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert seen.count("cold") == 1
+    assert "busy" in seen and "other" in seen
+
+
+def test_followers_forward_cold_regions_instead_of_fetching():
+    sched = _scheduler()
+    emitted = []
+    sched.sync.emit = lambda stream, data: emitted.append((stream, data))
+    sched.add("carbon", lambda region: None, cadence_s=60.0, per_region=True)
+    sched.request("cold")
+    assert sched.tick(lambda: False) == sched.leader_check_s
+    assert emitted == [("prefetch_request", {"regions": ["cold"]})]
+
+
+def test_services_read_only_prefetched_snapshots_while_running(monkeypatch):
+    sched = _scheduler()
+    sched.running = True
+    for cls in (ElectricityMapsService, ClimateHazardsService):
+        monkeypatch.setattr(sys.modules[cls.__module__], "prefetcher", sched)
+
+    emaps = ElectricityMapsService()
+    emaps.api_key = "dummy"
+    monkeypatch.setattr(emaps, "_fetch", _no_fetch)
+    assert emaps.latest_carbon_intensity(49.28, -123.12) is None  # cold: no wait, refresh requested
+    assert sched._urgent == {"49.3750,-123.1250"}
+
+    emaps.regions.put("latest:49.3750,-123.1250", {"carbonIntensity": 42})
+    assert emaps.latest_carbon_intensity(49.28, -123.12) == {"carbonIntensity": 42}
+
+    hz = ClimateHazardsService()
+    hz.firms_key = "k"
+    monkeypatch.setattr(hz, "_fetch_text", _no_fetch)
+    monkeypatch.setattr(hz, "_fetch_smoke", _no_fetch)
+    out = hz.get_hazards(49.28, -123.12)
+    assert out["smoke_detail"]["status"] == "pending"
+    assert out["fire_detail"]["status"] == "pending"
+    assert out["unavailable"] == ["fires", "smoke"]
+
+    # Region CSV covers a wider box; only detections inside the point's own box count
+    hz.firms_regions.put("firms:49.3750,-123.1250", "latitude,longitude\n49.30,-123.10\n49.80,-123.10\n")
+    fires = hz.get_hazards(49.28, -123.12)["fire_detail"]
+    assert fires == {"available": True, "count": 1, "closest_km": 2.7}
+
+
+def test_snapshots_that_missed_their_refresh_are_marked_stale_and_refreshed(monkeypatch):
+    sched = _scheduler()
+    sched.running = True
+    for cls in (ElectricityMapsService, ClimateHazardsService):
+        monkeypatch.setattr(sys.modules[cls.__module__], "prefetcher", sched)
+    for name in ("carbon_latest", "firms"):
+        sched.add(name, lambda region: None, cadence_s=60.0, per_region=True)
+    region = "49.3750,-123.1250"
+
+    emaps = ElectricityMapsService()
+    emaps.api_key = "dummy"
+    monkeypatch.setattr(emaps, "_fetch", _no_fetch)
+    emaps.regions.put(f"latest:{region}", {"carbonIntensity": 42}, time.time() - 600)
+    assert emaps.latest_carbon_intensity(49.28, -123.12) == {"carbonIntensity": 42, "stale": True}
+    assert sched._take_urgent() == {region}
+
+    sched._requested.clear()
+    emaps.regions.put(f"latest:{region}", {"carbonIntensity": 40}, time.time() - 30)
+    assert emaps.latest_carbon_intensity(49.28, -123.12) == {"carbonIntensity": 40}
+    assert sched._urgent == set()
+
+    hz = ClimateHazardsService()
+    hz.firms_key = "k"
+    monkeypatch.setattr(hz, "_fetch_text", _no_fetch)
+    hz.firms_regions.put(f"firms:{region}", "latitude,longitude\n49.30,-123.10\n", time.time() - 600)
+    fires = hz._firms_fires_near(49.28, -123.12)
+    assert fires["count"] == 1 and fires["status"] == "stale" and fires["age_s"] >= 600
+    assert sched._urgent == {region}
+
+
+def test_prefetched_forecast_is_cut_to_the_requested_horizon():
+    points = [{"datetime": f"2026-01-01T{h:02d}:00:00Z", "carbonIntensity": h} for h in range(10)]
+    at = datetime(2026, 1, 1, 2, 30, tzinfo=timezone.utc)
+    out = ElectricityMapsService._within_horizon(points, 3, now=at)
+    assert [p["carbonIntensity"] for p in out] == [2, 3, 4, 5]
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+try:
+    from backend.middleware.profiling import RequestProfilerMiddleware
+    from backend.routes import admin
+    from backend.services.profiler import StackSampler
+except Exception:
+    from middleware.profiling import RequestProfilerMiddleware
+    from routes import admin
+    from services.profiler import StackSampler
+
+
+def _spin_until(deadline: float) -> int:
+    n = 0
+    while time.monotonic() < deadline:
+        n += sum(i * i for i in range(200))
+    return n
+
+
+def test_wall_sampler_collapses_stacks_of_busy_thread():
+    s = StackSampler()
+    done = threading.Event()
+
+    def busy():
+        _spin_until(time.monotonic() + 0.3)
+        done.wait(5)  # stay alive so the sampler can still name this thread
+
+    worker = threading.Thread(target=busy, name="busy")
+    assert s.start(0.005, mode="wall") == "wall"
+    worker.start()
+    time.sleep(0.35)
+    s.stop()
+    out = s.collapsed()
+    done.set()
+    worker.join()
+
+    assert s.samples > 0
+    busy = [line for line in out.splitlines() if line.startswith("busy;")]
+    assert busy and all(line.rsplit(" ", 1)[1].isdigit() for line in busy)
+    assert any("_spin_until" in line for line in busy)
+
+
+def test_sampler_uses_sigprof_on_main_thread():
+    s = StackSampler()
+    assert s.start(0.001) == "cpu"
+    _spin_until(time.monotonic() + 0.2)
+    s.stop()
+    assert s.samples > 0
+    assert "_spin_until" in s.collapsed()
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(RequestProfilerMiddleware)
+    app.include_router(admin.router)
+
+    @app.get("/work")
+    async def work():
+        return {"n": _spin_until(time.monotonic() + 0.02)}
+
+    return TestClient(app)
+
+
+def test_admin_profile_endpoint_requires_configured_token(monkeypatch):
+    c = _app()
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert c.post("/api/admin/profile?seconds=0.05").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert c.post("/api/admin/profile?seconds=0.05").status_code == 401
+    assert c.post("/api/admin/profile?seconds=0.05", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    r = c.post("/api/admin/profile?seconds=0.1&interval_ms=5", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200
+    assert r.headers["x-profile-mode"] in ("cpu", "wall")
+    assert int(r.headers["x-profile-samples"]) >= 0
+
+
+def test_profile_header_returns_cprofile_report_only_for_admins(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    c = _app()
+
+    plain = c.get("/work", headers={"X-Profile": "1"})
+    assert plain.json()["n"] >= 0  # no token: header ignored
+
+    r = c.get("/work", headers={"X-Profile": "tottime", "X-Admin-Token": "s3cret"})
+    assert r.status_code == 200
+    assert r.headers["x-profiled-status"] == "200"
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "GET /work -> 200" in r.text
+    assert "_spin_until" in r.text
@@ -0,0 +1,87 @@
+import asyncio
+
+try:
+    from backend.services.push_broker import PushBroker
+except Exception:
+    from push_broker import PushBroker
+
+
+def test_fanout_encodes_once_and_dedupes_across_topics():
+    async def run():
+        broker = PushBroker()
+        a = broker.subscribe(["station:s1", "station:s2"])
+        b = broker.subscribe(["station:s2"])
+        c = broker.subscribe(["station:s3"])
+
+        assert broker.publish(["station:s1", "station:s2"], "alert", {"x": 1}) == 2
+        assert broker.publish(["station:nobody"], "alert", {"x": 2}) == 0
+
+        ma, mb = await a.get(timeout=1), await b.get(timeout=1)
+        assert ma is mb  # one shared, pre-encoded message
+        assert ma.sse.startswith(b"id: 1\nevent: alert\ndata: {\"x\":1}")
+        assert ma.text == '{"id":1,"event":"alert","data":{"x":1}}'
+        assert a.pending() == 0 and await c.get(timeout=0.01) is None
+
+        broker.unsubscribe(b)
+        assert broker.stats()["subscribers"] == 2
+        assert await b.get() is None  # closed inbox returns immediately
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_drops_oldest_and_reports_it():
+    async def run():
+        broker = PushBroker(queue_size=3)
+        sub = broker.subscribe(["journey:default"])
+        for i in range(5):
+            broker.publish(["journey:default"], "journey", {"step": i})
+        assert sub.take_dropped() == 2
+        got = [(await sub.get(timeout=1)).id for _ in range(3)]
+        assert got == [3, 4, 5]
+
+    asyncio.run(run())
+
+
+def test_publish_from_another_thread_is_handed_to_the_loop():
+    async def run():
+        broker = PushBroker()
+        sub = broker.subscribe(["station:s1"])
+        await asyncio.to_thread(broker.publish, ["station:s1"], "alert", {"ok": True})
+        msg = await sub.get(timeout=1)
+        assert msg is not None and msg.event == "alert"
+
+    asyncio.run(run())
+
+
+def test_websocket_replies_and_published_messages_share_one_writer(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    try:
+        from backend.routes import push
+    except Exception:
+        from routes import push
+
+    sends = {"active": 0, "overlap": False}
+    real_send = push.WebSocket.send_text
+
+    async def tracked_send(self, data):
+        sends["active"] += 1
+        sends["overlap"] |= sends["active"] > 1
+        try:
+            await asyncio.sleep(0.01)  # widen the window a second writer would hit
+            await real_send(self, data)
+        finally:
+            sends["active"] -= 1
+
+    monkeypatch.setattr(push.WebSocket, "send_text", tracked_send)
+    app = FastAPI()
+    app.include_router(push.router)
+
+    with TestClient(app).websocket_connect("/api/ws?stations=s1") as ws:
+        assert ws.receive_json()["event"] == "snapshot"
+        ws.send_json({"subscribe": {"stations": ["s2"]}})
+        push.broker.publish(["station:s1"], "alert", {"n": 1})
+        events = sorted(ws.receive_json()["event"] for _ in range(2))
+        assert events == ["alert", "snapshot"]
+    assert not sends["overlap"]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+try:
+    from backend.services.readiness import Readiness
+except Exception:
+    from readiness import Readiness
+
+
+def _boom():
+    raise RuntimeError("feed down")
+
+
+def test_not_ready_until_warmup_has_run_and_failed_steps_are_reported():
+    r = Readiness()
+    loaded = []
+    r.add_warmup("stations", lambda: loaded.append("stations"))
+    r.add_warmup("smoke", _boom)
+
+    ready, body = r.report()
+    assert not ready and body["status"] == "starting"
+
+    asyncio.run(r.run_warmup())
+    ready, body = r.report()
+    assert ready and body["status"] == "ready"
+    assert loaded == ["stations"]
+    assert body["warmup"]["stations"]["ok"] is True
+    assert body["warmup"]["smoke"] == {"ok": False, "seconds": body["warmup"]["smoke"]["seconds"], "error": "feed down"}
+
+
+def test_critical_check_failure_makes_worker_unready_others_only_degrade():
+    r = Readiness()
+    asyncio.run(r.run_warmup())
+    healthy = {"db": True}
+    r.add_check("sqlite", lambda: {"ok": healthy["db"]}, critical=True)
+    r.add_check("gemini", lambda: {"ok": False})
+    r.add_check("hazards", _boom)
+
+    ready, body = r.report()
+    assert ready and body["status"] == "degraded"
+    assert body["checks"]["hazards"] == {"ok": False, "error": "feed down", "critical": False}
+
+    healthy["db"] = False
+    ready, body = r.report()
+    assert not ready and body["status"] == "unavailable"
+
+
+def test_warmup_timeout_still_marks_ready():
+    r = Readiness(warmup_timeout_s=0.05)
+    r.add_warmup("slow", lambda: time.sleep(0.3))
+
+    async def scenario():
+        await r.run_warmup()
+        return r.report()
+
+    ready, body = asyncio.run(scenario())
+    assert ready
+    assert body["warmup"]["slow"]["error"] == "warm-up timed out"
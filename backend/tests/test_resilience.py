@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+try:
+    from backend.services.resilience import (
+        CircuitBreaker, CircuitOpenError, HedgeBudget, ProviderGuard, hedged_call, hedged_call_async,
+    )
+except Exception:
+    from resilience import (
+        CircuitBreaker, CircuitOpenError, HedgeBudget, ProviderGuard, hedged_call, hedged_call_async,
+    )
+
+
+def _boom():
+    raise RuntimeError("upstream down")
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    b = CircuitBreaker("t", min_calls=3, failure_ratio=0.5, open_s=0.05)
+    for _ in range(3):
+        assert b.allow()
+        b.record(False)
+    assert b.state == CircuitBreaker.OPEN
+    assert not b.allow()
+
+    time.sleep(0.06)
+    assert b.allow()        # single probe
+    assert not b.allow()    # second caller still fails fast
+    b.record(True)
+    assert b.state == CircuitBreaker.CLOSED
+
+
+def test_guard_serves_last_good_value_while_open():
+    g = ProviderGuard("t", hedge=False, min_calls=2, open_s=60)
+    assert g.call("k", lambda: {"v": 1}) == {"v": 1}
+
+    g.call("k", _boom)
+    g.call("k", _boom)
+    assert g.breaker.state == CircuitBreaker.OPEN
+
+    calls = []
+    out = g.call("k", lambda: calls.append(1) or {"v": 2})
+    assert out == {"v": 1}
+    assert calls == []  # failed fast, upstream never touched
+
+    assert g.call("other", lambda: 1, default="fallback") == "fallback"
+    with pytest.raises(CircuitOpenError):
+        g.call("other", lambda: 1, raise_when_empty=True)
+
+
+def test_hedged_call_runs_the_first_copy_inline_and_hedges_in_the_pool():
+    threads = []
+
+    def fast():
+        threads.append(threading.current_thread())
+        return "ok"
+
+    assert hedged_call(fast, delay_s=0.05) == "ok"
+    time.sleep(0.1)
+    assert threads == [threading.current_thread()]  # finished in time: no hedge, no pool hop
+
+
+def test_hedged_call_falls_back_to_the_hedge_when_the_first_copy_fails():
+    lock = threading.Lock()
+    seen = []
+
+    def hangs_then_fails():
+        with lock:
+            n = len(seen)
+            seen.append(n)
+        if n == 0:
+            time.sleep(0.2)
+            raise TimeoutError("read timed out")
+        time.sleep(0.01)
+        return n
+
+    start = time.perf_counter()
+    assert hedged_call(hangs_then_fails, delay_s=0.02) == 1
+    assert time.perf_counter() - start < 0.4
+
+
+def test_hedged_call_async_cancels_loser():
+    seen = []
+
+    async def factory():
+        n = len(seen)
+        seen.append(n)
+        await asyncio.sleep(0.5 if n == 0 else 0.01)
+        return n
+
+    assert asyncio.run(hedged_call_async(factory, delay_s=0.02)) == 1
+
+
+def test_guard_does_not_cache_error_responses():
+    g = ProviderGuard("t", hedge=False)
+    assert g.call("k", lambda: httpx.Response(404)).status_code == 404
+    assert g.cached("k") is None
+
+    g.call("k", lambda: httpx.Response(200, json={"ok": True}))
+    g.call("k", lambda: httpx.Response(400))
+    assert g.cached("k").json() == {"ok": True}
+
+
+def test_hedges_stop_once_the_budget_is_spent():
+    budget = HedgeBudget(ratio=0.5, burst=1.0)
+    lock = threading.Lock()
+    started = []
+
+    def slow():
+        with lock:
+            started.append(1)
+        time.sleep(0.05)
+        return "ok"
+
+    hedged_call(slow, delay_s=0.01, budget=budget)
+    assert len(started) == 2  # the one token bought a hedge
+
+    started.clear()
+    hedged_call(slow, delay_s=0.01, budget=budget)
+    assert len(started) == 1  # no token left: wait for the first copy
+
+    budget.earn()
+    budget.earn()
+    started.clear()
+    hedged_call(slow, delay_s=0.01, budget=budget)
+    assert len(started) == 2
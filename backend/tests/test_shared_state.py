@@ -0,0 +1,176 @@
+import asyncio
+import sys
+import threading
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+try:
+    from backend.services import resilience
+    from backend.services.assistant_service import process_assistant_query, session_key
+    from backend.services.rate_limit import rate_limit
+    from backend.services.shared_state import LocalState, SQLiteState, WorkerSync
+except Exception:
+    from services import resilience
+    from services.assistant_service import process_assistant_query, session_key
+    from services.rate_limit import rate_limit
+    from services.shared_state import LocalState, SQLiteState, WorkerSync
+
+
+def _backends(tmp_path):
+    return [LocalState(), SQLiteState(tmp_path / "state.db")]
+
+
+def test_kv_roundtrip_ttl_and_delete(tmp_path):
+    for state in _backends(tmp_path):
+        state.set("a", {"x": [1, 2]})
+        state.set("short", 1, ttl_s=0.01)
+        assert state.get("a") == {"x": [1, 2]}
+        time.sleep(0.02)
+        assert state.get("short", "gone") == "gone"
+        state.delete("a")
+        assert state.get("a") is None
+
+
+def test_incr_keeps_window_expiry(tmp_path):
+    for state in _backends(tmp_path):
+        assert state.incr("hits", ttl_s=0.05) == 1
+        assert state.incr("hits", 2) == 3
+        time.sleep(0.06)
+        assert state.incr("hits", ttl_s=0.05) == 1  # new window
+
+
+def test_sqlite_transactions_serialize_across_handles(tmp_path):
+    # Two handles on one file stand in for two worker processes
+    path = tmp_path / "state.db"
+    handles = [SQLiteState(path), SQLiteState(path)]
+
+    def bump(state):
+        for _ in range(50):
+            with state.transaction("session") as s:
+                s["n"] = s.get("n", 0) + 1
+
+    threads = [threading.Thread(target=bump, args=(h,)) for h in handles]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert handles[0].get("session") == {"n": 100}
+
+
+def test_failed_transaction_is_not_saved(tmp_path):
+    for state in _backends(tmp_path):
+        state.set("s", {"step": 1})
+        try:
+            with state.transaction("s") as s:
+                s["step"] = 2
+                raise RuntimeError("handler failed")
+        except RuntimeError:
+            pass
+        assert state.get("s") == {"step": 1}
+
+
+def test_worker_sync_replays_only_other_workers_events(tmp_path):
+    path = tmp_path / "state.db"
+    a, b = WorkerSync(SQLiteState(path)), WorkerSync(SQLiteState(path))
+    seen_a, seen_b = [], []
+    a.on("board", seen_a.append)
+    b.on("board", seen_b.append)
+    a.emit("board", {"before": "start"})
+    a.poll_once()
+    b.poll_once()  # first poll only marks the starting point
+
+    a.emit("board", {"from": "a"})
+    b.emit("board", {"from": "b"})
+    b.emit("unhandled", {})
+    assert a.poll_once() == 1 and b.poll_once() == 1
+    assert seen_a == [{"from": "b"}]
+    assert seen_b == [{"from": "a"}]
+
+
+def test_local_worker_sync_is_a_no_op():
+    sync = WorkerSync(LocalState())
+    sync.on("board", lambda e: None)
+    sync.emit("board", {"x": 1})
+    sync.poll_once()
+    assert sync.poll_once() == 0
+
+
+def test_provider_fallback_is_shared_between_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(resilience, "shared_state", SQLiteState(tmp_path / "state.db"))
+    worker_a = resilience.ProviderGuard("demo_a", hedge=False)
+    worker_b = resilience.ProviderGuard("demo_a", hedge=False)
+
+    assert worker_a.call("k", lambda: {"value": 7}) == {"value": 7}
+
+    def down():
+        raise resilience.ProviderError("down")
+
+    assert worker_b.call("k", down) == {"value": 7}
+    assert worker_b.cached_at("k") == worker_a.cached_at("k")
+
+
+def test_worker_sync_handlers_run_off_the_event_loop(tmp_path):
+    path = tmp_path / "state.db"
+    a, b = WorkerSync(SQLiteState(path), poll_s=0.01), WorkerSync(SQLiteState(path), poll_s=0.01)
+    threads = []
+    b.on("board", lambda e: threads.append(threading.current_thread()))
+
+    async def relay():
+        task = asyncio.ensure_future(b.run())
+        await asyncio.sleep(0.05)
+        a.emit("board", {"from": "a"})
+        for _ in range(100):
+            if threads:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(relay())
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+
+def _assistant_module():
+    return sys.modules[process_assistant_query.__module__]
+
+
+def test_assistant_sessions_are_separate(monkeypatch):
+    monkeypatch.setattr(_assistant_module(), "shared_state", LocalState())
+    state = _assistant_module().shared_state
+
+    async def talk():
+        await process_assistant_query("start", session_id="rider_a")
+        await process_assistant_query("take me from union station to cn tower", session_id="rider_a")
+        await process_assistant_query("start", session_id="rider_b")
+
+    asyncio.run(talk())
+    assert state.get(session_key("rider_a"))["conversation"]["current_state"] == "awaiting_transport"
+    assert state.get(session_key("rider_b"))["conversation"]["current_state"] == "intro"
+
+
+def test_concurrent_steps_on_one_session_are_all_saved(tmp_path, monkeypatch):
+    path = tmp_path / "state.db"
+    monkeypatch.setattr(_assistant_module(), "shared_state", SQLiteState(path))
+    run = _assistant_module()._run_in_session
+
+    threads = [threading.Thread(target=lambda: [run("shared", "start") for _ in range(10)]) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert SQLiteState(path).get(session_key("shared"))["version"] == 20
+
+
+def test_rate_limit_counts_per_client_in_shared_state(monkeypatch):
+    monkeypatch.setenv("TEST_RATE_LIMIT_PER_MIN", "2")
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(rate_limit("test", "TEST_RATE_LIMIT_PER_MIN", 60))])
+    def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert [client.get("/limited").status_code for _ in range(3)] == [200, 200, 429]
+    monkeypatch.setenv("TEST_RATE_LIMIT_PER_MIN", "0")
+    assert client.get("/limited").status_code == 200
@@ -0,0 +1,79 @@
+import mmap
+import time
+from array import array
+
+try:
+    from backend.services.climate_hazards_service import ClimateHazardsService, _iter_smoke_placemarks
+    from backend.services.snapshots import SnapshotStore
+except Exception:
+    from services.climate_hazards_service import ClimateHazardsService, _iter_smoke_placemarks
+    from services.snapshots import SnapshotStore
+
+_SQUARE = array("d", [-123.3, 49.2, -123.0, 49.2, -123.0, 49.4, -123.3, 49.4])
+
+
+def test_smoke_snapshot_roundtrip_is_zero_copy(tmp_path):
+    store = SnapshotStore(tmp_path, check_s=0)
+    store.smoke.publish([(_SQUARE, "Medium"), (array("d", [1.0, 2.0]), "Light")], fetched_at=1000.0)
+
+    fetched_at, polys = store.smoke.load()
+    assert fetched_at == 1000.0
+    assert [(list(p), sev) for p, sev in polys] == [(list(_SQUARE), "Medium"), ([1.0, 2.0], "Light")]
+    assert isinstance(polys[0][0].obj, mmap.mmap)  # a view into the mapping, not a copy
+
+    # Replacing the file never disturbs views already handed out
+    store.smoke.publish([(array("d", [9.0, 9.0]), "Heavy")], fetched_at=2000.0)
+    assert list(polys[1][0]) == [1.0, 2.0]
+    assert store.smoke.load()[0] == 2000.0
+
+
+def test_keyed_snapshot_merges_and_keeps_newest(tmp_path):
+    a = SnapshotStore(tmp_path, check_s=0).carbon
+    b = SnapshotStore(tmp_path, check_s=0).carbon  # second worker, same files
+    now = time.time()
+    a.put("/latest?lat=1", {"carbonIntensity": 100}, now)
+    b.put("/latest?lat=2", {"carbonIntensity": 200}, now)
+    b.put("/latest?lat=1", {"carbonIntensity": 50}, now - 60)  # older than what a published
+
+    assert a.get("/latest?lat=1") == (now, {"carbonIntensity": 100})
+    assert a.get("/latest?lat=2")[1] == {"carbonIntensity": 200}
+    assert a.get("/missing") is None
+
+
+def test_keyed_snapshot_drops_expired_and_oldest(tmp_path):
+    keyed = SnapshotStore(tmp_path, check_s=0).carbon
+    keyed.max_entries = 3
+    now = time.time()
+    keyed.put_many({f"k{i}": (now - i, i) for i in range(5)})
+    keyed.put("ancient", 0, now - keyed.max_age_s - 1)
+    assert [keyed.get(f"k{i}") is not None for i in range(5)] == [True, True, True, False, False]
+    assert keyed.get("ancient") is None
+
+
+def test_leader_lock_fails_over_when_leader_releases(tmp_path):
+    first, second = SnapshotStore(tmp_path).leader, SnapshotStore(tmp_path).leader
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+
+
+_KML = """<?xml version="1.0"?><kml xmlns="http://www.opengis.net/kml/2.2"><Document><Placemark>
+<name>Heavy Smoke</name><Polygon><outerBoundaryIs><LinearRing><coordinates>
+-123.30,49.20 -123.00,49.20 -123.00,49.40 -123.30,49.40 -123.30,49.20
+</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark></Document></kml>"""
+
+
+def test_second_worker_reads_published_smoke_without_downloading(tmp_path):
+    fetches = []
+
+    def worker():
+        s = ClimateHazardsService()
+        s.snapshots = SnapshotStore(tmp_path, check_s=0)
+        s._fetch_smoke = lambda: fetches.append(1) or list(_iter_smoke_placemarks([_KML.encode("utf-8")]))
+        return s
+
+    leader, follower = worker(), worker()
+    assert leader._smoke_risk(49.28, -123.12)["severity"] == "heavy"
+    assert follower._smoke_risk(49.28, -123.12)["severity"] == "heavy"
+    assert len(fetches) == 1
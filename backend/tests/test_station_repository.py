@@ -0,0 +1,117 @@
+try:
+    from backend.services.alert_store import AlertStore
+    from backend.services.station_repository import StationRepository
+except Exception:
+    from alert_store import AlertStore
+    from station_repository import StationRepository
+
+
+def _write_gtfs(tmp_path):
+    (tmp_path / "stops.txt").write_text(
+        "stop_id,stop_name,stop_lat,stop_lon,location_type,parent_station,wheelchair_boarding\n"
+        "UNION,Union Station,43.645,-79.380,1,,1\n"
+        "UNION_P1,Union Platform 1,43.645,-79.380,0,UNION,1\n"
+        "UNION_E1,Union Entrance,43.645,-79.380,2,UNION,1\n"
+        "KING,King Station,43.649,-79.377,1,,2\n"
+        "STOP_9,Queen at Bay,43.652,-79.381,0,,0\n"
+    )
+    (tmp_path / "pathways.txt").write_text(
+        "pathway_id,from_stop_id,to_stop_id,pathway_mode,is_bidirectional\n"
+        "pw_el_1,UNION_E1,UNION_P1,5,1\n"
+        "pw_es_1,UNION_E1,UNION_P1,4,0\n"
+        "pw_st_1,UNION_E1,UNION_P1,2,1\n"
+    )
+    (tmp_path / "accessibility.csv").write_text(
+        "station_id,audio_announcements,visual_displays,accessible_restrooms,ramp\n"
+        "UNION,1,1,yes,1\n"
+        "KING,0,1,0,0\n"
+    )
+
+
+def test_loads_stations_pathways_and_flags(tmp_path):
+    _write_gtfs(tmp_path)
+    repo = StationRepository(tmp_path, tmp_path / "accessibility.csv")
+
+    assert len(repo) == 3  # two parent stations + one standalone stop
+    union = repo.get("UNION")
+    assert union["station_name"] == "Union Station"
+    assert [f["feature_id"] for f in union["features"]] == ["pw_el_1", "pw_es_1", "ramp_1"]
+    assert union["wheelchair_accessible"] and union["elevators_working"] and union["accessible_restrooms"]
+
+    king = repo.get("KING")
+    assert not king["wheelchair_accessible"] and king["visual_displays"] and not king["audio_announcements"]
+    assert repo.get("UNION_P1") is None and repo.get_bytes("nope") is None
+
+
+def test_cached_bytes_are_reused_until_an_alert_touches_the_station(tmp_path):
+    _write_gtfs(tmp_path)
+    alerts = AlertStore()
+    repo = StationRepository(tmp_path, tmp_path / "accessibility.csv", alerts=alerts)
+
+    first = repo.get_bytes("UNION")
+    assert repo.get_bytes("UNION") is first
+    king = repo.get_bytes("KING")
+    v0 = repo.version("UNION")
+
+    alerts.upsert({"alert_id": "a1", "station_id": "UNION", "severity": "high", "alert_type": "elevator_outage"})
+    assert repo.version("UNION") > v0
+    union = repo.get("UNION")
+    assert not union["elevators_working"] and not union["wheelchair_accessible"]
+    assert union["features"][0]["is_available"] is False
+    assert union["active_alerts"][0]["alert_id"] == "a1"
+    assert repo.get_bytes("KING") is king  # other stations untouched
+
+    alerts.remove("a1")
+    assert repo.get("UNION")["elevators_working"]
+
+
+def test_placeholder_when_no_station_data():
+    repo = StationRepository(alerts=AlertStore())
+    info = repo.get("stn_x")
+    assert info["station_name"] == "Station stn_x"
+    assert [f["feature_id"] for f in info["features"]] == ["elevator_1", "ramp_1"]
+    assert info["wheelchair_accessible"] and info["elevators_working"]
+
+
+def test_expired_alert_drops_the_overlay(tmp_path):
+    _write_gtfs(tmp_path)
+    now = [1000.0]
+    alerts = AlertStore(clock=lambda: now[0])
+    repo = StationRepository(tmp_path, alerts=alerts)
+    alerts.upsert({"station_id": "UNION", "alert_type": "elevator_outage", "ttl_s": 60})
+    assert not repo.get("UNION")["elevators_working"]
+    now[0] += 61
+    assert repo.get("UNION")["elevators_working"]
+
+
+def test_batch_body_and_etag_track_station_versions(tmp_path):
+    import json
+
+    _write_gtfs(tmp_path)
+    alerts = AlertStore()
+    repo = StationRepository(tmp_path, tmp_path / "accessibility.csv", alerts=alerts)
+    ids = ["UNION", "KING", "NOPE"]
+
+    tag = repo.batch_etag(ids)
+    body = json.loads(repo.batch_bytes(ids))
+    assert list(body["stations"]) == ["UNION", "KING"] and body["missing"] == ["NOPE"]
+    assert body["stations"]["KING"] == repo.get("KING")
+
+    assert repo.batch_etag(ids) == tag
+    assert repo.batch_etag(["KING", "UNION"]) != tag
+    alerts.upsert({"station_id": "STOP_9"})
+    assert repo.batch_etag(ids) == tag  # unrelated station
+    alerts.upsert({"station_id": "KING", "alert_type": "display_outage"})
+    assert repo.batch_etag(ids) != tag
+
+
+def test_byte_cache_evicts_least_recently_used(tmp_path):
+    _write_gtfs(tmp_path)
+    repo = StationRepository(tmp_path, tmp_path / "accessibility.csv", max_cached=2)
+
+    union = repo.get_bytes("UNION")
+    king = repo.get_bytes("KING")
+    assert repo.get_bytes("UNION") is union  # hit: UNION is now the most recent
+    repo.get_bytes("STOP_9")                 # evicts KING, not UNION
+    assert repo.get_bytes("UNION") is union
+    assert repo.get_bytes("KING") is not king
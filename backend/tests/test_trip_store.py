@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+try:
+    from backend.services.trip_store import TripStore
+    from backend.services.climate_service import ClimateEngine
+except Exception:
+    from trip_store import TripStore
+    from climate_service import ClimateEngine
+
+
+def _day(n: int) -> datetime:
+    return datetime(2026, 3, 1, 12, tzinfo=timezone.utc) + timedelta(days=n)
+
+
+def test_record_trip_updates_aggregates_incrementally(tmp_path):
+    store = TripStore(db_path=tmp_path / "trips.db")
+    engine = ClimateEngine()
+
+    a = engine.calculate_savings(10.0, "bus")
+    b = engine.calculate_savings(4.0, "bike")
+    store.record_trip("u1", a, ts_utc=_day(0))
+    stats = store.record_trip("u1", b, ts_utc=_day(0))
+
+    assert stats["total_trips"] == 2
+    assert stats["total_points"] == a["points_earned"] + b["points_earned"]
+    assert abs(stats["total_co2_saved_kg"] - (a["co2_saved_kg"] + b["co2_saved_kg"])) < 1e-6
+    assert store.get_stats("someone_else")["total_trips"] == 0
+
+
+def test_streak_counts_consecutive_days_and_resets_after_gap(tmp_path):
+    store = TripStore(db_path=tmp_path / "trips.db")
+    impact = ClimateEngine().calculate_savings(5.0, "walk")
+
+    for d in (0, 1, 2):
+        store.record_trip("u1", impact, ts_utc=_day(d))
+    assert store.get_stats("u1", today=_day(2))["streak_days"] == 3
+
+    # A missed day breaks the streak on read, and the next trip starts over
+    assert store.get_stats("u1", today=_day(4))["streak_days"] == 0
+    stats = store.record_trip("u1", impact, ts_utc=_day(5))
+    assert stats["streak_days"] == 1
+    assert stats["best_streak_days"] == 3
@@ -0,0 +1,47 @@
+try:
+    from backend.services.trip_templates import parse_trip_inputs, render_trip_message
+except Exception:
+    from trip_templates import parse_trip_inputs, render_trip_message
+
+
+def test_template_covers_common_trip_shape():
+    out = render_trip_message("Bus 504, 15 mins away", "0.4kg CO2 saved", "Ramp Detected: True")
+
+    assert "504" in out
+    assert "15" in out
+    assert "0.4" in out
+    assert "co2" in out.lower()
+    assert "ramp" in out.lower()
+
+
+def test_template_is_deterministic_and_warns_on_hazard():
+    args = ("Subway Line 1, 4 min", "Saved 2.5 kg of CO2", "Hazard: snow")
+    first = render_trip_message(*args)
+
+    assert first == render_trip_message(*args)
+    assert "snow" in first
+
+
+def test_parse_buckets_co2_and_normalizes_mode():
+    facts = parse_trip_inputs("Metro 2, 7 minutes", "1.2kg CO2 saved", "No hazards")
+    assert facts["mode"] == "subway"
+    assert facts["co2_bucket"] == "medium"
+    assert facts["vision"] == "clear"
+
+
+def test_unknown_shapes_fall_through_to_llm():
+    assert render_trip_message("Take the 504 when it comes", "0.4kg CO2 saved", "Ramp Detected: True") is None
+    assert render_trip_message("Bus 504, 15 mins", "good for the planet", "Ramp Detected: True") is None
+    assert render_trip_message("Bus 504, 15 mins", "0.4kg CO2 saved", "a shadowy figure") is None
+
+
+def test_minutes_pluralise_and_the_line_survives():
+    for transit in ("Bus 504 in 1 minute", "Bus 504, 1 min away", "Streetcar 504 1 min"):
+        out = render_trip_message(transit, "0.4kg CO2 saved", "No hazards")
+        assert "504" in out and "1 minute " in out and "1 minutes" not in out
+
+    # No separator after the mode: the digits are the minutes, not a line number
+    facts = parse_trip_inputs("Bus 15 mins", "0.4kg CO2 saved", "No hazards")
+    assert facts["line"] == "" and facts["minutes"] == "15"
+    out = render_trip_message("Bus 15 mins", "0.4kg CO2 saved", "No hazards")
+    assert "15 minutes" in out and ("The bus" in out or "Your bus" in out)
@@ -52,6 +52,22 @@ export const routeService = {
     }
   },
 
+  /**
+   * Get accessibility information for many stations in one request
+   * (e.g. every stop along a route). The browser revalidates with the ETag,
+   * so an unchanged route costs a 304.
+   * @param {string[]} stationIds - Station IDs
+   */
+  async getStationsAccessibility(stationIds) {
+    try {
+      const url = buildURL(`${API_CONFIG.baseURL}/api/stations/accessibility`, { ids: stationIds.join(',') });
+      return await apiFetch(url);
+    } catch (error) {
+      console.error('Get stations accessibility error:', error);
+      return { stations: {}, missing: stationIds };
+    }
+  },
+
   /**
    * Get accessibility alerts
    * @param {string} stationId - Station ID (optional)